@@ -1,6 +1,7 @@
 from enum import Enum
 from abc import ABC, abstractmethod
 from pandas import DataFrame
+import seatlog
 
 
 class AVRCState(Enum):
@@ -68,7 +69,7 @@ class AVRendererControl(ABC):
         """
         pass
 
-    def get_trial_data(self):
+    def get_trial_record(self):
         """
         Get data describing the latest trial (e.g. for writing to log)
 
@@ -76,7 +77,23 @@ class AVRendererControl(ABC):
         implementation given here to speed up development
         Returns
         -------
-        DataFrame.
-            single row
+        dict.
+            column name: value
+        """
+        if type(self).get_trial_data is not AVRendererControl.get_trial_data:
+            # older subclasses which only provide a DataFrame
+            return seatlog.as_record(self.get_trial_data())
+        return {'no_info': ''}
+
+    def trial_record_fields(self):
+        """
+        Names of the fields of get_trial_record(), if they are known before
+        the first trial, otherwise None
+        """
+        return None
+
+    def get_trial_data(self):
+        """
+        get_trial_record() as a single row DataFrame, e.g. for analysis
         """
-        return DataFrame([['']], columns=['no_info'])
+        return DataFrame([self.get_trial_record()])
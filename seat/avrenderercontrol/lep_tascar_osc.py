@@ -1,5 +1,7 @@
 # from .av_renderer_control import AVRendererControl
 import avrenderercontrol.av_renderer_control as avrc
+from avrenderercontrol.media_manifest import MediaManifest
+from avrenderercontrol.osc_bundle import BundleCollector
 import confuse
 import errno
 import ipaddress
@@ -37,20 +39,17 @@ def convert_windows_path_to_wsl(pathlib_win_path):
         raise error
 
 
-def read_and_validate_paths(file_path):
+def read_and_validate_paths(file_path, cache=True, max_workers=16):
     """
     Read a text file containing a list of paths and check that each one exists
 
+    The files are checked concurrently and the result is cached beside the
+    list (see MediaManifest), so an unchanged list is validated quickly
+
     Returns a list of paths
     """
-    file_path = pathlib.Path(file_path)
-    list_of_paths = []
-    with open(file_path, 'r') as f:
-        for line in f:
-            this_path = pathlib.Path(line.rstrip())
-            util.check_path_is_file(this_path)
-            list_of_paths.append(this_path)
-    return list_of_paths
+    return MediaManifest.from_file(file_path, cache=cache,
+                                   max_workers=max_workers).paths
 
 
 class SourceInterface:
@@ -101,10 +100,14 @@ class SourceInterface:
     #                                      self.quad_x_scale,
     #                                      self.quad_y_scale
     #                                    ])
-    def set_position(self, position):
+    def set_position(self, position, bundle=None):
         """
         Takes a dict of values and deals with sending messages to the appropriate clients.
 
+        If a BundleCollector is given the messages are added to it, to be sent
+        with the rest of the trial phase. Otherwise they are sent at once, as
+        one bundle per client.
+
         Rely on the calling class to figure out what these should be. Either mathematically
         or directly from the config file. For simplicity we assume each value is a single scalar which can be cast to the appropriate format
         key, values:
@@ -140,27 +143,33 @@ class SourceInterface:
         # rot_Y as azimuth
 
         """
-        print(position)
+        messages = self.position_messages(position)
+        if bundle is not None:
+            for client, address, value in messages:
+                bundle.add(client, address, value)
+            return
+
+        # send the messages
+        bundle = BundleCollector()
+        for client, address, value in messages:
+            bundle.add(client, address, value)
+            print(f'Setting source postion OSC: {address} {value}')
+        bundle.send()
+
+    def position_messages(self, position):
+        """(client, address, arguments) of the messages for set_position"""
         # collate the required information
         # - tascar part
         t = position['tascar']
-        print(t)
         xyz = [t["x"], t["y"], t["z"]]
         # - unity part
         u = position['unity']
-        print(u)
         arg = [self.video_id,
                u["rot_X_deg"], u["rot_Y_deg"], u["rot_Z_deg"],
                u["quad_x_euler"], u["quad_y_euler"],
                u["quad_x_scale"], u["quad_y_scale"]]
-
-        # send the messages
-        msg_address = self.tascar_source_address + '/pos'
-        self.tascar_client.send_message(msg_address, xyz)
-        print('Setting source postion in tascar OSC:' + msg_address + ' ' + str(xyz))
-
-        self.video_client.send_message("/video/position", arg)
-        print(f'Setting source postion in unity OSC : {arg}')
+        return [(self.tascar_client, self.tascar_source_address + '/pos', xyz),
+                (self.video_client, "/video/position", arg)]
 
 
 class ListeningEffortPlayerAndTascarUsingOSCBase(avrc.AVRendererControl):
@@ -222,8 +231,8 @@ class ListeningEffortPlayerAndTascarUsingOSCBase(avrc.AVRendererControl):
         if hasattr(self, 'tascar_client'):
             self.tascar_client._sock.close()
         for src_name in self.src:
-            if hasattr(self.src[src_name], 'sampler_client'):
-                self.src[src_name].sampler_client._sock.close()
+            if "sampler_client" in self.src[src_name]:
+                self.src[src_name]["sampler_client"]._sock.close()
 
     def start_scene(self):
         """
@@ -285,10 +294,32 @@ class TargetSpeechTwoMaskers(ListeningEffortPlayerAndTascarUsingOSCBase):
         # delay between cue and target
         self.cue_duration = config["cue_duration"]
 
+        # delay between target video and audio to get lip sync right
+        self.audio_delay = config.get("audio_delay", 0.15)
+
+        # None: each phase of a trial is sent at its instant and executed on
+        # arrival
+        # seconds: every phase is sent at the start of the trial, timetagged
+        # to be executed this long after it (plus the phase's offset), so
+        # the renderers do the scheduling. They must honour OSC timetags.
+        self.osc_schedule_ahead = config.get("osc_schedule_ahead", None)
+
+        # waits for each phase's deadline and records when it was reached
+        self.scheduler = util.DeadlineScheduler.from_config(config)
+
+        # stimuli to compile into the OSC plan (see compile_plan), by default
+        # as many as the per-source lists have
+        self.num_stimuli = config.get("num_stimuli", None)
+
 
         self.target_names = config["target_names"]
         self.masker_names = config["masker_names"]
 
+        # media lists are validated concurrently and cached beside the lists
+        manifest_options = {
+            "cache": config.get("manifest_cache", True),
+            "max_workers": config.get("manifest_workers", 16)}
+
         # read in and validate per source properties
         self.src = {};
         for src_name in config["sources"]:
@@ -302,13 +333,13 @@ class TargetSpeechTwoMaskers(ListeningEffortPlayerAndTascarUsingOSCBase):
             if not config["sources"][src_name]["present_video"]:
                 self.src[src_name]["video_paths"] = None
             else:
-                self.src[src_name]["video_paths"] = read_and_validate_paths(config["sources"][src_name]["video_paths_file"])
+                self.src[src_name]["video_paths"] = read_and_validate_paths(config["sources"][src_name]["video_paths_file"], **manifest_options)
 
 
             if not config["sources"][src_name]["present_cue_video"]:
                 self.src[src_name]["cue_video_paths"] = None
             else:
-                self.src[src_name]["cue_video_paths"] = read_and_validate_paths(config["sources"][src_name]["cue_videos_paths_file"])
+                self.src[src_name]["cue_video_paths"] = read_and_validate_paths(config["sources"][src_name]["cue_videos_paths_file"], **manifest_options)
 
             # locations are stored as one per line
             if "locations_file" in config["sources"][src_name]:
@@ -370,6 +401,9 @@ class TargetSpeechTwoMaskers(ListeningEffortPlayerAndTascarUsingOSCBase):
                 }
                 self.src[src_name]["interface"] = SourceInterface( si_config )
 
+            # encode every trial's messages now, not during the trial
+            self.compile_plan()
+
             # save state
             self.state = avrc.AVRCState.READY_TO_START
         else:
@@ -378,8 +412,9 @@ class TargetSpeechTwoMaskers(ListeningEffortPlayerAndTascarUsingOSCBase):
 
     def start_scene(self):
         print('Entered start_scene in child class')
+        self.scheduler.start()
         super().start_scene()
-        time.sleep(1)
+        self.scheduler.wait_until('scene_started', 1.)
 
         # previously set directions of all sources here but should be unnecessary
 
@@ -394,16 +429,51 @@ class TargetSpeechTwoMaskers(ListeningEffortPlayerAndTascarUsingOSCBase):
     def get_position_from_location(self, location):
         return self.locations[location]
 
-    def present_trial(self, stimulus_id):
-        # print('Entered present_trial() with stimulus: ' + str(stimulus_id))
+    def compile_plan(self):
+        """
+        Encode the OSC bundles of every stimulus in advance
+
+        self.plan maps stimulus_id to a dict of phase name: CompiledPhase, so
+        present_trial() only sets the gains and copies buffers to sockets.
+        Building it also checks every location the block will use.
+        """
+        num_stimuli = self.num_stimuli
+        if num_stimuli is None:
+            lengths = [len(self.src[src_name][list_name])
+                       for src_name in self.src
+                       for list_name in ("locations", "cue_video_paths",
+                                         "video_paths")
+                       if self.src[src_name][list_name] is not None]
+            # without any lists, trials are compiled when first presented
+            num_stimuli = min(lengths, default=0)
+        self.plan = {}
+        for stimulus_id in range(num_stimuli):
+            self.plan[stimulus_id] = self.compile_trial(stimulus_id)
+
+        phases = [phase for trial in self.plan.values()
+                  for phase in trial.values()]
+        print(f'Compiled OSC plan for {num_stimuli} stimuli: '
+              f'{sum(len(phase.packets) for phase in phases)} datagrams, '
+              f'{sum(phase.num_bytes for phase in phases)} bytes')
+
+    def compile_trial(self, stimulus_id):
+        """Encode the cue, video and audio phases of a single stimulus"""
+        # messages are collected per phase and sent as one timetagged OSC
+        # bundle per destination so each renderer applies a phase atomically
+        cue_phase = BundleCollector()
+        video_phase = BundleCollector()
+        audio_phase = BundleCollector()
 
         # set directions of all sources
         for src_name in self.src:
             if self.src[src_name]["locations"] is not None:
-                # print(f'setting postion of {src_name}')
                 location = self.src[src_name]["locations"][stimulus_id]
+                if location not in self.locations:
+                    raise ValueError(f'Stimulus {stimulus_id} of {src_name} '
+                                     f'has unknown location {location}')
                 position = self.get_position_from_location(location)
-                self.src[src_name]["interface"].set_position(position)
+                self.src[src_name]["interface"].set_position(position,
+                                                             cue_phase)
 
         # present any cues (only videos for now, but could add audio too)
         for src_name in self.src:
@@ -411,12 +481,7 @@ class TargetSpeechTwoMaskers(ListeningEffortPlayerAndTascarUsingOSCBase):
                 msg_contents = [
                     self.src[src_name]["video_id"],
                     str(self.src[src_name]["cue_video_paths"][stimulus_id])]
-                self.video_client.send_message("/video/play", msg_contents)
-
-
-        # pause
-        time.sleep(self.cue_duration)
-
+                cue_phase.add(self.video_client, "/video/play", msg_contents)
 
         # present stimuli - all videos then all audio
         for src_name in self.src:
@@ -424,23 +489,82 @@ class TargetSpeechTwoMaskers(ListeningEffortPlayerAndTascarUsingOSCBase):
                 msg_contents = [
                     self.src[src_name]["video_id"],
                     str(self.src[src_name]["video_paths"][stimulus_id])]
-                self.video_client.send_message("/video/play", msg_contents)
+                video_phase.add(self.video_client, "/video/play",
+                                msg_contents)
 
-        # - audio after a short pause to get lip sync right
-        time.sleep(0.15)
-
-        # loop over maskers and target(s) separately to allow for different gains
+        # loop over maskers and target(s) separately to allow for different
+        # gains, which are set on each trial
         for src_name in self.masker_names:
             msg_address = f'/{self.src[src_name]["tascar_source"]}/{stimulus_id+1}/add'
-            msg_contents = [1, self.masker_linear_gain]  # loop_count, linear_gain
-            print(msg_address)
-            self.src[src_name]["sampler_client"].send_message(msg_address, msg_contents)
+            msg_contents = [1, 1.0]  # loop_count, linear_gain
+            audio_phase.add(self.src[src_name]["sampler_client"],
+                            msg_address, msg_contents,
+                            variable='masker_gain')
 
         for src_name in self.target_names:
             msg_address = f'/{self.src[src_name]["tascar_source"]}/{stimulus_id+1}/add'
-            msg_contents = [1, self.target_linear_gain]  # loop_count, linear_gain
-            print(msg_address)
-            self.src[src_name]["sampler_client"].send_message(msg_address, msg_contents)
+            msg_contents = [1, 1.0]  # loop_count, linear_gain
+            audio_phase.add(self.src[src_name]["sampler_client"],
+                            msg_address, msg_contents,
+                            variable='target_gain')
+
+        return {'cue': cue_phase.compile(),
+                'video': video_phase.compile(),
+                'audio': audio_phase.compile()}
+
+    def present_trial(self, stimulus_id):
+        # print('Entered present_trial() with stimulus: ' + str(stimulus_id))
+        if stimulus_id not in self.plan:
+            # beyond the stimuli known when the config was loaded
+            self.plan[stimulus_id] = self.compile_trial(stimulus_id)
+        phases = self.plan[stimulus_id]
+        phases['audio'].set('masker_gain', self.masker_linear_gain)
+        phases['audio'].set('target_gain', self.target_linear_gain)
+
+        # cue, then the pause, then videos and, after a short pause to get
+        # lip sync right, audio
+        self.send_phases([('cue', 0., phases['cue']),
+                          ('video', self.cue_duration, phases['video']),
+                          ('audio', self.cue_duration + self.audio_delay,
+                           phases['audio'])])
+
+    def send_phases(self, phases):
+        """
+        Send the bundles of each phase of a trial
+
+        phases is a list of (name, offset in seconds from the start of the
+        trial, CompiledPhase or BundleCollector), in time order. The
+        deadlines are fixed when this is called and the scheduler records
+        when each phase was actually sent: on time or late when sent phase
+        by phase, and ahead of its deadline when scheduled ahead.
+        Returns once the last phase is due.
+        """
+        self.scheduler.start()
+        start_wall = time.time()  # timetags are system time
+        if self.osc_schedule_ahead is None:
+            for name, offset, bundle in phases:
+                self.scheduler.wait_until(name, offset, bundle.send)
+        else:
+            for name, offset, bundle in phases:
+                due = self.osc_schedule_ahead + offset
+                bundle.send(start_wall + due)
+                self.scheduler.record(name, due)
+            # return when the stimulus starts, as when sent phase by phase
+            name, offset, bundle = phases[-1]
+            self.scheduler.wait(self.osc_schedule_ahead + offset)
+
+    def get_trial_record(self):
+        """
+        Intended and actual send times of the phases of the latest trial
+
+        When scheduled ahead the errors are negative: how long before its
+        execution time each phase was sent.
+        """
+        return self.scheduler.summary()
+
+    def trial_record_fields(self):
+        return util.DeadlineScheduler.summary_fields(['cue', 'video',
+                                                      'audio'])
 
     def present_preparatory_content(self):
         """
@@ -460,13 +584,15 @@ class TargetSpeechTwoMaskers(ListeningEffortPlayerAndTascarUsingOSCBase):
             prep_video_path = self.prep_video_config["path"]
             duration = self.prep_video_config["duration"]
 
+            self.scheduler.start()
             position = self.get_position_from_location(location)
             self.src[src_name]["interface"].set_position(position)
-            time.sleep(0.1) # give TASCAR time to update position
+            # give TASCAR time to update position
+            self.scheduler.wait_until('preparatory_video', 0.1)
 
             msg_contents = [
                 self.src[src_name]["video_id"],
                 prep_video_path]
             self.video_client.send_message("/video/play", msg_contents)
 
-            time.sleep(duration)
+            self.scheduler.wait_until('preparatory_end', 0.1 + duration)
@@ -0,0 +1,218 @@
+"""
+Validated list of media files, cached so an unchanged corpus is checked
+almost instantly.
+
+A media list is a text file with one path per line (e.g. the target videos
+of each stimulus). Every path must be an existing file. The paths are
+checked concurrently on a thread pool, which matters on network shares where
+each check is a round trip.
+
+The result is cached in a sidecar (<list file>.manifest.json) which records
+the SHA-256 of the list file and the mtime of every directory holding the
+files, and of the directory each symlinked file points into. Next time, if
+the list file is unchanged, only those directories are checked: a file can't
+be removed, renamed or added without changing its directory's mtime, so only
+the files in directories which changed (and in the list file's own
+directory, whose mtime changes when the sidecar is written) are checked
+again.
+
+Only existence is validated. A file overwritten in place doesn't change its
+directory, so sizes and contents are not tracked. A directory mtime within
+racy_window_ns of the check isn't trusted, as a change in the same tick of
+a coarse filesystem clock wouldn't show, so that directory is checked again
+next time.
+"""
+import concurrent.futures
+import errno
+import hashlib
+import json
+import os
+import pathlib
+import stat
+import tempfile
+import time
+
+
+def _check(path):
+    """
+    None if path isn't a regular file (following symlinks), otherwise the
+    directory the file is really in if that isn't where it is listed, or ''
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    target_dir = os.path.dirname(os.path.realpath(path))
+    if target_dir == os.path.realpath(os.path.dirname(path) or '.'):
+        return ''
+    return target_dir
+
+
+def _dir_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class MediaManifest():
+    """Paths in a media list, all of which were existing files"""
+    sidecar_suffix = '.manifest.json'
+    format_version = 2
+    racy_window_ns = 2 * 10**9  # FAT has 2 s mtime resolution
+
+    def __init__(self, paths, link_dirs, dir_mtimes, sha256=''):
+        """
+        Use from_file() rather than calling this directly
+
+        Parameters
+        ----------
+        paths : list of pathlib.Path
+            In the order of the list file
+        link_dirs : dict
+            str(path): directory of the file it points to, for symlinks
+        dir_mtimes : dict
+            str(directory): mtime_ns (None to check again next time), for
+            the directory of every path and every value of link_dirs
+        sha256 : str, optional
+            Hash of the list file
+        """
+        self.paths = paths
+        self.link_dirs = link_dirs
+        self.dir_mtimes = dir_mtimes
+        self.sha256 = sha256
+        self.num_checked = len(paths)  # files stat'ed when it was built
+
+    @classmethod
+    def from_file(cls, list_path, cache=True, max_workers=16):
+        """
+        Read a media list and check that every file exists
+
+        Parameters
+        ----------
+        list_path : str or pathlib.Path
+        cache : bool, optional
+            Read and write the sidecar file. If it can't be written the
+            manifest is just built in memory.
+        max_workers : int, optional
+            Threads used to check the files. The default is 16.
+
+        Raises
+        ------
+        FileNotFoundError
+            If any file in the list is missing (all of them are printed)
+        """
+        list_path = pathlib.Path(list_path)
+        data = list_path.read_bytes()
+        sha256 = hashlib.sha256(data).hexdigest()
+        paths = [pathlib.Path(line.rstrip())
+                 for line in data.decode('utf-8').splitlines()]
+
+        sidecar_path = cls.sidecar_path(list_path)
+        cached = cls.load_sidecar(sidecar_path, sha256) if cache else None
+        link_dirs = {} if cached is None else dict(cached.link_dirs)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as pool:
+            # directory mtimes are taken before the files are checked so a
+            # change while checking is picked up next time
+            checked_at_ns = time.time_ns()
+            directories = list(dict.fromkeys(
+                [str(path.parent) for path in paths]
+                + list(link_dirs.values())))
+            dir_mtimes = dict(zip(directories,
+                                  pool.map(_dir_mtime, directories)))
+            if cached is None:
+                to_check = list(dict.fromkeys(str(path) for path in paths))
+            else:
+                # writing the sidecar changes the mtime of its own
+                # directory, so files there are always checked
+                sidecar_dir = os.path.abspath(sidecar_path.parent)
+                changed = {directory for directory in directories
+                           if dir_mtimes[directory] is None
+                           or dir_mtimes[directory]
+                           != cached.dir_mtimes.get(directory)
+                           or os.path.abspath(directory) == sidecar_dir}
+                to_check = list(dict.fromkeys(
+                    str(path) for path in paths
+                    if str(path.parent) in changed
+                    or link_dirs.get(str(path)) in changed))
+            results = list(pool.map(_check, to_check))
+
+        missing = []
+        for path, result in zip(to_check, results):
+            if result is None:
+                missing.append(path)
+            elif result:
+                link_dirs[path] = result
+            else:
+                link_dirs.pop(path, None)
+        if missing:
+            print(f'{len(missing)} files listed in {list_path} are missing:')
+            for path in missing:
+                print('  ' + path)
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT),
+                                    missing[0])
+
+        # a directory found by following a new symlink wasn't read before
+        # its files were checked, so it is checked again next time
+        watched = dict.fromkeys([str(path.parent) for path in paths]
+                                + list(link_dirs.values()))
+        dir_mtimes = {directory: (None if dir_mtimes.get(directory) is None
+                                  or dir_mtimes[directory]
+                                  > checked_at_ns - cls.racy_window_ns
+                                  else dir_mtimes[directory])
+                      for directory in watched}
+
+        manifest = cls(paths, link_dirs, dir_mtimes, sha256)
+        manifest.num_checked = len(to_check)
+        if cache and (cached is None or to_check):
+            try:
+                manifest.save_sidecar(sidecar_path)
+            except OSError as err:
+                print(f'Could not cache media manifest {sidecar_path}: {err}')
+        return manifest
+
+    @classmethod
+    def sidecar_path(cls, list_path):
+        list_path = pathlib.Path(list_path)
+        return list_path.with_name(list_path.name + cls.sidecar_suffix)
+
+    @classmethod
+    def load_sidecar(cls, sidecar_path, sha256):
+        """
+        Load a cached manifest, or return None if it is missing, unreadable
+        or was built from a different list
+        """
+        try:
+            with open(sidecar_path) as f:
+                data = json.load(f)
+            if (data['format_version'] != cls.format_version
+                    or data['sha256'] != sha256):
+                return None
+            return cls([], dict(data['link_dirs']),
+                       dict(data['dir_mtimes']), sha256)
+        except (OSError, KeyError, TypeError, ValueError):
+            return None
+
+    def save_sidecar(self, sidecar_path):
+        """Write the manifest atomically so readers never see a partial
+        file"""
+        sidecar_path = pathlib.Path(sidecar_path)
+        fd, tmp_path = tempfile.mkstemp(dir=sidecar_path.parent,
+                                        prefix=sidecar_path.name,
+                                        suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'format_version': self.format_version,
+                           'sha256': self.sha256,
+                           'link_dirs': self.link_dirs,
+                           'dir_mtimes': self.dir_mtimes}, f)
+            os.replace(tmp_path, sidecar_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def __len__(self):
+        return len(self.paths)
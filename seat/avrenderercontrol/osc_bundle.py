@@ -0,0 +1,164 @@
+"""
+Collect OSC messages into timetagged bundles, one datagram per destination.
+
+A trial is presented in phases (e.g. positions and cues, then videos, then
+audio). All the messages of a phase are added to a BundleCollector and sent
+together: each destination (host, port) gets a single OSC bundle whose
+timetag says when the receiver should execute its contents. Messages in a
+bundle are applied atomically, so there is no send-order jitter between
+sources, and far fewer packets are sent.
+
+A BundleCollector can also be compiled once, ahead of time, into a
+CompiledPhase holding the encoded bundle contents. Sending it only prepends
+the bundle header and timetag, and any per-trial values (e.g. a gain set by
+the probe level) are written into the encoded buffer in place.
+"""
+from collections.abc import Iterable
+import struct
+
+from pythonosc import osc_bundle_builder
+from pythonosc.osc_message_builder import OscMessageBuilder
+from pythonosc.parsing import osc_types
+
+# timetag meaning "execute on arrival"
+IMMEDIATELY = osc_bundle_builder.IMMEDIATELY
+
+BUNDLE_HEADER = b'#bundle\x00'
+
+
+def build_message(address, value):
+    """Build an OscMessage the same way as SimpleUDPClient.send_message"""
+    builder = OscMessageBuilder(address=address)
+    if value is None:
+        pass
+    elif not isinstance(value, Iterable) or isinstance(value, (str, bytes)):
+        builder.add_arg(value)
+    else:
+        for val in value:
+            builder.add_arg(val)
+    return builder.build()
+
+
+def destination(client):
+    """(host, port) a pythonosc UDP client sends to"""
+    return (client._address, client._port)
+
+
+class BundleCollector:
+    """
+    Messages for one phase of a trial, grouped by destination
+
+    Clients which send to the same host and port share a bundle. The order
+    of the messages within each bundle is the order they were added.
+    """
+
+    def __init__(self):
+        # destination: (client, messages, variables)
+        self._bundles = {}
+
+    def add(self, client, address, value, variable=None):
+        """
+        Queue a message to be sent by client (arguments as for
+        SimpleUDPClient.send_message)
+
+        If variable is given the last argument must be a float. It is a
+        placeholder whose value is set before each send with
+        CompiledPhase.set(variable, value).
+        """
+        message = build_message(address, value)
+        if variable is not None and not (
+                message.params and isinstance(message.params[-1], float)):
+            raise ValueError(f'The last argument of {address} must be a '
+                             f'float to be set as {variable}')
+        key = destination(client)
+        if key not in self._bundles:
+            self._bundles[key] = (client, [], [])
+        self._bundles[key][1].append(message)
+        self._bundles[key][2].append(variable)
+
+    def __len__(self):
+        """Number of messages queued"""
+        return sum(len(messages) for _, messages, _ in self._bundles.values())
+
+    @property
+    def destinations(self):
+        return list(self._bundles)
+
+    def compile(self):
+        """Encode the queued messages as a CompiledPhase"""
+        packets = []
+        for client, messages, variables in self._bundles.values():
+            contents = bytearray()
+            offsets = {}
+            for message, variable in zip(messages, variables):
+                contents += osc_types.write_int(message.size)
+                contents += message.dgram
+                if variable is not None:
+                    # the float is the last 4 bytes of the message
+                    offsets.setdefault(variable, []).append(len(contents) - 4)
+            packets.append((client, contents, offsets))
+        return CompiledPhase(packets, len(self))
+
+    def send(self, timetag=IMMEDIATELY):
+        """
+        Send one bundle per destination and clear the queue
+
+        See CompiledPhase.send
+        """
+        num_sent = self.compile().send(timetag)
+        self._bundles = {}
+        return num_sent
+
+
+class CompiledPhase:
+    """
+    Encoded bundle contents for one phase, one per destination
+
+    Built by BundleCollector.compile(). Sending doesn't encode anything
+    except the timetag.
+    """
+    __slots__ = ('packets', 'num_messages')
+
+    def __init__(self, packets, num_messages):
+        # (client, bytearray of bundle elements, {variable: [offsets]})
+        self.packets = packets
+        self.num_messages = num_messages
+
+    @property
+    def destinations(self):
+        return [destination(client) for client, _, _ in self.packets]
+
+    @property
+    def num_bytes(self):
+        """Total size of the datagrams, headers included"""
+        return sum(len(BUNDLE_HEADER) + 8 + len(contents)
+                   for _, contents, _ in self.packets)
+
+    def set(self, variable, value):
+        """Set the placeholder argument(s) named variable"""
+        encoded = struct.pack('>f', value)
+        for _, contents, offsets in self.packets:
+            for offset in offsets.get(variable, ()):
+                contents[offset:offset + 4] = encoded
+
+    def send(self, timetag=IMMEDIATELY):
+        """
+        Send one bundle per destination
+
+        Parameters
+        ----------
+        timetag : float, optional
+            When the receivers should execute the messages, as system time
+            (seconds since the epoch, i.e. time.time()). The default,
+            IMMEDIATELY, executes them on arrival.
+
+        Returns
+        -------
+        int.
+            Number of datagrams sent
+        """
+        header = BUNDLE_HEADER + osc_types.write_date(timetag)
+        for client, contents, _ in self.packets:
+            client._sock.sendto(header + contents,
+                                (client._address, client._port))
+        return len(self.packets)
@@ -15,11 +15,20 @@ import sys
 class Dummy(avrc.AVRendererControl):
     """
     Class to satisfy requirements of the abstract base class
+
+    Other components (e.g. a simulated listener) can follow the probe level
+    with add_probe_level_listener(). Set verbosity to 0 to silence the
+    console feedback, e.g. for load testing.
     """
     def __init__(self, config):
         # app_name = 'DummyAVRC'
       #   self.moduleConfig = confuse.Configuration(app_name, __name__)
         self.state = avrc.AVRCState.INIT
+        self.probe_level = None
+        self.probe_level_listeners = []
+        self.verbosity = 1
+        if (config is not None) and ("verbosity" in config):
+            self.verbosity = config["verbosity"]
         #
         # # carry on and do the congiguration
         if config is not None:
@@ -36,7 +45,8 @@ class Dummy(avrc.AVRendererControl):
 
 
     def load_config(self, config):
-        print('Dummy.load_config called')
+        if self.verbosity > 0:
+            print('Dummy.load_config called')
         self.state = avrc.AVRCState.CONFIGURED
 
         # carry on do the setup
@@ -58,11 +68,20 @@ class Dummy(avrc.AVRendererControl):
             raise RuntimeError('Cannot call setup() before it has been '
                                'configured')
 
+    def add_probe_level_listener(self, callback):
+        """Call callback(probe_level) whenever the probe level is set"""
+        self.probe_level_listeners.append(callback)
+
     def set_probe_level(self, probe_level):
-        print('Dummy.set_probe_level called')
+        if self.verbosity > 0:
+            print('Dummy.set_probe_level called')
+        self.probe_level = probe_level
+        for callback in self.probe_level_listeners:
+            callback(probe_level)
 
     def present_trial(self, stimulus_id):
-        print('Dummy.present_trial called')
+        if self.verbosity > 0:
+            print('Dummy.present_trial called')
 
 
     def start_scene(self):
@@ -9,6 +9,7 @@ import traceback
 import yaml
 
 import jacktripcontrol
+from responsemode.response_input import ResponseInput
 import seat
 import util
 
@@ -39,6 +40,8 @@ class ExperimentBlockSelector():
         self.key_config_text = "-config-"
         self.key_run_button = "-run-"
         self.key_jtc_button = "-jtc-"
+        self.key_refresh_event = "-refresh-"
+        self.key_jtc_state_event = "-jtc-state-"
 
         # conditions as a separate thing for readability
         self.condition_keys = self.df.columns
@@ -77,22 +80,35 @@ class ExperimentBlockSelector():
                                     return_keyboard_events=True,
                                     # use_default_focus=False,
                                     finalize=True)
+        # events are read with a blocking read - changes which need the
+        # window's values to be re-read post an event instead of polling
+        response_input = ResponseInput(self.window)
         if jtc is not None:
             self.window[self.key_jtc_button].update(disabled=False)
-            jtc.start(raise_error=True,
-                      connect_mode=jacktripcontrol.ConnectMode.NON_BLOCKING)
             jtc_colors = {jacktripcontrol.State.DISCONNECTED: 'red',
                           jacktripcontrol.State.STARTING: 'orange',
                           jacktripcontrol.State.CONNECTED: 'green'}
+            # jtc changes state in its own thread, post() is thread-safe
+            jtc.add_state_listener(lambda state: response_input.post(
+                self.key_jtc_state_event, state))
+            jtc.start(raise_error=True,
+                      connect_mode=jacktripcontrol.ConnectMode.NON_BLOCKING)
+            self.window[self.key_jtc_button].update(
+                button_color=('black', jtc_colors[jtc.state]))
 
-        requires_refresh = False
         while True:             # Event Loop
-            event, values = self.window.Read(timeout=50)
+            event, values, _ = response_input.read()
             # print(event, values)
             if event == sg.WIN_CLOSED:
+                response_input.cancel_all()
+                if jtc is not None:
+                    jtc.remove_state_listeners()
                 self.window.close()
                 return
-            elif (event == "__TIMEOUT__") & requires_refresh:
+            elif event == self.key_jtc_state_event:
+                self.window[self.key_jtc_button].update(
+                    button_color=('black', jtc_colors[values[event]]))
+            elif event == self.key_refresh_event:
                 # get the currently selected options
                 subject_id = values[self.key_subject_combo]
                 block_id = values[self.key_block_listbox][0]
@@ -117,9 +133,6 @@ class ExperimentBlockSelector():
                     for key in self.condition_keys:
                         self.window[key].update(value=self.df[key].iloc[idx].item())
 
-                # reset flag
-                requires_refresh = False
-
             elif event == self.key_subject_combo:
                 # print(values)
                 subject_id = values[self.key_subject_combo]
@@ -129,9 +142,9 @@ class ExperimentBlockSelector():
                 # reset the rest of the UI's displayed values and request a refresh
                 # this way we can read from `values` returned by window.read()
                 self.reset_block_selection()
-                requires_refresh = True
+                response_input.post(self.key_refresh_event)
             elif event == self.key_block_listbox:
-                requires_refresh = True
+                response_input.post(self.key_refresh_event)
 
             elif event == self.key_jtc_button:
                 # this can only happen if button is enabled
@@ -201,21 +214,15 @@ class ExperimentBlockSelector():
                             # finished last block
                             print(f'That was the last block')
                             self.reset_block_selection()
-                            requires_refresh = True
+                            response_input.post(self.key_refresh_event)
                             sg.popup_ok(f'That was the last block.',title='Done!')
                         else:
                             self.window[self.key_block_listbox].update(set_to_index=current_index)
                             self.window.refresh()
                             block_id = self.window[self.key_block_listbox].get()[0]
                             print(f'Selecting next block... block_id: {block_id}')
-                            requires_refresh = True
-
-
-
+                            response_input.post(self.key_refresh_event)
 
-            # update gui
-            if jtc is not None:
-                self.window[self.key_jtc_button].update(button_color=('black',jtc_colors[jtc.state]))
 
     def reset_block_selection(self):
         # print('reset_block_selection() was called')
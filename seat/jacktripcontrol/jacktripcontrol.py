@@ -60,6 +60,7 @@ class JackTripControl:
         self.wsl_ip = self.get_wsl_ip_address()
         self.lp = None
         self.state = State.DISCONNECTED
+        self.state_listeners = []
 
         # for seat, we need to know the IP address. Storing it as an
         # environment variable was quite unreliable so instead store it in a
@@ -103,6 +104,19 @@ class JackTripControl:
     def set_state(self, state):
         self.state = state
         # print(f'State set to {self.state}')
+        for callback in self.state_listeners:
+            callback(state)
+
+    def add_state_listener(self, callback):
+        """
+        Call callback(state) whenever the state changes
+
+        N.B. it may be called from the thread which waits for the connection
+        """
+        self.state_listeners.append(callback)
+
+    def remove_state_listeners(self):
+        self.state_listeners = []
 
 
     def get_commands(self):
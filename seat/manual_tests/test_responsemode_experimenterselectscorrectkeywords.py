@@ -22,3 +22,5 @@ if __name__ == '__main__':
 
     response_mode.show_prompt(2)
     response_mode.wait()
+
+    response_mode.close()
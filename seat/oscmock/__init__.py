@@ -0,0 +1,2 @@
+from .servers import MockRenderers, MockUnity, MockTascar, MockSampler
+from .tascar_cli import MockTascarCli
@@ -0,0 +1,37 @@
+"""
+Run the mock renderers until interrupted, e.g.
+
+    python -m oscmock --sampler-ports 9001 9003 9005 --log osc_log.csv
+
+then summarise the log with python -m oscmock.report osc_log.csv
+"""
+import argparse
+import threading
+
+from .servers import MockRenderers
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Stand-ins for Unity, TASCAR and tascar_sampler')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--unity-port', type=int, default=7000)
+    parser.add_argument('--tascar-port', type=int, default=9877)
+    parser.add_argument('--sampler-ports', type=int, nargs='*', default=[])
+    parser.add_argument('--log', help='record every message to this file')
+    parser.add_argument('-v', '--verbosity', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    with MockRenderers(host=args.host, unity_port=args.unity_port,
+                       tascar_port=args.tascar_port,
+                       sampler_ports=args.sampler_ports,
+                       log_path=args.log, verbosity=args.verbosity):
+        print('Press Ctrl-C to stop')
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Latency and jitter of the messages recorded by oscmock
+
+    python -m oscmock.report osc_log.csv [--pair FROM TO ...]
+
+Messages are identified as "<server>:<address>" and matched with
+fnmatch-style patterns, e.g. "unity:/video/play" or "sampler*:/*/add".
+
+- pairs: for every message matching TO, the time since the latest message
+  matching FROM. The spread of these is the jitter, e.g. of the
+  video-to-audio offset from trial to trial.
+- bursts: messages closer together than burst_gap_ms are one burst (e.g. a
+  trial phase). Their spread is the send-order jitter within a phase.
+- timetag lateness: how long after its timetag a bundle arrived (negative
+  when it was scheduled ahead).
+"""
+import argparse
+import fnmatch
+import math
+
+import numpy as np
+
+import seatlog
+
+# (from, to): target video to audio, and tascar to unity source position
+DEFAULT_PAIRS = [('unity:/video/play', 'sampler*:*/add'),
+                 ('tascar:*/pos', 'unity:/video/position')]
+
+
+def load_log(log_path):
+    """A log written by MockRenderers as a list of records"""
+    return seatlog.read_records(log_path).to_dict('records')
+
+
+def stats_ms(values_ms):
+    """Summary statistics of a list of times in milliseconds"""
+    values = np.asarray(values_ms, dtype=np.float64)
+    if values.size == 0:
+        return {'n': 0, 'mean_ms': math.nan, 'jitter_ms': math.nan,
+                'min_ms': math.nan, 'p95_ms': math.nan, 'max_ms': math.nan}
+    return {'n': int(values.size),
+            'mean_ms': float(values.mean()),
+            'jitter_ms': float(values.std()),  # standard deviation
+            'min_ms': float(values.min()),
+            'p95_ms': float(np.percentile(values, 95)),
+            'max_ms': float(values.max())}
+
+
+def pair_latencies_ms(records, from_pattern, to_pattern):
+    """Time from the latest from_pattern message to each to_pattern one"""
+    latencies = []
+    last_from_ns = None
+    for record in sorted(records, key=lambda r: r['recv_ns']):
+        key = f"{record['server']}:{record['address']}"
+        # checked first so a message matching both measures from the one
+        # before
+        if fnmatch.fnmatchcase(key, to_pattern) and last_from_ns is not None:
+            latencies.append((record['recv_ns'] - last_from_ns) / 1e6)
+        if fnmatch.fnmatchcase(key, from_pattern):
+            last_from_ns = record['recv_ns']
+    return latencies
+
+
+def bursts(records, burst_gap_ms=5.):
+    """Group the records into bursts separated by more than burst_gap_ms"""
+    groups = []
+    gap_ns = burst_gap_ms * 1e6
+    for record in sorted(records, key=lambda r: r['recv_ns']):
+        if groups and record['recv_ns'] - groups[-1][-1]['recv_ns'] <= gap_ns:
+            groups[-1].append(record)
+        else:
+            groups.append([record])
+    return groups
+
+
+def summarise(records, pairs=DEFAULT_PAIRS, burst_gap_ms=5.):
+    """
+    Returns
+    -------
+    dict.
+        num_messages, num_datagrams, num_unknown, pairs (a dict of
+        "FROM -> TO": stats), burst_spread and timetag_lateness (stats as
+        returned by stats_ms) and datagrams_per_burst (a list)
+    """
+    groups = bursts(records, burst_gap_ms)
+    lateness = [(record['recv_time'] - record['timetag']) * 1e3
+                for record in records if not math.isnan(record['timetag'])]
+    return {
+        'num_messages': len(records),
+        'num_datagrams': len({record['datagram'] for record in records}),
+        'num_unknown': sum(not record['known'] for record in records),
+        'pairs': {f'{from_pattern} -> {to_pattern}':
+                  stats_ms(pair_latencies_ms(records, from_pattern,
+                                             to_pattern))
+                  for from_pattern, to_pattern in pairs},
+        'burst_spread': stats_ms(
+            [(group[-1]['recv_ns'] - group[0]['recv_ns']) / 1e6
+             for group in groups]),
+        'datagrams_per_burst': [len({record['datagram'] for record in group})
+                                for group in groups],
+        'timetag_lateness': stats_ms(lateness)}
+
+
+def format_summary(summary):
+    def line(name, stats):
+        if stats['n'] == 0:
+            return f'{name}: none'
+        return (f"{name}: n={stats['n']} mean={stats['mean_ms']:.3f} "
+                f"jitter={stats['jitter_ms']:.3f} min={stats['min_ms']:.3f} "
+                f"p95={stats['p95_ms']:.3f} max={stats['max_ms']:.3f} ms")
+
+    lines = [f"{summary['num_messages']} messages in "
+             f"{summary['num_datagrams']} datagrams, "
+             f"{summary['num_unknown']} unknown"]
+    for name, stats in summary['pairs'].items():
+        lines.append(line(name, stats))
+    lines.append(line('burst spread', summary['burst_spread']))
+    counts = summary['datagrams_per_burst']
+    if counts:
+        lines.append(f"datagrams per burst: mean={np.mean(counts):.2f} "
+                     f"max={max(counts)}")
+    lines.append(line('timetag lateness', summary['timetag_lateness']))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Latency and jitter of an oscmock log')
+    parser.add_argument('log_path')
+    parser.add_argument('--pair', nargs=2, action='append',
+                        metavar=('FROM', 'TO'),
+                        help='server:address patterns (default: video play '
+                             'to sampler add, tascar to unity position)')
+    parser.add_argument('--burst-gap-ms', type=float, default=5.)
+    args = parser.parse_args(argv)
+    summary = summarise(load_log(args.log_path),
+                        pairs=args.pair or DEFAULT_PAIRS,
+                        burst_gap_ms=args.burst_gap_ms)
+    print(format_summary(summary))
+
+
+if __name__ == '__main__':
+    main()
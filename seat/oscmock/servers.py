@@ -0,0 +1,295 @@
+"""
+Stand-ins for the OSC servers of the renderers, so a renderer can be tested
+and benchmarked without Unity or TASCAR.
+
+- MockUnity: the Unity video player (/video/play, /video/position,
+  /set_client_address)
+- MockTascar: tascar_cli (/transport/*, /<scene>/<source>/pos)
+- MockSampler: tascar_sampler (/<source>/<n>/add)
+
+MockRenderers runs them on one asyncio event loop in a background thread.
+Each datagram is stamped with time.perf_counter_ns() as soon as it is
+received. Every message in it is recorded with that time and the timetag of
+its bundle, to MockRenderers.records and optionally to a RecordWriter log
+which oscmock.report summarises.
+"""
+import asyncio
+import json
+import math
+import re
+import threading
+import time
+
+from pythonosc.osc_bundle import OscBundle
+from pythonosc.osc_message import OscMessage
+from pythonosc.parsing.osc_types import ParseError
+
+import seatlog
+
+# one row per message
+LOG_SCHEMA = {'datagram': 'int64',  # messages from the same datagram share it
+              'server': 'str',
+              'recv_ns': 'int64',  # time.perf_counter_ns()
+              'recv_time': 'float64',  # time.time(), to compare with timetag
+              'timetag': 'float64',  # NaN if to be executed on arrival
+              'address': 'str',
+              'args': 'str',  # JSON
+              'known': 'bool',  # whether the real server would accept it
+              'n_bytes': 'int64'}  # size of the datagram
+
+
+def parse_datagram(dgram):
+    """
+    Messages in a datagram as a list of (timetag, OscMessage)
+
+    timetag is the system time of the enclosing bundle or NaN for a plain
+    message or a bundle to be executed immediately
+    """
+    if OscBundle.dgram_is_bundle(dgram):
+        return list(_bundle_messages(OscBundle(dgram)))
+    return [(math.nan, OscMessage(dgram))]
+
+
+def _bundle_messages(bundle):
+    # a timestamp of 0 is IMMEDIATELY
+    timetag = bundle.timestamp if bundle.timestamp else math.nan
+    for content in bundle:
+        if isinstance(content, OscBundle):
+            yield from _bundle_messages(content)
+        else:
+            yield timetag, content
+
+
+class MockOSCServer(asyncio.DatagramProtocol):
+    """
+    Base class for the stand-ins
+
+    Subclasses implement handle(), which updates the server's state and
+    returns whether the address is one the real server understands.
+    """
+    kind = 'osc'
+
+    def __init__(self, port, name=None):
+        self.port = port  # 0 picks a free port when started
+        self.name = name
+        self.transport = None
+        self.on_datagram = None  # set by MockRenderers
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        recv_ns = time.perf_counter_ns()
+        recv_time = time.time()
+        self.on_datagram(self, data, recv_ns, recv_time)
+
+    def handle(self, address, params):
+        return False
+
+
+class MockUnity(MockOSCServer):
+    """The Unity video player"""
+    kind = 'unity'
+
+    def __init__(self, port=7000, name=None):
+        super().__init__(port, name)
+        self.playing = {}  # video_id: path
+        self.positions = {}  # video_id: rotation and quad arguments
+        self.client_address = None  # where head rotations would be sent
+
+    def handle(self, address, params):
+        if address == '/video/play':
+            video_id, path = params
+            self.playing[video_id] = path
+        elif address == '/video/position':
+            self.positions[params[0]] = tuple(params[1:])
+        elif address == '/set_client_address':
+            ip_address, port = params
+            self.client_address = (ip_address, port)
+        else:
+            return False
+        return True
+
+
+class MockTascar(MockOSCServer):
+    """tascar_cli's OSC server"""
+    kind = 'tascar'
+
+    def __init__(self, port=9877, name=None):
+        super().__init__(port, name)
+        self.rolling = False
+        self.transport_time = 0.
+        self.positions = {}  # /<scene>/<source>: (x, y, z)
+
+    def handle(self, address, params):
+        if address == '/transport/start':
+            self.rolling = True
+        elif address == '/transport/stop':
+            self.rolling = False
+        elif address == '/transport/locate':
+            self.transport_time = float(params[0])
+        elif re.fullmatch(r'/[^/]+/[^/]+/pos', address) and len(params) == 3:
+            self.positions[address[:-len('/pos')]] = tuple(params)
+        else:
+            return False
+        return True
+
+
+class MockSampler(MockOSCServer):
+    """tascar_sampler, with any number of sources and sounds"""
+    kind = 'sampler'
+
+    def __init__(self, port, name=None):
+        super().__init__(port, name)
+        self.triggers = []  # (source, sound number, loop_count, gain)
+
+    def handle(self, address, params):
+        match = re.fullmatch(r'/([^/]+)/(\d+)/add', address)
+        if match is None:
+            return False
+        loop_count, gain = params
+        self.triggers.append((match[1], int(match[2]), loop_count, gain))
+        return True
+
+
+class MockRenderers:
+    """
+    Runs stand-ins for Unity, TASCAR and the samplers on a background thread
+
+    Use as a context manager, or call start() and stop(). Ports given as 0
+    are chosen by the OS and can be read from the servers once started.
+    """
+
+    def __init__(self, host='127.0.0.1', unity_port=7000, tascar_port=9877,
+                 sampler_ports=(), log_path=None, verbosity=1):
+        """
+        Parameters
+        ----------
+        log_path : str or pathlib.Path, optional
+            Record every message to this file (see LOG_SCHEMA). It must not
+            exist already.
+        verbosity : int, optional
+            0 for silence, 1 to report unknown messages, 2 for every message
+        """
+        self.host = host
+        self.unity = MockUnity(unity_port)
+        self.tascar = MockTascar(tascar_port)
+        self.samplers = [MockSampler(port) for port in sampler_ports]
+        self.servers = [self.unity, self.tascar, *self.samplers]
+        self.verbosity = verbosity
+        self.log_path = log_path
+        self.log_writer = None
+
+        self.records = []
+        self._num_datagrams = 0
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, daemon=True,
+                                       name='oscmock')
+        self._started = threading.Event()
+        self._startup_error = None
+
+    # implement conext manager magic
+    def __enter__(self):
+        self.start()
+        return self
+
+    # implement conext manager magic
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self, timeout=5):
+        if self.log_path is not None:
+            self.log_writer = seatlog.RecordWriter(self.log_path, LOG_SCHEMA)
+        self.thread.start()
+        self._started.wait(timeout)
+        if self._startup_error is not None:
+            self.stop()
+            raise self._startup_error
+        if not self._started.is_set():
+            raise TimeoutError('mock servers did not start')
+        if self.verbosity > 0:
+            for server in self.servers:
+                print(f'Mock {server.kind} listening on '
+                      f'{self.host}:{server.port}')
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            for server in self.servers:
+                server.on_datagram = self._record
+                transport, _ = self.loop.run_until_complete(
+                    self.loop.create_datagram_endpoint(
+                        lambda server=server: server,
+                        local_addr=(self.host, server.port)))
+                server.port = transport.get_extra_info('sockname')[1]
+                if server.name is None:
+                    server.name = (server.kind if server.kind != 'sampler'
+                                   else f'sampler_{server.port}')
+        except OSError as err:
+            self._startup_error = err
+            self._started.set()
+            self._close_transports()
+            self.loop.close()
+            return
+        self._started.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self._close_transports()
+            self.loop.close()
+
+    def _close_transports(self):
+        for server in self.servers:
+            if server.transport is not None:
+                server.transport.close()
+        # let the transports finish closing
+        self.loop.run_until_complete(asyncio.sleep(0))
+
+    def stop(self, timeout=5):
+        """Stop the servers and write the rest of the log"""
+        if self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout)
+        if self.log_writer is not None:
+            self.log_writer.close()
+
+    def _record(self, server, data, recv_ns, recv_time):
+        datagram = self._num_datagrams
+        self._num_datagrams += 1
+        try:
+            messages = parse_datagram(data)
+        except ParseError:
+            messages = [(math.nan, None)]
+        for timetag, message in messages:
+            if message is None:
+                address, params, known = '', [], False
+            else:
+                address, params = message.address, list(message.params)
+                try:
+                    known = server.handle(address, params)
+                except (IndexError, TypeError, ValueError):
+                    known = False  # wrong number or type of arguments
+            record = {'datagram': datagram,
+                      'server': server.name,
+                      'recv_ns': recv_ns,
+                      'recv_time': recv_time,
+                      'timetag': timetag,
+                      'address': address,
+                      'args': json.dumps(params, default=repr),
+                      'known': known,
+                      'n_bytes': len(data)}
+            self.records.append(record)
+            if self.log_writer is not None:
+                self.log_writer.append(record)
+            if self.verbosity > 1 or (self.verbosity > 0 and not known):
+                print(f'{server.name}: {address} {params}'
+                      + ('' if known else ' (unknown)'))
+
+    def wait_for_messages(self, count, timeout=2):
+        """Wait until at least count messages have been recorded"""
+        deadline = time.monotonic() + timeout
+        while len(self.records) < count:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f'Only {len(self.records)} of {count} '
+                                   'messages were received')
+            time.sleep(0.001)
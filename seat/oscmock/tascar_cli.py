@@ -0,0 +1,21 @@
+from avrenderercontrol.tascar_cli import TascarCli
+
+
+class MockTascarCli(TascarCli):
+    """
+    TascarCommandLineInterface for use with oscmock's MockTascar
+
+    Nothing is launched: the mock servers run separately (python -m oscmock
+    or MockRenderers). Optional settings: ip_address ('127.0.0.1') and
+    osc_port (9877), which must match the MockTascar.
+    """
+    def __init__(self, config):
+        super().__init__({"scene_path": config.get("scene_path", "")})
+        self._ip_address = config.get("ip_address", '127.0.0.1')
+        self.osc_port = config.get("osc_port", 9877)
+
+    def start(self):
+        print(f'Using mock tascar at {self.ip_address}:{self.osc_port}')
+
+    def stop(self):
+        pass
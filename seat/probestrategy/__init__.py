@@ -3,5 +3,7 @@ from .fixed_probe_level import FixedProbeLevel
 from .adaptive_track import TargetEightyPercent
 from .adaptive_track import TargetFiftyPercent
 from .adaptive_track import TargetTwentyPercent
+from .adaptive_track import InterleavedAdaptiveTrack
 from .adaptive_track import DualTargetTwentyEightyPercent
+from .quest_plus import QuestPlus
 from .psychometric_function import PsychometricFunction
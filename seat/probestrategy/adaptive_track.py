@@ -1,11 +1,13 @@
 from abc import ABC, abstractmethod
 from .probe_strategy import ProbeStrategy
+from .trial_store import TrialStore
+from . import track_assignment
+from . import plotting
+from . import stopping
 import numpy as np
 import pandas as pd
 import pathlib
-import matplotlib.pyplot as plt
-import seaborn as sns
-import warnings
+import seatlog
 
 
 class AdaptiveTrack(ProbeStrategy, ABC):
@@ -16,16 +18,32 @@ class AdaptiveTrack(ProbeStrategy, ABC):
     Stopping criterion is the lower of a convergence criterion or the
     predetermined maximum number of trials.
     """
+    # the fixed up-down rule in prepare_next_probe() can be vectorised across
+    # simulated listeners - subclasses which change the rule must set False
+    supports_batch_simulation = True
+    # include track_id in the results/log (for interleaved tracks)
+    log_track_id = False
+
     def __init__(self, config):
-        """Deal with common intialsisation in this parent class"""
+        """
+        Deal with common intialsisation in this parent class
+
+        Optional settings for the estimate and stopping early (defaults in
+        brackets):
+            num_reversals_to_discard (2) reversals left out of the estimate
+            stopping_criteria ([]) list of {class, settings} dicts, see
+                probestrategy.stopping
+            stop_when ("any") or "all" of the stopping_criteria
+        """
         self.write_to_log = False
         if "log_path" in config:
             print(config["log_path"])
             self.write_to_log = True
             self.log_path = pathlib.Path(config["log_path"])
-            self.log_path.touch(exist_ok=False)  # do NOT overwrite!
+            # file is created now and held open for the whole track
+            self.log_writer = seatlog.CSVRowWriter.from_config(self.log_path,
+                                                               config)
 
-        
         if "verbosity" in config:
             self.verbosity = config["verbosity"]
         else:
@@ -63,20 +81,41 @@ class AdaptiveTrack(ProbeStrategy, ABC):
             self.save_regression_plot = False
         
         self.num_response_intervals = 5  # TODO set this in config
-        self.results_df = pd.DataFrame(
-            {'trial_id': pd.Series([], dtype='int'),
-             'stimulus_id': pd.Series([], dtype='int'),
-             'target_level': pd.Series([], dtype='float'),
-             'probe_level': pd.Series([], dtype='float'),
-             'success_vector': pd.Series([], dtype='bool'),
-             'num_correct': pd.Series([], dtype='int'),
-             'trial_mean': pd.Series([], dtype='float')})
+        self.trials = TrialStore(self.num_response_intervals,
+                                 include_track_id=self.log_track_id)
+        if self.write_to_log:
+            self.log_writer.set_columns(self.trials.dataframe_columns)
         self.trial_counter = 0
         self.stimulus_id = 0
 
+        # reversals and running estimate, optionally used to stop early
+        self.convergence = stopping.ConvergenceMonitor(
+            config.get("num_reversals_to_discard", 2))
+        self.stopping_criteria, self.stop_when = \
+            stopping.build_stopping_criteria(config)
+        self.converged = False
+        if self.stopping_criteria:
+            # simulate_batch() only runs a fixed number of trials
+            self.supports_batch_simulation = False
+
+        self.plot_thread = None
+        self.live_plot = None
+        if self.display_plot:
+            # started now so the first trial doesn't wait for the process
+            self.live_plot = plotting.LiveProbePlot(config["max_num_trials"])
+
+
+    @property
+    def results_df(self):
+        """DataFrame view of the trials so far (built lazily, read-only)"""
+        return self.trials.to_dataframe()
+
+    def get_track_id(self):
+        """Index of the track which the next trial belongs to"""
+        return 0
 
     def prepare_next_probe(self):
-        num_correct = self.results_df.iloc[-1]["num_correct"]
+        num_correct = self.trials['num_correct'][-1]
         self.probe_level += self.step_size * self.change_vector[num_correct]
         self.trial_counter += 1
         self.stimulus_id += 1
@@ -86,12 +125,33 @@ class AdaptiveTrack(ProbeStrategy, ABC):
         
 
     def get_current_estimate(self):
-        # quick and dirty current estimate is the latest probe level
-        # TODO: use the available data to form estimate
+        """
+        Mean probe level at the reversals (after discarding the first
+        num_reversals_to_discard), or the next probe level until there are
+        any
+        """
+        if self.convergence.num_estimate_reversals > 0:
+            return self.convergence.estimate
         return self.probe_level
 
+    def update_convergence(self, probe_level, step):
+        """Update the monitor and stopping criteria with the latest trial"""
+        self.convergence.update(probe_level, step)
+        if not self.stopping_criteria:
+            return
+        for criterion in self.stopping_criteria:
+            criterion.update(self.convergence)
+        if self.stop_when(criterion.is_met(self.convergence)
+                          for criterion in self.stopping_criteria):
+            self.converged = True
+            if self.verbosity > 0:
+                print(f'Converged after {len(self.trials)} trials: '
+                      f'estimate {self.convergence.estimate:.2f} dB, '
+                      f'SE {self.convergence.standard_error:.2f} dB, '
+                      f'{self.convergence.num_reversals} reversals')
+
     def is_finished(self):
-        if (len(self.results_df) >= self.max_num_trials):
+        if (len(self.trials) >= self.max_num_trials) or self.converged:
             return True
         else:
             return False
@@ -112,89 +172,121 @@ class AdaptiveTrack(ProbeStrategy, ABC):
         if self.verbosity > 2:
             print('result: ' + str(result))
             print('trial_counter: ' + str(self.trial_counter))
-        self.results_df = self.results_df.append({
-            'trial_id': self.trial_counter,
-            'stimulus_id': self.stimulus_id,
-            'target_level': self.target_level,
-            'probe_level': self.probe_level,
-            'success_vector': result,
-            'num_correct': np.sum(result),
-            'trial_mean': np.mean(result)},
-            ignore_index=True)
+        self.trials.append(trial_id=self.trial_counter,
+                           stimulus_id=self.stimulus_id,
+                           target_level=self.target_level,
+                           probe_level=self.probe_level,
+                           success_vector=result,
+                           track_id=self.get_track_id())
         if self.verbosity > 2:
             print(self.results_df)
         if self.verbosity > 3:
-            print(len(self.results_df))
+            print(len(self.trials))
 
         if self.write_to_log:
-            df_to_write = self.results_df.iloc[self.trial_counter:self.trial_counter+1]
-            # n.b. simply picking a single element (as below) doesnt work...
-            # the entries end up as a column
-            # df_to_write = self.results_df.iloc[self.trial_counter]
-            # print(self.trial_counter)
-            write_header = (self.trial_counter == 0)
-            # print(df_to_write.to_csv(index=False,
-            #                    header=write_header,
-            #                    mode='a'))
-            df_to_write.to_csv(self.log_path,
-                               index=False, header=write_header,
-                               mode='a')
-
-        # plot the result
+            row = self.trials.get_row(-1)
+            self.log_writer.write_values(
+                [row[name] for name in self.trials.dataframe_columns])
+
+        # plot the result - only queues the trial for the plotting process
         if self.display_plot:
-            if self.verbosity >= 3:
-                print('plotting probe_level over time')
-            # create fig on first iteration    
-            if len(self.results_df.trial_id)==1:
-                self.fig, self.ax = plt.subplots()
-            self.ax.cla()
-            sns.lineplot(data=self.results_df, x="trial_id", y="probe_level",
-                      ax=self.ax, hue="target_level")
-            # if len(self.results_df.trial_id)==1:
-                # self.line, = self.ax.plot(self.results_df.target_level)
-                # self.ax.set_xlim([0, self.max_num_trials])
-            self.ax.set_xlim([0, self.max_num_trials])
-            if len(self.results_df.trial_id)==1:
-                plt.ion()
-                plt.show()
-            else:
-                # print('trial_id type: ' + str(type(self.results_df.trial_id)))
-                # print('target_level type: ' + str(type(self.results_df.target_level)))
-                # self.line.set_xdata(self.results_df.trial_id)
-                # self.line.set_xdata(self.results_df.target_level)
-                plt.pause(0.1)
-            
-        
-        if not self.is_finished():
+            self.live_plot.update(self.trial_counter, self.probe_level,
+                                  self.target_level)
+
+        if len(self.trials) < self.max_num_trials:
             # work out where to go next, implemented by child class
+            previous_level = self.probe_level
             self.prepare_next_probe()
-        else:
-            if self.save_probe_history_plot:
-                fig, ax = plt.subplots()
-                sns.lineplot(data=self.results_df, x="trial_id", y="probe_level",
-                          ax=ax, hue="target_level")
-                plt.savefig(self.probe_fig_save_path)
-                plt.close(fig)
-            if self.save_regression_plot:
-                # print(self.results_df)
-                
-                probe_level_col = self.results_df.probe_level.values
-                probe_level = np.repeat(probe_level_col, self.num_response_intervals)
-                success = np.ndarray((len(self.results_df), self.num_response_intervals))
-                for i,vector in enumerate(self.results_df.success_vector):
-                    # print(vector)
-                    success[i,:] = vector
-                success = success.flatten()
-                # print(success)
-                # print('success shape: ' + str(np.shape(success)))
-                # print(probe_level)
-                # print('probe_level shape: ' + str(np.shape(probe_level)))                
-                flat_df = pd.DataFrame({"probe_level": probe_level,
-                                        "success": success})
-                sns_plot = sns.lmplot(data=flat_df, x="probe_level", y="success",
-                          logistic=True, x_estimator=np.mean)
-                sns_plot.savefig(self.regression_fig_save_path)
-                
+            self.update_convergence(previous_level,
+                                    self.probe_level - previous_level)
+        if self.is_finished():
+            if self.write_to_log:
+                self.log_writer.close()
+            if self.live_plot is not None:
+                self.live_plot.close()
+            self.save_plots()
+
+    def save_plots(self):
+        """
+        Start rendering the end-of-block figures in a background thread
+
+        The data are copied first so the figures are unaffected by anything
+        which happens afterwards. See wait_for_plots().
+        """
+        jobs = []
+        if self.save_probe_history_plot:
+            jobs.append((plotting.render_probe_history_plot,
+                         (self.results_df.copy(), self.probe_fig_save_path)))
+        if self.save_regression_plot:
+            # one row per response interval
+            probe_level = np.repeat(self.trials['probe_level'],
+                                    self.num_response_intervals)
+            success = self.trials['success_vector'].flatten()
+            jobs.append((plotting.render_regression_plot,
+                         (probe_level, success,
+                          self.regression_fig_save_path)))
+        if jobs:
+            self.plot_thread = plotting.save_figures_in_background(jobs)
+
+    def wait_for_plots(self, timeout=None):
+        """Block until the end-of-block figures have been saved"""
+        if self.plot_thread is not None:
+            self.plot_thread.join(timeout)
+
+    def simulate_batch(self, listener, num_listeners, rng):
+        """
+        Run many simulated listeners through this track at once
+
+        Mirrors prepare_next_probe() and get_current_estimate() with
+        listeners along the first axis. Stopping criteria are not supported
+        (see supports_batch_simulation). The track itself is not modified.
+
+        Parameters
+        ----------
+        listener : PsychometricFunction
+            Model used to draw the response to each keyword
+        num_listeners : int
+        rng : np.random.Generator
+
+        Returns
+        -------
+        dict.
+            probe_level and num_correct, each (num_listeners, max_num_trials),
+            and estimate, (num_listeners,), equivalent to
+            get_current_estimate() at the end of the track
+        """
+        num_trials = int(self.max_num_trials)
+        change = self.step_size * np.asarray(self.change_vector, dtype=float)
+        level = np.full(num_listeners, float(self.probe_level))
+        probe_level = np.empty((num_listeners, num_trials))
+        num_correct = np.empty((num_listeners, num_trials), dtype=int)
+        # as ConvergenceMonitor, which sees every trial but the last
+        last_direction = np.zeros(num_listeners, dtype=int)
+        num_reversals = np.zeros(num_listeners, dtype=int)
+        reversal_sum = np.zeros(num_listeners)
+        num_used = np.zeros(num_listeners, dtype=int)
+        for trial in range(num_trials):
+            probe_level[:, trial] = level
+            correct = listener.probe_response(
+                level, self.num_response_intervals, rng).sum(axis=1)
+            num_correct[:, trial] = correct
+            if trial < num_trials - 1:
+                direction = np.sign(change[correct]).astype(int)
+                reversal = ((direction != 0) & (last_direction != 0)
+                            & (direction != last_direction))
+                num_reversals += reversal
+                used = reversal & (num_reversals >
+                                   self.convergence.num_reversals_to_discard)
+                reversal_sum[used] += level[used]
+                num_used += used
+                last_direction[direction != 0] = direction[direction != 0]
+            level = level + change[correct]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            estimate = np.where(num_used > 0, reversal_sum / num_used, level)
+        return {'probe_level': probe_level,
+                'num_correct': num_correct,
+                'estimate': estimate}
+
     def get_next_stimulus_id(self):
         return self.stimulus_id
 
@@ -204,13 +296,14 @@ class AdaptiveTrack(ProbeStrategy, ABC):
     def get_next_probe_level_as_string(self):
         return str(self.probe_level)
 
-    def get_trial_data(self):
-        df = self.results_df.iloc[[-1],:].copy()
-        # success_vector is an array which doesnt play nicely so remove it
-        df.drop('success_vector', axis=1, inplace=True)
-        print(df)
-        print(f'df has type {type(df)} and shape {df.shape}')
-        return df
+    def get_trial_record(self):
+        row = self.trials.get_row(-1)
+        # success_vector is an array which doesnt play nicely so leave it out
+        return {name: row[name] for name in self.trial_record_fields()}
+
+    def trial_record_fields(self):
+        return [name for name in self.trials.dataframe_columns
+                if name != 'success_vector']
     
     # def display_pyschometric_curve(self):
     #     probed_levels = self.results_df.probe_level.unique()
@@ -276,90 +369,223 @@ class TargetFiftyPercent(AdaptiveTrack):
 
 
 
-class DualTargetTwentyEightyPercent(AdaptiveTrack):
-    def __init__(self, config):
-        """Constructor deals with configuring the class
+class InterleavedAdaptiveTrack(AdaptiveTrack):
+    """
+    Several adaptive tracks interleaved within one block.
+
+    Each track has its own target level, change vector, step size and,
+    optionally, initial probe level and pool of stimulus ids. The track of
+    every trial is fixed up front by a scheduler:
+        random_runs: random order, balanced trial counts, no more than
+            max_run_per_track consecutive trials of one track. Exact for
+            small blocks; blocks too large to count (e.g. four tracks of 50
+            trials) are shuffled until the runs are short enough, see
+            track_assignment
+        round_robin: 0, 1, ..., n-1, 0, 1, ...
+        random: each trial independently and uniformly
+    The state needed to continue each track (next level, last level and
+    score, trial and reversal counts) is held in the structured array
+    track_state, so a trial costs the same however long the block is.
+    """
+    supports_batch_simulation = False
+    log_track_id = True
 
-        Use parent class' constuctor to create an empty DataFrame in which to
-        store results
+    track_state_dtype = [('next_level', np.float64),
+                         ('last_level', np.float64),
+                         ('last_num_correct', np.int64),
+                         ('last_direction', np.int64),
+                         ('num_trials', np.int64),
+                         ('num_reversals', np.int64)]
+
+    def __init__(self, config):
         """
+        Constructor deals with configuring the class
+
+        Required settings:
+            max_num_trials
+            tracks: list of dicts, one per track, with
+                target_level
+                change_vector: step multiplier for 0 to
+                    num_response_intervals correct
+                step_size (optional, defaults to the block's step_size)
+                initial_probe_level (optional)
+                stimulus_ids (optional) list of integer ids used in order
+                    instead of the trial number
+        Optional settings (defaults in brackets):
+            initial_probe_level: level of the first trial if its track
+                doesn't have one. Tracks without an initial_probe_level
+                otherwise start from the result of the first trial.
+            step_size (1.5)
+            scheduler ("random_runs")
+            max_run_per_track (3)
+            seed (None) for the scheduler
+        """
+        if "stopping_criteria" in config:
+            raise ValueError("stopping_criteria are not supported for "
+                             "interleaved tracks")
         super().__init__(config)
-        self.max_run_per_track = 3
-
-        self.probe_level = config["initial_probe_level"]
-        self.target_level_list = [0.2, 0.8]
-        self.change_vector = [[1, 0, -1, -2, -3, -4],  # 20% target
-                              [4, 3,  2,  1,  0, -1]]  # 80% target
-        self.step_size = 1.5
         self.max_num_trials = int(config["max_num_trials"])
-        if "step_size" in config:
-            self.step_size = config["step_size"]
-        if "max_run_per_track" in config:
-            self.max_run_per_track = int(config["max_run_per_track"])
-        
-        self.num_reshuffles_before_warn = 10000   
-        
-        # randomly assign trials to tracks
-        trials_per_track = np.zeros(2);
-        trials_per_track[0] = np.round((self.max_num_trials-1)/2)
-        trials_per_track[1] = self.max_num_trials - trials_per_track[0]
-        rng = np.random.default_rng()
-        self.track_assignment = np.concatenate(
-            [np.zeros(trials_per_track[0].astype(int)),
-             np.ones(trials_per_track[1].astype(int))]).astype(int)
+        self.max_run_per_track = int(config.get("max_run_per_track", 3))
+        self.scheduler = config.get("scheduler", "random_runs")
+        default_step_size = config.get("step_size", 1.5)
+
+        tracks = config["tracks"]
+        num_tracks = len(tracks)
+        if num_tracks == 0:
+            raise ValueError("config tracks must contain at least one track")
+        self.target_levels = [track["target_level"] for track in tracks]
+        self.change_vectors = np.array([track["change_vector"]
+                                        for track in tracks], dtype=float)
+        if self.change_vectors.shape[1] != self.num_response_intervals + 1:
+            raise ValueError("each change_vector should contain %d entries" %
+                             (self.num_response_intervals + 1))
+        self.step_sizes = np.array([track.get("step_size", default_step_size)
+                                    for track in tracks], dtype=float)
+        self.stimulus_pools = [track.get("stimulus_ids") for track in tracks]
+
+        self.track_assignment = self.build_schedule(num_tracks,
+                                                    config.get("seed"))
         if self.verbosity >=3:
             print(self.track_assignment)
-        shuffle_ok = False
-        seg_len = self.max_run_per_track+1
-        
-        reshuffle_counter = 0
-        while (not shuffle_ok):
-            if (reshuffle_counter > self.num_reshuffles_before_warn):
-                warnings.warn((f'Searching for a random sequence of length ' 
-                               f'{self.max_num_trials} with a run of '
-                               f'<={self.max_run_per_track} is taking a while!'
-                               f'  Consider allowing longer runs or fewer trials.'))
-            
-            # do a new shuffle
-            rng.shuffle(self.track_assignment)
-            reshuffle_counter += 1
-            
-            # test it
-            shuffle_ok=True
-            for i in range(self.max_num_trials-seg_len):
-                seg = self.track_assignment[i + np.arange(0,seg_len)]
-                # print(f'{seg}')
-                if sum(seg) in [0, seg_len]:
-                    # print(f'max run exceeded {seg} sum {sum(seg)}')
-                    shuffle_ok = False
-         
-
-        self.target_level = self.target_level_list[self.trial_counter]
-        
-        
-    def prepare_next_probe(self):
-        # get entries from dataframe which correspond to the current target
-        next_trial = self.trial_counter + 1
-        target_level_index = self.track_assignment[next_trial]
-        track_df = self.results_df[self.results_df.target_level==self.target_level_list[target_level_index]]
-        if len(track_df)==0:
-            # select the first element
-            num_correct = self.results_df.iloc[0]["num_correct"]
-            prev_probe_level = self.results_df.iloc[0]["probe_level"]
+        for track_id, pool in enumerate(self.stimulus_pools):
+            num_scheduled = np.count_nonzero(self.track_assignment == track_id)
+            if (pool is not None) and (len(pool) < num_scheduled):
+                raise ValueError(f"track {track_id} has {len(pool)} "
+                                 f"stimulus_ids but {num_scheduled} trials")
+
+        self.track_state = np.zeros(num_tracks, dtype=self.track_state_dtype)
+        self.track_state['next_level'] = [
+            track.get("initial_probe_level", np.nan) for track in tracks]
+        self.track_state['last_level'] = np.nan
+        self.track_state['last_num_correct'] = -1
+
+        self.current_track = self.track_assignment[0]
+        if np.isnan(self.track_state['next_level'][self.current_track]):
+            if "initial_probe_level" not in config:
+                raise ValueError("config is missing initial_probe_level key")
+            self.track_state['next_level'][self.current_track] = \
+                config["initial_probe_level"]
+        self.start_trial()
+
+    def build_schedule(self, num_tracks, seed):
+        """Track index of every trial"""
+        if self.scheduler == "random_runs":
+            trials_per_track = track_assignment.balanced_trials_per_track(
+                self.max_num_trials, num_tracks)
+            try:
+                return track_assignment.random_track_assignment(
+                    trials_per_track, self.max_run_per_track, seed)
+            except ValueError as err:
+                raise ValueError(f"{err} The round_robin and random "
+                                 f"schedulers have no such limit.") from err
+        elif self.scheduler == "round_robin":
+            return np.arange(self.max_num_trials) % num_tracks
+        elif self.scheduler == "random":
+            rng = np.random.default_rng(seed)
+            return rng.integers(num_tracks, size=self.max_num_trials)
         else:
-            # select the most recent element of this track
-            num_correct = track_df.iloc[-1]["num_correct"]
-            prev_probe_level = track_df.iloc[-1]["probe_level"]
-            
+            raise ValueError(f"Unknown scheduler {self.scheduler}")
+
+    def start_trial(self):
+        """Set the level, target and stimulus for the current track"""
+        state = self.track_state[self.current_track]
+        self.probe_level = state['next_level'].item()
+        self.target_level = self.target_levels[self.current_track]
+        pool = self.stimulus_pools[self.current_track]
+        if pool is None:
+            self.stimulus_id = self.trial_counter
+        else:
+            self.stimulus_id = pool[state['num_trials']]
+
+    def get_track_id(self):
+        return int(self.current_track)
+
+    def store_trial_result(self, result):
+        super().store_trial_result(result)
+        if self.is_finished():
+            # no next probe to prepare but keep the state complete
+            self.update_track_state()
+
+    def update_track_state(self):
+        """Record the result of the latest trial in its track's state"""
+        track_id = self.current_track
+        num_correct = self.trials['num_correct'][-1]
+        change = self.change_vectors[:, num_correct]
+        state = self.track_state
+        direction = int(np.sign(change[track_id]))
+        if (direction != 0) and (state['last_direction'][track_id] != 0) \
+                and (direction != state['last_direction'][track_id]):
+            state['num_reversals'][track_id] += 1
+        if direction != 0:
+            state['last_direction'][track_id] = direction
+        state['last_level'][track_id] = self.probe_level
+        state['last_num_correct'][track_id] = num_correct
+        state['num_trials'][track_id] += 1
+        state['next_level'][track_id] = self.probe_level + \
+            self.step_sizes[track_id] * change[track_id]
+        if self.trial_counter == 0:
+            # tracks with no initial level continue from the first trial
+            unset = np.isnan(state['next_level'])
+            state['next_level'][unset] = self.probe_level + \
+                self.step_sizes[unset] * change[unset]
         if self.verbosity >=3:
-            print('num_correct: ' + num_correct)
-        self.probe_level = prev_probe_level + \
-            self.step_size * self.change_vector[target_level_index][num_correct]
+            print('num_correct: ' + str(num_correct))
+
+    def update_convergence(self, probe_level, step):
+        # consecutive trials are from different tracks so the step between
+        # them means nothing - reversals are counted per track instead
+        pass
+
+    def prepare_next_probe(self):
+        self.update_track_state()
         self.trial_counter += 1
-        self.stimulus_id += 1
-        self.target_level = self.target_level_list[
-            self.track_assignment[self.trial_counter]]
+        self.current_track = self.track_assignment[self.trial_counter]
+        self.start_trial()
 
     def get_current_estimate(self):
         # TODO: use all available data to form estimate
-        return np.mean(self.results_df.probe_level[-self.num_trials_to_average:])
+        return np.mean(self.trials['probe_level'][-self.num_trials_to_average:])
+
+    def get_track_estimates(self):
+        """
+        Estimate for each track
+
+        Mean of the last num_trials_to_average probe levels of the track (NaN
+        if it hasn't been probed)
+        """
+        track_ids = self.trials['track_id']
+        probe_levels = self.trials['probe_level']
+        estimates = np.full(len(self.target_levels), np.nan)
+        for track_id in range(len(self.target_levels)):
+            levels = probe_levels[track_ids == track_id]
+            if levels.size > 0:
+                estimates[track_id] = np.mean(
+                    levels[-self.num_trials_to_average:])
+        return estimates
+
+
+class DualTargetTwentyEightyPercent(InterleavedAdaptiveTrack):
+    """
+    Interleaved 20% and 80% tracks with random runs of at most
+    max_run_per_track trials
+    """
+
+    def __init__(self, config):
+        """Constructor deals with configuring the class
+
+        Use parent class' constuctor to create an empty DataFrame in which to
+        store results
+        """
+        step_size = config.get("step_size", 1.5)
+        config = dict(config)
+        config["tracks"] = [
+            {"target_level": 0.2,
+             "change_vector": [1, 0, -1, -2, -3, -4],
+             "step_size": step_size},
+            {"target_level": 0.8,
+             "change_vector": [4, 3,  2,  1,  0, -1],
+             "step_size": step_size}]
+        config["scheduler"] = "random_runs"
+        super().__init__(config)
+        self.target_level_list = self.target_levels
+        self.step_size = step_size
@@ -1,6 +1,5 @@
 from .probe_strategy import ProbeStrategy
 import numpy as np
-import pandas as pd
 
 
 class FixedProbeLevel(ProbeStrategy):
@@ -39,12 +38,15 @@ class FixedProbeLevel(ProbeStrategy):
         else:
             return False
 
-    def get_trial_data(self):
+    def get_trial_record(self):
         """
         Get the result of the most recent trial
         Returns
         -------
-        DataFrame.
-            single row with single column called 'result'
+        dict.
+            single field called 'result'
         """
-        return pd.DataFrame([[self.storedResults[-1]]], columns=['result'])
\ No newline at end of file
+        return {'result': self.storedResults[-1]}
+
+    def trial_record_fields(self):
+        return ['result']
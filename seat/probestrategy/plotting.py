@@ -0,0 +1,165 @@
+"""
+Plotting for adaptive tracks, kept off the trial-to-trial critical path.
+
+LiveProbePlot draws the probe history in a separate process which is fed one
+event per trial through a queue, so storing a result never waits for the
+figure to be redrawn.
+
+save_figures_in_background renders the end-of-block figures in a thread using
+matplotlib's object-oriented API with the Agg canvas (pyplot's global state is
+neither thread-safe nor needed to write a file).
+"""
+import multiprocessing
+import queue
+import threading
+
+import numpy as np
+
+
+def _live_plot_worker(event_queue, max_num_trials, refresh_interval):
+    """Process target: redraw the probe history as events arrive"""
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots()
+    ax.set_xlim([0, max_num_trials])
+    ax.set_xlabel('trial_id')
+    ax.set_ylabel('probe_level')
+    plt.ion()
+    plt.show()
+
+    lines = {}  # one line per target level, extended in place
+    running = True
+    while running and plt.fignum_exists(fig.number):
+        # drain everything which has arrived since the last redraw
+        updated = False
+        while True:
+            try:
+                event = event_queue.get_nowait()
+            except queue.Empty:
+                break
+            if event is None:
+                running = False
+                break
+            trial_id, probe_level, target_level = event
+            if target_level not in lines:
+                line, = ax.plot([], [], marker='.', label=str(target_level))
+                lines[target_level] = ([], [], line)
+                ax.legend(title='target_level')
+            x, y, line = lines[target_level]
+            x.append(trial_id)
+            y.append(probe_level)
+            line.set_data(x, y)
+            updated = True
+        if updated:
+            ax.relim()
+            ax.autoscale_view(scalex=False)
+            fig.canvas.draw_idle()
+        plt.pause(refresh_interval)
+    plt.ioff()
+    if plt.fignum_exists(fig.number):
+        # leave the final plot up until the window is closed
+        plt.show()
+
+
+class LiveProbePlot:
+    """
+    Live probe history plot running in its own process
+
+    update() only puts a small tuple on a queue and never blocks, even if the
+    plotting process is busy, slow to start or has been closed.
+    """
+
+    def __init__(self, max_num_trials, refresh_interval=0.1):
+        # spawn so the child does not inherit the parent's GUI state
+        context = multiprocessing.get_context('spawn')
+        self._queue = context.Queue()
+        self._process = context.Process(
+            target=_live_plot_worker,
+            args=(self._queue, max_num_trials, refresh_interval),
+            daemon=True)
+        self._process.start()
+
+    def update(self, trial_id, probe_level, target_level):
+        """Send the result of one trial to the plot"""
+        try:
+            self._queue.put_nowait((int(trial_id), float(probe_level),
+                                    float(target_level)))
+        except (queue.Full, ValueError):
+            # the plot is a convenience, never hold up the experiment
+            pass
+
+    def close(self, timeout=None):
+        """
+        Stop sending updates
+
+        The window stays open until the user closes it unless timeout is given,
+        in which case the process is terminated after that many seconds.
+        """
+        try:
+            self._queue.put_nowait(None)
+        except ValueError:
+            return
+        self._queue.close()
+        if timeout is not None:
+            self._process.join(timeout)
+            if self._process.is_alive():
+                self._process.terminate()
+
+
+def _new_figure():
+    """Figure attached to an Agg canvas, independent of pyplot"""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def render_probe_history_plot(results_df, path):
+    """Probe level against trial, one line per target level"""
+    import seaborn as sns
+    fig = _new_figure()
+    ax = fig.subplots()
+    sns.lineplot(data=results_df, x="trial_id", y="probe_level",
+                 ax=ax, hue="target_level")
+    fig.savefig(path)
+
+
+def render_regression_plot(probe_level, success, path):
+    """Logistic regression of keyword success against probe level"""
+    import pandas as pd
+    import seaborn as sns
+    flat_df = pd.DataFrame({"probe_level": probe_level, "success": success})
+    fig = _new_figure()
+    ax = fig.subplots()
+    sns.regplot(data=flat_df, x="probe_level", y="success", ax=ax,
+                logistic=True, x_estimator=np.mean)
+    fig.savefig(path)
+
+
+def save_figures_in_background(jobs):
+    """
+    Render figures in a background thread
+
+    Parameters
+    ----------
+    jobs : list of tuple
+        (render function, args) pairs, e.g.
+        (render_probe_history_plot, (results_df, path))
+
+    Returns
+    -------
+    threading.Thread.
+        Already started. It is not a daemon so the figures are completed
+        before the interpreter exits; join() it to wait for them sooner.
+    """
+    def render_all():
+        for render, args in jobs:
+            try:
+                render(*args)
+            except Exception as err:
+                print(f'Failed to save figure with {render.__name__}: {err}')
+
+    thread = threading.Thread(target=render_all, name='save_figures')
+    thread.start()
+    return thread
@@ -1,10 +1,14 @@
 from abc import ABC, abstractmethod
 import pandas as pd
+import seatlog
 
 
 class ProbeStrategy(ABC):
     """Abstract base class to define the interface"""
 
+    # set True in subclasses which implement simulate_batch()
+    supports_batch_simulation = False
+
     @abstractmethod
     def store_trial_result(self, result):
         pass
@@ -29,15 +33,31 @@ class ProbeStrategy(ABC):
     def is_finished(self):
         pass
 
-    def get_trial_data(self):
+    def get_trial_record(self):
         """
         Get data describing the latest trial (e.g. for writing to log)
-        
+
         Child classes should override this but functional, non-informative
         implementation given here to speed up development
         Returns
         -------
-        DataFrame.
-            single row
+        dict.
+            column name: value
+        """
+        if type(self).get_trial_data is not ProbeStrategy.get_trial_data:
+            # older subclasses which only provide a DataFrame
+            return seatlog.as_record(self.get_trial_data())
+        return {'no_info': ''}
+
+    def trial_record_fields(self):
+        """
+        Names of the fields of get_trial_record(), if they are known before
+        the first trial, otherwise None
+        """
+        return None
+
+    def get_trial_data(self):
+        """
+        get_trial_record() as a single row DataFrame, e.g. for analysis
         """
-        return pd.DataFrame([['']], columns=['no_info'])
\ No newline at end of file
+        return pd.DataFrame([self.get_trial_record()])
\ No newline at end of file
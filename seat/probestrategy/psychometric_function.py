@@ -2,36 +2,123 @@ import numpy as np
 
 
 class PsychometricFunction():
+    """
+    Logistic psychometric function with guess and miss (lapse) rates
+
+        p(x) = guess + scale / (1 + exp(-beta * (x - threshold) + offset))
+
+    where scale = 1 - guess - miss and offset places prob_at_threshold at the
+    threshold, i.e. offset = log((1 - p_std) / p_std) with
+    p_std = (prob_at_threshold - guess) / scale.
+
+    As in the MATLAB original, slope_at_threshold is the gradient of p at the
+    threshold, so the rate of the logistic is
+    beta = slope_at_threshold / (scale * p_std * (1 - p_std)). With the
+    defaults (prob_at_threshold 0.5, no guesses or misses) beta is
+    4 * slope_at_threshold, e.g. the default 0.025 gives the standard
+    logistic 1 / (1 + exp(-0.1 * (x - threshold))).
+
+    Every parameter may be an array, e.g. one element per simulated listener.
+    Parameters broadcast against each other and against the probe levels.
+    """
+
     def __init__(self,
                  threshold_db=0,
                  prob_at_threshold=0.5,
-                 slope_at_threshold=0.1,
+                 slope_at_threshold=0.025,
                  probability_of_miss=0,
-                 guess_probability=0):
+                 guess_probability=0,
+                 rng=None):
+        """
+        Parameters
+        ----------
+        threshold_db : float or array_like
+        prob_at_threshold : float or array_like
+            Probability of success (including guesses) at threshold_db.
+        slope_at_threshold : float or array_like
+            Gradient of the probability of success at threshold_db, per dB
+        probability_of_miss : float or array_like
+            Lapse rate, i.e. 1 - upper asymptote
+        guess_probability : float or array_like
+            Lower asymptote, e.g. 1/n for n-alternative forced choice
+        rng : numpy.random.Generator or int, optional
+            Used by probe_response() when it isn't given a generator. Give
+            each thread or process its own generator.
+        """
         self.threshold_db = threshold_db
         self.prob_at_threshold = prob_at_threshold
         self.slope_at_threshold = slope_at_threshold
         self.probability_of_miss = probability_of_miss
         self.guess_probability = guess_probability
+        self.rng = np.random.default_rng(rng)
+
+        guess = np.asarray(guess_probability, dtype=float)
+        miss = np.asarray(probability_of_miss, dtype=float)
+        prob_at_threshold = np.asarray(prob_at_threshold, dtype=float)
+        if np.any(guess < 0) or np.any(miss < 0) or np.any(guess + miss >= 1):
+            raise ValueError('guess_probability and probability_of_miss must '
+                             'be non-negative and sum to less than 1')
+        if (np.any(prob_at_threshold <= guess)
+                or np.any(prob_at_threshold >= 1 - miss)):
+            raise ValueError('prob_at_threshold must lie between '
+                             'guess_probability and 1 - probability_of_miss')
+
+        # precompute everything which doesn't depend on the probe level
+        self._x0 = np.asarray(threshold_db, dtype=float)
+        self._guess = guess
+        self._scale = 1 - guess - miss
+        p_std = (prob_at_threshold - guess) / self._scale
+        self._offset = np.log((1 - p_std) / p_std)
+        # rate of the underlying logistic
+        self._k = np.asarray(slope_at_threshold, dtype=float) \
+            / (self._scale * p_std * (1 - p_std))
+
+    def _standard_logistic(self, probe_level_db):
+        """Underlying logistic, ranging from 0 to 1"""
+        z = self._k * (np.asarray(probe_level_db, dtype=float) - self._x0) \
+            - self._offset
+        with np.errstate(over='ignore'):
+            return 1 / (1 + np.exp(-z))
+
+    def probability_of_success(self, probe_level_db):
+        """Probability of a correct response, element-wise for arrays"""
+        return self._guess + self._scale * \
+            self._standard_logistic(probe_level_db)
+
+    def inverse(self, probability):
+        """
+        Probe level at which the probability of success is probability
+
+        NaN outside (guess_probability, 1 - probability_of_miss)
+        """
+        p_std = (np.asarray(probability, dtype=float) - self._guess) \
+            / self._scale
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self._x0 + (np.log(p_std / (1 - p_std)) + self._offset) \
+                / self._k
+
+    def derivative(self, probe_level_db):
+        """Gradient of probability_of_success() with respect to probe level"""
+        s = self._standard_logistic(probe_level_db)
+        return self._scale * self._k * s * (1 - s)
+
+    def probe_response(self, probe_level_db, num_responses=1, rng=None):
+        """
+        Simulate responses to num_responses independent intervals
+
+        Returns 1 (correct) or 0 with shape (..., num_responses) where ... is
+        the broadcast shape of the probe level and parameters, i.e.
+        (num_responses,) for a single listener and probe level.
+        """
+        if rng is None:
+            rng = self.rng
+        p = np.asarray(self.probability_of_success(probe_level_db))
+        draws = rng.random(p.shape + (num_responses,))
+        return (draws < p[..., np.newaxis]).astype(int)
 
-    def probe_response(self, probe_level_db, num_responses=1):
-        if self.prob_at_threshold != 0.5:
-            raise NotImplementedError
-        if self.probability_of_miss != 0:
-            raise NotImplementedError
-        if self.guess_probability != 0:
-            raise NotImplementedError
-
-        L = 1  # maximum value of the functions
-        k = self.slope_at_threshold
-        x0 = self.threshold_db
-        x = probe_level_db
-        prob_of_success = L / (1 + np.exp(-k * (x-x0)))
-        return np.random.binomial(1, prob_of_success, size=num_responses)
-
-
-        # pscale=1-qq(4,:)-qq(5,:);  % prob range excluding miss and lapse probs
-        # pstd=(qq(1,:)-qq(5,:))./pscale; % prob target compensating for miss and lapse probs
-        # sstd=qq(3,:)./pscale; % slope compensating for miss and lapse probs
-        # beta=sstd./(pstd.*(1-pstd));
-        # px=(1+exp(repmat(beta.*qq(2,:)+log((1-pstd)./pstd),nx,1)-x(:)*beta)).^(-1);
+    def num_correct(self, probe_level_db, num_responses=1, rng=None):
+        """Number of correct responses out of num_responses (binomial)"""
+        if rng is None:
+            rng = self.rng
+        return rng.binomial(num_responses,
+                            self.probability_of_success(probe_level_db))
@@ -0,0 +1,267 @@
+from .adaptive_track import AdaptiveTrack
+from .psychometric_function import PsychometricFunction
+import math
+import numpy as np
+
+
+def _xlogx(x):
+    """x*log(x) with the convention that 0*log(0) = 0"""
+    out = np.zeros_like(x)
+    mask = x > 0
+    out[mask] = x[mask] * np.log(x[mask])
+    return out
+
+
+class QuestPlus(AdaptiveTrack):
+    """
+    Bayesian adaptive track (QUEST+, Watson 2017) for keyword scoring.
+
+    A posterior is kept over a grid of psychometric function parameters:
+    threshold x slope (x probability_of_miss, i.e. lapse). Each keyword is
+    assumed to be an independent Bernoulli trial so the number of correct
+    keywords is binomial, and the posterior only depends on how many keywords
+    were correct and incorrect at each probe level. Those counts are all that
+    is updated after a trial; the posterior over the full grid is worked out
+    from them when an estimate is asked for.
+
+    The next probe level is the one which minimises the expected entropy of
+    the posterior. That is evaluated on a subset of at most
+    max_entropy_cells grid cells, evenly spaced along each axis with the
+    slope and miss axes thinned first, for which the likelihood of every
+    outcome (0 to num_response_intervals keywords correct) at every
+    candidate probe level is tabulated at construction. So a trial costs
+    the same however fine the grid is. With the default grid every cell is
+    used.
+
+    The estimate is the posterior mean of the threshold, i.e. the probe level
+    at which the probability of a keyword being correct is target_level.
+    """
+    supports_batch_simulation = False
+
+    def __init__(self, config):
+        """
+        Constructor deals with configuring the class
+
+        Optional settings (defaults in brackets):
+            probe_level_min, probe_level_max, probe_level_step (-20, 20, 1)
+                candidate probe levels
+            threshold_min, threshold_max, threshold_step (probe level range,
+                step 0.5) threshold grid
+            slope_values (15 log-spaced values from 0.025 to 0.5) gradient
+                at threshold, see PsychometricFunction
+            miss_probability_values ([0.0])
+            guess_probability (0)
+            target_level (0.5) probability correct at threshold
+            initial_probe_level (chosen by minimum expected entropy)
+                if it is not one of the candidate levels the nearest one is
+                used when updating the posterior
+            support_threshold (1e-9) relative posterior probability below
+                which thresholds at the edges of the grid are ignored when
+                choosing the probe level
+            max_entropy_cells (1536) grid cells used to choose the probe
+                level, enough for the default grid of 1215
+        """
+        super().__init__(config)
+        self.max_num_trials = int(config["max_num_trials"])
+        self.target_level = config.get("target_level", 0.5)
+        self.guess_probability = config.get("guess_probability", 0.0)
+
+        # candidate probe levels
+        probe_level_min = config.get("probe_level_min", -20.0)
+        probe_level_max = config.get("probe_level_max", 20.0)
+        probe_level_step = config.get("probe_level_step", 1.0)
+        self.probe_levels = np.arange(probe_level_min,
+                                      probe_level_max + probe_level_step/2,
+                                      probe_level_step)
+
+        # parameter grid, flattened so the posterior is a vector
+        threshold_step = config.get("threshold_step", 0.5)
+        thresholds = np.arange(
+            config.get("threshold_min", probe_level_min),
+            config.get("threshold_max", probe_level_max) + threshold_step/2,
+            threshold_step)
+        slopes = np.asarray(config.get("slope_values",
+                                       np.geomspace(0.025, 0.5, 15)), float)
+        misses = np.asarray(config.get("miss_probability_values", [0.0]),
+                            float)
+        self.grid_shape = (thresholds.size, slopes.size, misses.size)
+        grid = np.meshgrid(thresholds, slopes, misses, indexing='ij')
+        self.grid_threshold, self.grid_slope, self.grid_miss = \
+            [g.ravel() for g in grid]
+        self.model = PsychometricFunction(
+            threshold_db=self.grid_threshold,
+            prob_at_threshold=self.target_level,
+            slope_at_threshold=self.grid_slope,
+            probability_of_miss=self.grid_miss,
+            guess_probability=self.guess_probability)
+
+        # keywords correct and incorrect at each candidate level
+        self.num_correct_at = np.zeros(self.probe_levels.size, np.int64)
+        self.num_incorrect_at = np.zeros(self.probe_levels.size, np.int64)
+        self._posterior = None
+
+        self.support_threshold = config.get("support_threshold", 1e-9)
+        self.max_entropy_cells = int(config.get("max_entropy_cells", 1536))
+        self.entropy_cells = self.choose_entropy_cells()
+        self.build_likelihood_tables()
+        self.entropy_log_posterior = np.zeros(self.entropy_cells.size)
+
+        if "initial_probe_level" in config:
+            self.probe_level = config["initial_probe_level"]
+        else:
+            self.probe_level = self.select_probe_level()
+
+        if self.verbosity > 1:
+            print(f'QuestPlus: {self.grid_threshold.size} parameter '
+                  f'combinations ({self.entropy_cells.size} used to choose '
+                  f'the probe level), {self.probe_levels.size} probe levels')
+
+    def choose_entropy_cells(self):
+        """
+        Flat indices of the grid cells used by expected_entropy()
+
+        The miss and slope axes are thinned (whichever has more points, down
+        to 5 each) before the threshold axis, so the threshold resolution is
+        only reduced for very fine grids. The cells stay in threshold-major
+        order.
+        """
+        counts = list(self.grid_shape)
+        while np.prod(counts) > self.max_entropy_cells:
+            if max(counts[1:]) > 5:
+                axis = 1 if counts[1] >= counts[2] else 2
+            else:
+                axis = int(np.argmax(counts))
+            counts[axis] = math.ceil(counts[axis] / 2)
+        indices = [np.unique(np.round(np.linspace(0, size - 1, count))
+                             .astype(np.int64))
+                   for size, count in zip(self.grid_shape, counts)]
+        return np.ravel_multi_index(np.ix_(*indices), self.grid_shape).ravel()
+
+    def build_likelihood_tables(self):
+        """
+        Tabulate P(num_correct | probe_level, parameters) on the entropy cells
+
+        The table is stored as a (num_probe_levels * num_outcomes,
+        num_entropy_cells) matrix, where num_outcomes = num_response_intervals
+        + 1, so any contiguous range of cells is a view. Alongside it,
+        sum(likelihood * log(likelihood)) over the outcomes is stored per
+        probe level, and the log likelihood is kept to update the posterior
+        over the entropy cells.
+        """
+        n = self.num_response_intervals
+        cells = self.entropy_cells
+        model = PsychometricFunction(
+            threshold_db=self.grid_threshold[np.newaxis, cells],
+            prob_at_threshold=self.target_level,
+            slope_at_threshold=self.grid_slope[np.newaxis, cells],
+            probability_of_miss=self.grid_miss[np.newaxis, cells],
+            guess_probability=self.guess_probability)
+        p = model.probability_of_success(self.probe_levels[:, np.newaxis])
+        self.num_outcomes = n + 1
+        likelihood = np.stack([math.comb(n, k) * p**k * (1 - p)**(n - k)
+                               for k in range(self.num_outcomes)], axis=1)
+        self.outcome_neg_entropy = _xlogx(likelihood).sum(axis=1).astype(
+            np.float32)
+        likelihood = likelihood.reshape(-1, cells.size)
+        self.likelihood = likelihood.astype(np.float32)
+        with np.errstate(divide='ignore'):
+            self.log_likelihood = np.log(likelihood)
+
+    def probe_index(self, probe_level):
+        """Index of the nearest candidate probe level"""
+        return int(np.argmin(np.abs(self.probe_levels - probe_level)))
+
+    def update_posterior(self, probe_level, num_correct):
+        """Bayes' rule using the tabulated likelihood of the observed trial"""
+        probe_index = self.probe_index(probe_level)
+        self.num_correct_at[probe_index] += num_correct
+        self.num_incorrect_at[probe_index] += \
+            self.num_response_intervals - num_correct
+        self.entropy_log_posterior += self.log_likelihood[
+            probe_index * self.num_outcomes + num_correct]
+        self._posterior = None
+
+    @property
+    def posterior(self):
+        """
+        Posterior over the full grid, from the keyword counts at each level
+
+        Worked out when it is first needed after a trial, one probe level at
+        a time.
+        """
+        if self._posterior is None:
+            log_posterior = np.zeros(self.grid_threshold.size)
+            with np.errstate(divide='ignore'):
+                for level, num_correct, num_incorrect in zip(
+                        self.probe_levels, self.num_correct_at,
+                        self.num_incorrect_at):
+                    if num_correct == 0 and num_incorrect == 0:
+                        continue
+                    p = self.model.probability_of_success(level)
+                    # skip zero counts so 0 * log(0) doesn't give nan
+                    if num_correct:
+                        log_posterior += num_correct * np.log(p)
+                    if num_incorrect:
+                        log_posterior += num_incorrect * np.log1p(-p)
+            posterior = np.exp(log_posterior - log_posterior.max())
+            self._posterior = posterior / posterior.sum()
+        return self._posterior
+
+    def expected_entropy(self):
+        """
+        Expected entropy of the posterior after a trial at each probe level
+
+        For outcome r at level x, with Z = sum(L * post), the entropy of the
+        updated posterior is log(Z) - (sum(L log(L) post) +
+        sum(L post log(post))) / Z. Weighting by Z and summing over r gives
+        the expectation without forming any updated posteriors. As the
+        likelihoods of the outcomes sum to one, the last term sums to
+        sum(post log(post)) at every level and the middle one only needs
+        sum(L log(L)) over the outcomes, so per level this is
+        sum(Z log(Z)) - post @ outcome_neg_entropy - sum(post log(post)).
+
+        post is the posterior over the entropy cells. Only the contiguous
+        range of them (threshold-major) in which it is above
+        support_threshold times its maximum is used. It is a view of the
+        tables, so once the threshold estimate has narrowed far less memory
+        is read.
+        """
+        posterior = np.exp(self.entropy_log_posterior
+                           - self.entropy_log_posterior.max())
+        support = np.flatnonzero(posterior > self.support_threshold)
+        cells = slice(support[0], support[-1] + 1)
+        posterior = posterior[cells] / posterior[cells].sum()
+        weights = posterior.astype(np.float32)
+        z = (self.likelihood[:, cells] @ weights).astype(np.float64)
+        a = (self.outcome_neg_entropy[:, cells] @ weights).astype(np.float64)
+        h = _xlogx(z).reshape(self.probe_levels.size, self.num_outcomes)
+        return h.sum(axis=1) - a - _xlogx(posterior).sum()
+
+    def select_probe_level(self):
+        """Probe level which minimises the expected entropy"""
+        return self.probe_levels[np.argmin(self.expected_entropy())].item()
+
+    def prepare_next_probe(self):
+        num_correct = self.trials['num_correct'][-1]
+        self.update_posterior(self.probe_level, num_correct)
+        self.probe_level = self.select_probe_level()
+        self.trial_counter += 1
+        self.stimulus_id += 1
+        if self.verbosity > 3:
+            print('prepare_next_probe')
+            print(f'{num_correct} correct - next level {self.probe_level}')
+
+    def get_parameter_estimates(self):
+        """Posterior mean and standard deviation of each parameter"""
+        estimates = {}
+        for name, values in [('threshold', self.grid_threshold),
+                             ('slope', self.grid_slope),
+                             ('probability_of_miss', self.grid_miss)]:
+            mean = np.dot(self.posterior, values)
+            sd = np.sqrt(max(np.dot(self.posterior, (values - mean)**2), 0.0))
+            estimates[name] = (mean, sd)
+        return estimates
+
+    def get_current_estimate(self):
+        """Posterior mean of the threshold"""
+        return np.dot(self.posterior, self.grid_threshold)
@@ -0,0 +1,326 @@
+"""
+Monte-Carlo simulation of probe strategies using PsychometricFunction
+listeners.
+
+Thousands of simulated listeners are run through a ProbeStrategy to estimate
+the bias and variability of its estimate and how quickly it converges, e.g. to
+choose step sizes and max_num_trials before committing booth time.
+
+Strategies which set supports_batch_simulation (e.g. the fixed up-down
+AdaptiveTracks) run all listeners at once along an array axis. Any other
+strategy is run one listener at a time, fanned out over a process pool.
+
+Strategies with several interleaved tracks (those with target_levels, e.g.
+DualTargetTwentyEightyPercent) are summarised per track, each track's
+estimate against the listener's level at that track's target.
+
+N.B. On Windows the process pool re-imports the calling script so calls must
+be protected by `if __name__ == '__main__':`
+"""
+import concurrent.futures
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import util
+
+
+def _strategy_config_for_simulation(strategy_config):
+    """Copy of the config with logging and plotting turned off"""
+    settings = dict(strategy_config["settings"])
+    settings.pop("log_path", None)
+    settings["verbosity"] = 0
+    settings["display_plot"] = False
+    settings["save_probe_history_plot"] = False
+    settings["save_regression_plot"] = False
+    return {"class": strategy_config["class"], "settings": settings}
+
+
+def _simulate_listeners(strategy_config, listener, seeds):
+    """Run one listener per seed through a fresh instance of the strategy"""
+    runs = []
+    for seed in seeds:
+        rng = np.random.default_rng(seed)
+        probe_strategy = util.instance_builder(strategy_config)
+        num_responses = getattr(probe_strategy, 'num_response_intervals', 1)
+        # interleaved tracks are summarised per track
+        multi_track = hasattr(probe_strategy, 'target_levels')
+        probe_level = []
+        num_correct = []
+        track_id = []
+        while not probe_strategy.is_finished():
+            level = probe_strategy.get_next_probe_level()
+            if multi_track:
+                track_id.append(probe_strategy.get_track_id())
+            result = listener.probe_response(level, num_responses,
+                                             rng).astype(bool)
+            probe_strategy.store_trial_result(list(result))
+            probe_level.append(level)
+            num_correct.append(np.count_nonzero(result))
+        track_estimate = (probe_strategy.get_track_estimates()
+                          if multi_track else None)
+        runs.append((probe_level, num_correct,
+                     probe_strategy.get_current_estimate(), track_id,
+                     track_estimate))
+    return runs
+
+
+def _pad(rows, fill_value):
+    """Stack ragged rows into a 2-D array"""
+    out = np.full((len(rows), max(len(row) for row in rows)), fill_value,
+                  dtype=float)
+    for i, row in enumerate(rows):
+        out[i, :len(row)] = row
+    return out
+
+
+def simulate_in_process_pool(strategy_config, listener, num_listeners,
+                             seed=None, max_workers=None):
+    """
+    Run listeners one at a time, spread over a process pool
+
+    Returns a dict in the same form as AdaptiveTrack.simulate_batch(). Tracks
+    which stop early are padded with NaN. For strategies with several tracks
+    it also has track_id, the track of every trial, and track_estimate,
+    (num_listeners, num_tracks).
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    seeds = np.random.SeedSequence(seed).spawn(num_listeners)
+    # a few chunks per worker balances the load without much overhead
+    num_chunks = min(num_listeners, 4 * max_workers)
+    chunks = [chunk.tolist() for chunk in np.array_split(
+        np.array(seeds, dtype=object), num_chunks)]
+    runs = []
+    if max_workers == 1:
+        for chunk in chunks:
+            runs += _simulate_listeners(strategy_config, listener, chunk)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers) as pool:
+            futures = [pool.submit(_simulate_listeners, strategy_config,
+                                   listener, chunk) for chunk in chunks]
+            for future in futures:
+                runs += future.result()
+    result = {'probe_level': _pad([run[0] for run in runs], np.nan),
+              'num_correct': _pad([run[1] for run in runs], np.nan),
+              'estimate': np.array([run[2] for run in runs], dtype=float)}
+    if runs[0][4] is not None:
+        result['track_id'] = _pad([run[3] for run in runs], np.nan)
+        result['track_estimate'] = np.array([run[4] for run in runs],
+                                            dtype=float)
+    return result
+
+
+def trials_to_convergence(probe_level, reference_level, tolerance):
+    """
+    Number of trials before each track enters, and stays within, tolerance
+    of the reference level
+
+    NaN entries (tracks which stopped early) are ignored. Tracks whose last
+    trial is outside the tolerance have not converged and give NaN.
+    """
+    presented = ~np.isnan(probe_level)
+    num_trials = presented.sum(axis=1)
+    outside = (np.abs(probe_level - reference_level) > tolerance) & presented
+    num_cols = probe_level.shape[1]
+    # index of the last trial outside tolerance (-1 if there isn't one)
+    last_outside = np.where(outside.any(axis=1),
+                            num_cols - 1 - np.argmax(outside[:, ::-1], axis=1),
+                            -1)
+    result = (last_outside + 1).astype(float)
+    result[last_outside == num_trials - 1] = np.nan
+    return result
+
+
+def simulate(strategy_config, listener, num_listeners=1000,
+             reference_level=None, convergence_tolerance=1.0, seed=None,
+             max_workers=None, allow_batch=True):
+    """
+    Simulate many listeners with one strategy and summarise the results
+
+    Parameters
+    ----------
+    strategy_config : dict
+        As for util.instance_builder, i.e. with keys class and settings.
+        Logging and plotting settings are ignored.
+    listener : PsychometricFunction
+        True psychometric function of every simulated listener
+    num_listeners : int, optional
+    reference_level : float or array_like, optional
+        The value the strategy should estimate, or one value per track for
+        strategies with several tracks. Defaults to the level at which the
+        listener achieves the strategy's target_level, or each track's
+        target level (or the listener's threshold_db if the strategy has no
+        target_level).
+    convergence_tolerance : float, optional
+        Distance (dB) from reference_level used for trials_to_convergence
+    seed : int, optional
+        Makes the simulation reproducible
+    max_workers : int, optional
+        Size of the process pool, when it is needed. Defaults to the number
+        of cores.
+    allow_batch : bool, optional
+        Set False to force the process pool (e.g. to benchmark it)
+
+    Returns
+    -------
+    dict.
+        Summary statistics (see summarise()) plus 'runs' with the per
+        listener arrays
+    """
+    strategy_config = _strategy_config_for_simulation(strategy_config)
+
+    start_time = time.perf_counter()
+    probe_strategy = util.instance_builder(strategy_config)
+    target_levels = getattr(probe_strategy, 'target_levels', None)
+    if reference_level is None:
+        target_level = getattr(probe_strategy, 'target_level', None)
+        if target_levels is not None:
+            reference_level = listener.inverse(np.asarray(target_levels))
+        elif target_level is None:
+            reference_level = listener.threshold_db
+        else:
+            reference_level = float(listener.inverse(target_level))
+    if target_levels is not None:
+        reference_level = np.broadcast_to(
+            np.asarray(reference_level, dtype=float), (len(target_levels),))
+    if allow_batch and probe_strategy.supports_batch_simulation:
+        method = 'batch'
+        runs = probe_strategy.simulate_batch(listener, num_listeners,
+                                             np.random.default_rng(seed))
+    else:
+        method = 'process_pool'
+        runs = simulate_in_process_pool(strategy_config, listener,
+                                        num_listeners, seed=seed,
+                                        max_workers=max_workers)
+    elapsed = time.perf_counter() - start_time
+
+    summary = summarise(runs, reference_level, convergence_tolerance)
+    summary.update({'method': method,
+                    'elapsed_s': elapsed,
+                    'listeners_per_s': num_listeners / elapsed,
+                    'trials_per_s': summary['mean_num_trials']
+                    * num_listeners / elapsed,
+                    'runs': runs})
+    return summary
+
+
+def summarise(runs, reference_level, convergence_tolerance):
+    """
+    Bias, variance and convergence statistics of simulated runs
+
+    If runs has track_estimate, reference_level has one value per track and
+    each track's estimate and trials are compared with its own. The
+    statistics are then pooled over the tracks (variance and sd within
+    tracks, mean_estimate of get_current_estimate()) and each track's are
+    added as track_<i>_<statistic>.
+    """
+    summary = {'num_listeners': len(runs['estimate']),
+               'mean_num_trials': np.mean(np.sum(
+                   ~np.isnan(runs['probe_level']), axis=1)),
+               'reference_level': reference_level}
+    if 'track_estimate' not in runs:
+        ttc = trials_to_convergence(runs['probe_level'], reference_level,
+                                    convergence_tolerance)
+        summary.update(_track_statistics(runs['estimate'], reference_level,
+                                         ttc))
+        return summary
+
+    errors = []
+    ttcs = []
+    variances = []
+    for track_id, track_reference in enumerate(reference_level):
+        estimate = runs['track_estimate'][:, track_id]
+        probe_level = _track_trials(runs['probe_level'], runs['track_id'],
+                                    track_id)
+        ttc = trials_to_convergence(probe_level, track_reference,
+                                    convergence_tolerance)
+        track_summary = _track_statistics(estimate, track_reference, ttc)
+        for name, value in track_summary.items():
+            summary[f'track_{track_id}_{name}'] = value
+        errors.append(estimate - track_reference)
+        ttcs.append(ttc)
+        variances.append(track_summary['variance'])
+    summary.update(_track_statistics(np.concatenate(errors), 0.,
+                                     np.concatenate(ttcs)))
+    summary['reference_level'] = list(reference_level)
+    # the strategy's overall estimate, which has no single reference
+    summary['mean_estimate'] = np.mean(runs['estimate'])
+    summary['variance'] = np.mean(variances)
+    summary['sd'] = np.sqrt(summary['variance'])
+    return summary
+
+
+def _track_statistics(estimate, reference_level, ttc):
+    """Statistics of estimates of one reference level"""
+    error = estimate - reference_level
+    converged = ~np.isnan(ttc)
+    return {
+        'mean_estimate': np.mean(estimate),
+        'bias': np.mean(error),
+        'variance': np.var(estimate),
+        'sd': np.std(estimate),
+        'rmse': np.sqrt(np.mean(error**2)),
+        'proportion_converged': np.mean(converged),
+        'median_trials_to_convergence':
+            np.median(ttc[converged]) if converged.any() else np.nan,
+        }
+
+
+def _track_trials(probe_level, track_id, track):
+    """
+    Probe levels of one track's trials for each listener, moved to the
+    start of the row (in order) and padded with NaN
+    """
+    in_track = track_id == track
+    # a stable sort keeps the order of the track's trials
+    order = np.argsort(~in_track, axis=1, kind='stable')
+    levels = np.take_along_axis(np.where(in_track, probe_level, np.nan),
+                                order, axis=1)
+    return levels[:, :max(in_track.sum(axis=1).max(), 1)]
+
+
+def sweep(strategy_configs, listener, **kwargs):
+    """
+    Simulate several strategies/configs with the same listener
+
+    Parameters
+    ----------
+    strategy_configs : dict
+        name: strategy_config (as for simulate())
+    listener : PsychometricFunction
+    **kwargs
+        passed to simulate()
+
+    Returns
+    -------
+    DataFrame.
+        one row of summary statistics per strategy/config
+    """
+    rows = []
+    for name, strategy_config in strategy_configs.items():
+        summary = simulate(strategy_config, listener, **kwargs)
+        del summary['runs']
+        rows.append({'name': name, **summary})
+    return pd.DataFrame(rows).set_index('name')
+
+
+if __name__ == '__main__':
+    # Example: compare step sizes of the 50% track against QuestPlus
+    from probestrategy import PsychometricFunction
+
+    listener = PsychometricFunction(threshold_db=-4, slope_at_threshold=0.15)
+    configs = {}
+    for step_size in [0.5, 1.0, 1.5, 2.0]:
+        configs[f'TargetFiftyPercent step {step_size}'] = {
+            "class": "probestrategy.TargetFiftyPercent",
+            "settings": {"initial_probe_level": 6, "max_num_trials": 30,
+                         "step_size": step_size}}
+    configs['QuestPlus'] = {
+        "class": "probestrategy.QuestPlus",
+        "settings": {"max_num_trials": 30}}
+    with pd.option_context('display.width', 200,
+                           'display.max_columns', None):
+        print(sweep(configs, listener, num_listeners=1000, seed=0))
@@ -0,0 +1,193 @@
+"""
+Convergence monitoring and stopping criteria for adaptive tracks.
+
+ConvergenceMonitor is updated once per trial with the probe level and the
+direction of the next step. It counts reversals and keeps a running mean and
+standard error (Welford's algorithm) of the reversal levels, which is the
+track's estimate. Every update is O(1).
+
+Stopping criteria are pluggable. They are configured in the same form as
+everything else built by util.instance_builder, e.g.
+
+    "stopping_criteria": [
+        {"class": "probestrategy.stopping.ReversalCount",
+         "settings": {"num_reversals": 8}},
+        {"class": "probestrategy.stopping.StandardErrorBelow",
+         "settings": {"max_standard_error": 0.75}}]
+
+and the track finishes when any (or, with "stop_when": "all", every)
+criterion is met, or at max_num_trials regardless.
+"""
+from abc import ABC, abstractmethod
+import collections
+import math
+
+import util
+
+
+class ConvergenceMonitor():
+    """Reversal count and running statistics of the reversal levels"""
+
+    def __init__(self, num_reversals_to_discard=2):
+        """
+        Parameters
+        ----------
+        num_reversals_to_discard : int, optional
+            The first reversals are counted but left out of the estimate, as
+            they mostly reflect the starting level
+        """
+        self.num_reversals_to_discard = num_reversals_to_discard
+        self.num_trials = 0
+        self.num_reversals = 0
+        self.last_direction = 0
+        # Welford's running mean and sum of squared deviations
+        self.num_estimate_reversals = 0
+        self.mean = math.nan
+        self._m2 = 0.0
+
+    def update(self, probe_level, direction):
+        """
+        Add one trial
+
+        direction is the sign of the step to the next probe level. A change of
+        sign is a reversal at probe_level; steps of zero are ignored.
+        """
+        self.num_trials += 1
+        if direction > 0:
+            direction = 1
+        elif direction < 0:
+            direction = -1
+        else:
+            return
+        if (self.last_direction != 0) and (direction != self.last_direction):
+            self.num_reversals += 1
+            if self.num_reversals > self.num_reversals_to_discard:
+                self._add_to_estimate(probe_level)
+        self.last_direction = direction
+
+    def _add_to_estimate(self, level):
+        self.num_estimate_reversals += 1
+        if self.num_estimate_reversals == 1:
+            self.mean = float(level)
+            return
+        delta = level - self.mean
+        self.mean += delta / self.num_estimate_reversals
+        self._m2 += delta * (level - self.mean)
+
+    @property
+    def estimate(self):
+        """Mean reversal level (NaN until there is a reversal to use)"""
+        return self.mean
+
+    @property
+    def standard_error(self):
+        """Standard error of the estimate (inf with fewer than 2 reversals)"""
+        n = self.num_estimate_reversals
+        if n < 2:
+            return math.inf
+        return math.sqrt(self._m2 / (n - 1) / n)
+
+
+class StoppingCriterion(ABC):
+    """Abstract base class to define the interface"""
+
+    def update(self, monitor):
+        """Called after every update of the monitor"""
+        pass
+
+    @abstractmethod
+    def is_met(self, monitor):
+        pass
+
+
+class ReversalCount(StoppingCriterion):
+    """
+    Stop once there have been num_reversals reversals
+
+    Optional settings (defaults in brackets): num_reversals (8)
+    """
+
+    def __init__(self, config):
+        self.num_reversals = config.get("num_reversals", 8)
+
+    def is_met(self, monitor):
+        return monitor.num_reversals >= self.num_reversals
+
+
+class StandardErrorBelow(StoppingCriterion):
+    """
+    Stop once the standard error of the estimate is at most
+    max_standard_error, based on at least min_reversals reversals
+
+    Optional settings (defaults in brackets): max_standard_error (1.0),
+    min_reversals (3)
+    """
+
+    def __init__(self, config):
+        self.max_standard_error = config.get("max_standard_error", 1.0)
+        self.min_reversals = max(config.get("min_reversals", 3), 2)
+
+    def is_met(self, monitor):
+        return ((monitor.num_estimate_reversals >= self.min_reversals)
+                and (monitor.standard_error <= self.max_standard_error))
+
+
+class StableEstimate(StoppingCriterion):
+    """
+    Stop once the estimate has stayed within a range of tolerance (dB) over
+    the last num_trials trials
+
+    The window minimum and maximum are tracked with monotonic queues so each
+    update is amortised O(1).
+
+    Optional settings (defaults in brackets): num_trials (6), tolerance (1.0)
+    """
+
+    def __init__(self, config):
+        self.num_trials = config.get("num_trials", 6)
+        self.tolerance = config.get("tolerance", 1.0)
+        self._index = 0
+        self._first_valid = None
+        self._min = collections.deque()  # (index, estimate), increasing
+        self._max = collections.deque()  # (index, estimate), decreasing
+
+    def update(self, monitor):
+        estimate = monitor.estimate
+        index = self._index
+        self._index += 1
+        if math.isnan(estimate):
+            return
+        if self._first_valid is None:
+            self._first_valid = index
+        while self._min and self._min[-1][1] >= estimate:
+            self._min.pop()
+        self._min.append((index, estimate))
+        while self._max and self._max[-1][1] <= estimate:
+            self._max.pop()
+        self._max.append((index, estimate))
+        oldest = index - self.num_trials + 1
+        while self._min[0][0] < oldest:
+            self._min.popleft()
+        while self._max[0][0] < oldest:
+            self._max.popleft()
+
+    def is_met(self, monitor):
+        if (self._first_valid is None
+                or self._index - self._first_valid < self.num_trials):
+            return False
+        return self._max[0][1] - self._min[0][1] <= self.tolerance
+
+
+def build_stopping_criteria(config):
+    """
+    Build the criteria listed under stopping_criteria in a settings dict
+
+    Returns a (possibly empty) list of StoppingCriterion and the function
+    used to combine them (any or all)
+    """
+    criteria = [util.instance_builder(criterion_config)
+                for criterion_config in config.get("stopping_criteria", [])]
+    stop_when = config.get("stop_when", "any")
+    if stop_when not in ("any", "all"):
+        raise ValueError("stop_when must be 'any' or 'all'")
+    return criteria, (any if stop_when == "any" else all)
@@ -0,0 +1,223 @@
+"""
+Random assignment of trials to interleaved tracks.
+
+A valid assignment uses each track a given number of times and never uses the
+same track on more than max_run consecutive trials. Sequences are drawn
+uniformly from all valid sequences by counting them with dynamic programming
+and then sampling backwards through the counts, so no rejection is involved.
+
+The counts are indexed by how many trials of each track have been used, so
+there are prod(n_k + 1) of them: fine for two tracks (a 1000 trial block has
+about 250,000) but exponential in the number of tracks. Above MAX_STATES
+states, valid sequences are instead drawn by shuffling the trials and
+rejecting shuffles with a long run, which is also uniform and works well
+when runs are rarely too long, e.g. many tracks with a max_run of 3 or more.
+
+Counts are held as logarithms so long blocks do not overflow.
+"""
+import collections
+import math
+import numpy as np
+
+# largest number of count vectors counted exactly (about 1 s and 100 MB for
+# three tracks) and the most memory kept in the cache of counts
+MAX_STATES = 2**20
+MAX_CACHE_BYTES = 64 * 2**20
+# shuffles tried before giving up on a block too large to count
+MAX_SHUFFLES = 100_000
+SHUFFLE_BATCH = 1000
+
+
+def balanced_trials_per_track(num_trials, num_tracks):
+    """
+    Split num_trials as evenly as possible between num_tracks
+
+    Any remainder is given to the later tracks, e.g. 21 trials over 2 tracks
+    gives [10, 11].
+    """
+    num_trials = int(num_trials)
+    num_tracks = int(num_tracks)
+    trials_per_track = [num_trials // num_tracks] * num_tracks
+    for track in range(num_tracks - num_trials % num_tracks, num_tracks):
+        trials_per_track[track] += 1
+    return trials_per_track
+
+
+def num_states(trials_per_track):
+    """Number of count vectors the exact sampler has to count"""
+    return math.prod(int(n) + 1 for n in trials_per_track)
+
+
+# (trials_per_track, max_run): _count_sequences() result, least recently
+# used first
+_cache = collections.OrderedDict()
+
+
+def _cached_count_sequences(trials_per_track, max_run):
+    key = (trials_per_track, max_run)
+    if key in _cache:
+        _cache.move_to_end(key)
+        return _cache[key]
+    result = _count_sequences(trials_per_track, max_run)
+    _cache[key] = result
+    while sum(value[1].nbytes for value in _cache.values()) > MAX_CACHE_BYTES:
+        _cache.popitem(last=False)
+    return result
+
+
+def _count_sequences(trials_per_track, max_run):
+    """
+    Log number of valid sequences for every partial count vector
+
+    States are count vectors c (trials used so far per track), flattened with
+    strides. Returns (strides, log_not_ending_in, log_num_valid) where
+    log_not_ending_in[j, c] is the log number of valid sequences using
+    exactly c which are empty or do not end with track j. A sequence using c
+    and ending with a run of exactly l trials of track j is one of these
+    for c - l*e_j followed by the run, which gives the recursion.
+    log_num_valid is the log number of complete sequences (-inf if there
+    are none).
+
+    The result is cached (up to MAX_CACHE_BYTES) because the same block is
+    typically built many times (one per listener or simulated listener).
+    """
+    shape = tuple(n + 1 for n in trials_per_track)
+    num_tracks = len(shape)
+    strides = np.ones(num_tracks, dtype=np.int64)
+    for track in range(num_tracks - 2, -1, -1):
+        strides[track] = strides[track + 1] * shape[track + 1]
+    coords = np.indices(shape).reshape(num_tracks, -1)
+    num_states = coords.shape[1]
+
+    # group states by the total number of trials so far
+    total = coords.sum(axis=0)
+    order = np.argsort(total, kind='stable')
+    num_trials = sum(trials_per_track)
+    boundaries = np.searchsorted(total[order], np.arange(num_trials + 2))
+
+    ending_in = np.full((num_tracks, num_states), -np.inf)
+    not_ending_in = np.full((num_tracks, num_states), -np.inf)
+    not_ending_in[:, 0] = 0.0  # the empty sequence
+    for level in range(1, num_trials + 1):
+        states = order[boundaries[level]:boundaries[level + 1]]
+        for track in range(num_tracks):
+            acc = np.full(states.size, -np.inf)
+            for run in range(1, max_run + 1):
+                valid = coords[track, states] >= run
+                if not valid.any():
+                    break
+                source = states[valid] - run * strides[track]
+                acc[valid] = np.logaddexp(acc[valid],
+                                          not_ending_in[track, source])
+            ending_in[track, states] = acc
+        for track in range(num_tracks):
+            others = np.delete(ending_in[:, states], track, axis=0)
+            not_ending_in[track, states] = np.logaddexp.reduce(others, axis=0)
+    # the full sequence may end in any track
+    num_valid = np.logaddexp.reduce(ending_in[:, -1])
+    return strides, not_ending_in, num_valid
+
+
+def random_track_assignment(trials_per_track, max_run, rng=None):
+    """
+    Uniformly random sequence of track indices with a maximum run length
+
+    Parameters
+    ----------
+    trials_per_track : sequence of int
+        Number of trials of each track
+    max_run : int
+        Maximum number of consecutive trials of the same track
+    rng : numpy.random.Generator, int or None, optional
+        Random number generator, or a seed for one
+
+    Returns
+    -------
+    numpy.ndarray.
+        Track index (0, 1, ...) of every trial
+
+    Raises
+    ------
+    ValueError
+        If no sequence satisfies the constraints, e.g. [10, 2] with max_run 3,
+        or the block has more than MAX_STATES count vectors and no valid
+        shuffle was found in MAX_SHUFFLES tries
+    """
+    trials_per_track = tuple(int(n) for n in trials_per_track)
+    max_run = int(max_run)
+    if max_run < 1:
+        raise ValueError('max_run must be at least 1')
+    if any(n < 0 for n in trials_per_track):
+        raise ValueError('trials_per_track must not be negative')
+    rng = np.random.default_rng(rng)
+    if sum(trials_per_track) == 0:
+        return np.zeros(0, dtype=int)
+    if num_states(trials_per_track) > MAX_STATES:
+        return _shuffled_track_assignment(trials_per_track, max_run, rng)
+
+    strides, not_ending_in, num_valid = _cached_count_sequences(
+        trials_per_track, max_run)
+    if not np.isfinite(num_valid):
+        raise ValueError(f'No sequence with {list(trials_per_track)} trials '
+                         f'per track has runs of at most {max_run}')
+
+    # sample runs backwards from the end of the sequence: the last run is
+    # (track, length) with probability proportional to the number of valid
+    # prefixes that can precede it
+    remaining = list(trials_per_track)
+    state = int(np.dot(remaining, strides))
+    next_track = None
+    runs = []
+    while state != 0:
+        candidates = []
+        log_weights = []
+        for track, n in enumerate(remaining):
+            if track == next_track:
+                continue
+            for run in range(1, min(max_run, n) + 1):
+                candidates.append((track, run))
+                log_weights.append(
+                    not_ending_in[track, state - run * strides[track]])
+        log_weights = np.array(log_weights)
+        cumulative = np.cumsum(np.exp(log_weights - log_weights.max()))
+        choice = np.searchsorted(cumulative, rng.random() * cumulative[-1],
+                                 side='right')
+        track, run = candidates[min(choice, len(candidates) - 1)]
+        runs.append((track, run))
+        remaining[track] -= run
+        state -= run * strides[track]
+        next_track = track
+
+    return np.concatenate([np.full(run, track, dtype=int)
+                           for track, run in reversed(runs)])
+
+
+def _shuffled_track_assignment(trials_per_track, max_run, rng):
+    """
+    Uniformly random valid sequence by rejection of random shuffles
+
+    Shuffles are drawn and checked SHUFFLE_BATCH at a time.
+    """
+    trials = np.repeat(np.arange(len(trials_per_track)), trials_per_track)
+    if max_run >= trials.size:
+        return rng.permutation(trials)
+    for _ in range(MAX_SHUFFLES // SHUFFLE_BATCH):
+        # sorting random keys shuffles each row (Generator.permuted needs
+        # numpy 1.20)
+        shuffles = trials[np.argsort(rng.random((SHUFFLE_BATCH,
+                                                 trials.size)), axis=1)]
+        # a run is too long if max_run consecutive neighbours are equal
+        repeats = np.zeros((SHUFFLE_BATCH, trials.size), dtype=np.int32)
+        np.cumsum(shuffles[:, 1:] == shuffles[:, :-1], axis=1,
+                  out=repeats[:, 1:])
+        too_long = np.any(repeats[:, max_run:] - repeats[:, :-max_run]
+                          == max_run, axis=1)
+        valid = np.flatnonzero(~too_long)
+        if valid.size:
+            return shuffles[valid[0]]
+    raise ValueError(f'{list(trials_per_track)} trials per track is too '
+                     f'many to count the sequences with runs of at most '
+                     f'{max_run} ({num_states(trials_per_track)} states, the '
+                     f'limit is {MAX_STATES}), and none of {MAX_SHUFFLES} '
+                     f'random orders was valid. Use fewer tracks or trials '
+                     f'or a larger max_run.')
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+
+class TrialStore:
+    """
+    Columnar, preallocated storage for the results of an adaptive track.
+
+    Each scalar field is held in its own numpy array and the success vectors
+    are held in a 2-D boolean matrix (one row per trial). Capacity is doubled
+    whenever it runs out so appending is amortised O(1). The most recent row
+    of each track is indexed as trials are appended so it can be looked up
+    without searching.
+
+    A DataFrame with the same columns as the original results table is only
+    built on request (see to_dataframe()) and is cached until the next append.
+    """
+    scalar_columns = {'trial_id': np.int64,
+                      'stimulus_id': np.int64,
+                      'track_id': np.int64,
+                      'target_level': np.float64,
+                      'probe_level': np.float64,
+                      'num_correct': np.int64,
+                      'trial_mean': np.float64}
+
+    # columns (and their order) exposed by to_dataframe()
+    dataframe_columns = ['trial_id', 'stimulus_id', 'target_level',
+                         'probe_level', 'success_vector', 'num_correct',
+                         'trial_mean']
+
+    def __init__(self, num_response_intervals, initial_capacity=64,
+                 include_track_id=False):
+        """
+        include_track_id adds track_id (after stimulus_id) to the columns of
+        to_dataframe(), for strategies which interleave several tracks
+        """
+        self.num_response_intervals = num_response_intervals
+        if include_track_id:
+            self.dataframe_columns = list(self.dataframe_columns)
+            self.dataframe_columns.insert(
+                self.dataframe_columns.index('stimulus_id') + 1, 'track_id')
+        self._capacity = max(int(initial_capacity), 1)
+        self._length = 0
+        self._columns = {name: np.zeros(self._capacity, dtype=dtype)
+                         for name, dtype in self.scalar_columns.items()}
+        self._success = np.zeros((self._capacity, num_response_intervals),
+                                 dtype=bool)
+        self._last_row_of_track = {}
+        self._df = None
+
+    def __len__(self):
+        return self._length
+
+    def _grow(self):
+        """Double the capacity of every column"""
+        self._capacity *= 2
+        for name, column in self._columns.items():
+            grown = np.zeros(self._capacity, dtype=column.dtype)
+            grown[:self._length] = column[:self._length]
+            self._columns[name] = grown
+        grown = np.zeros((self._capacity, self.num_response_intervals),
+                         dtype=bool)
+        grown[:self._length, :] = self._success[:self._length, :]
+        self._success = grown
+
+    def append(self, trial_id, stimulus_id, target_level, probe_level,
+               success_vector, track_id=0):
+        """Add the result of a single trial"""
+        if self._length == self._capacity:
+            self._grow()
+        i = self._length
+        success_vector = np.asarray(success_vector, dtype=bool)
+        num_correct = int(np.count_nonzero(success_vector))
+        columns = self._columns
+        columns['trial_id'][i] = trial_id
+        columns['stimulus_id'][i] = stimulus_id
+        columns['track_id'][i] = track_id
+        columns['target_level'][i] = target_level
+        columns['probe_level'][i] = probe_level
+        columns['num_correct'][i] = num_correct
+        columns['trial_mean'][i] = num_correct / len(success_vector)
+        self._success[i, :] = success_vector
+        self._last_row_of_track[track_id] = i
+        self._length += 1
+        self._df = None
+
+    def __getitem__(self, name):
+        """
+        Get a read-only view of the valid part of a column
+
+        'success_vector' returns the 2-D matrix of success vectors
+        """
+        if name == 'success_vector':
+            view = self._success[:self._length, :]
+        else:
+            view = self._columns[name][:self._length]
+        view = view.view()
+        view.flags.writeable = False
+        return view
+
+    def last_row(self, track_id=None):
+        """
+        Index of the most recent row (optionally of a given track)
+
+        Returns None if there are no matching rows
+        """
+        if track_id is None:
+            return self._length - 1 if self._length > 0 else None
+        return self._last_row_of_track.get(track_id)
+
+    def get_row(self, index):
+        """Get a single row as a dict (negative indexes count from the end)"""
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('row index out of range')
+        row = {name: column[index].item()
+               for name, column in self._columns.items()}
+        row['success_vector'] = self._success[index, :].copy()
+        return row
+
+    def to_dataframe(self):
+        """
+        DataFrame view of all the stored trials
+
+        The frame is built lazily and cached until the next call to append()
+        so repeated calls between trials are cheap. It should be treated as
+        read-only.
+        """
+        if self._df is None:
+            n = self._length
+            data = {name: self._columns[name][:n].copy()
+                    for name in self.dataframe_columns
+                    if name != 'success_vector'}
+            data['success_vector'] = list(self._success[:n, :].copy())
+            self._df = pd.DataFrame(data, columns=self.dataframe_columns)
+        return self._df
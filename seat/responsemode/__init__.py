@@ -1,3 +1,29 @@
-from .speech_intelligibility import ExperimenterSelectsCorrectKeywords
-from .stub_for_tests import AlwaysCorrect
-from .stub_for_tests import FailsOnWait
+# Response modes are imported on first use (PEP 562) so that importing the
+# package doesn't load GUI toolkits (PySimpleGUI/tkinter) which only some
+# modes need, e.g. for headless or simulated runs.
+import importlib
+
+_class_modules = {
+    "ExperimenterSelectsCorrectKeywords": ".speech_intelligibility",
+    "AlwaysCorrect": ".stub_for_tests",
+    "FailsOnWait": ".stub_for_tests",
+    "SimulatedListener": ".simulated_listener",
+    "TypedResponse": ".typed_response",
+    "NetworkTerminal": ".network_terminal",
+    "ClosedSetChoice": ".closed_set",
+}
+
+__all__ = list(_class_modules)
+
+
+def __getattr__(name):
+    if name in _class_modules:
+        module = importlib.import_module(_class_modules[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value  # later lookups skip __getattr__
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,163 @@
+"""
+Closed-set alternatives and the correct answer for every stimulus.
+
+A closed-set test has one or more intervals (e.g. the five words of a matrix
+sentence, or the single interval of an n-alternative forced choice), each with
+its own list of alternatives. The answer key holds the index of the correct
+alternative for every (stimulus, interval) as one integer array so a
+response is scored with a single comparison and needs no GUI.
+"""
+import csv
+import pathlib
+
+import numpy as np
+
+import util
+
+
+class AnswerKey():
+    """Alternatives for each interval and the correct ones per stimulus"""
+
+    def __init__(self, choices, answers):
+        """
+        Parameters
+        ----------
+        choices : list of list of str
+            Labels of the alternatives for each interval
+        answers : array_like of int
+            (num_stimuli, num_intervals) index of the correct alternative,
+            or (num_stimuli,) with a single interval
+        """
+        self.choices = [list(labels) for labels in choices]
+        answers = np.asarray(answers, dtype=np.int64)
+        if answers.ndim == 1:
+            answers = answers[:, np.newaxis]
+        if answers.ndim != 2 or answers.shape[1] != len(self.choices):
+            raise ValueError(f'The answer key needs one column per interval '
+                             f'({len(self.choices)}), got shape '
+                             f'{answers.shape}')
+        num_choices = np.array([len(labels) for labels in self.choices])
+        if np.any(answers < 0) or np.any(answers >= num_choices):
+            raise ValueError('The answer key refers to alternatives which '
+                             'are not in the choices')
+        self.answers = answers
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Build from a settings dict
+
+        Either choices (list of lists of labels, one list per interval) or
+        choices_path (CSV with one column per interval and one row per
+        alternative, blank where a column is shorter).
+
+        Either answer_key (nested list) or answer_key_path: a .npy array of
+        indices, or a CSV with one row per stimulus and one column per
+        interval. answer_key_format says what the CSV holds, "labels"
+        (default) or "indices" (0-based), so numeric labels such as the
+        digits of a digits-in-noise test are never read as indices.
+        """
+        if "choices" in config:
+            choices = config["choices"]
+        else:
+            choices_path = pathlib.Path(config["choices_path"])
+            util.check_path_is_file(choices_path)
+            with open(choices_path, newline='', encoding='utf-8-sig') as f:
+                rows = list(csv.reader(f))
+            num_intervals = max((len(row) for row in rows), default=0)
+            choices = [[row[i].strip() for row in rows
+                        if i < len(row) and row[i].strip()]
+                       for i in range(num_intervals)]
+
+        if "answer_key" in config:
+            answers = config["answer_key"]
+        else:
+            answers_path = pathlib.Path(config["answer_key_path"])
+            util.check_path_is_file(answers_path)
+            if answers_path.suffix == '.npy':
+                answers = np.load(answers_path, allow_pickle=False)
+            else:
+                answer_key_format = config.get("answer_key_format",
+                                               "labels")
+                with open(answers_path, newline='',
+                          encoding='utf-8-sig') as f:
+                    rows = [row for row in csv.reader(f) if row]
+                if answer_key_format == "labels":
+                    answers = cls.indices_from_labels(choices, rows)
+                elif answer_key_format == "indices":
+                    answers = cls.indices_from_strings(choices, rows)
+                else:
+                    raise ValueError(f'answer_key_format must be "labels" '
+                                     f'or "indices", got '
+                                     f'{answer_key_format!r}')
+        return cls(choices, answers)
+
+    @staticmethod
+    def _check_row_lengths(choices, rows):
+        for stimulus_id, row in enumerate(rows):
+            if len(row) != len(choices):
+                raise ValueError(f'Row {stimulus_id} of the answer key has '
+                                 f'{len(row)} columns, expected '
+                                 f'{len(choices)}')
+
+    @staticmethod
+    def indices_from_labels(choices, rows):
+        """Convert rows of labels to an index array"""
+        AnswerKey._check_row_lengths(choices, rows)
+        lookup = [{label: index for index, label in enumerate(labels)}
+                  for labels in choices]
+        answers = np.empty((len(rows), len(choices)), dtype=np.int64)
+        for stimulus_id, row in enumerate(rows):
+            for interval, value in enumerate(row):
+                value = value.strip()
+                if value not in lookup[interval]:
+                    raise ValueError(
+                        f'{value!r} is not one of the choices for interval '
+                        f'{interval} (use answer_key_format "indices" for '
+                        f'an answer key of 0-based indices)')
+                answers[stimulus_id, interval] = lookup[interval][value]
+        return answers
+
+    @staticmethod
+    def indices_from_strings(choices, rows):
+        """Convert rows of 0-based index strings to an index array"""
+        AnswerKey._check_row_lengths(choices, rows)
+        try:
+            return np.array([[int(value) for value in row] for row in rows],
+                            dtype=np.int64).reshape(len(rows), len(choices))
+        except ValueError:
+            raise ValueError('The answer key has a cell which is not an '
+                             'index (use answer_key_format "labels" for an '
+                             'answer key of labels)') from None
+
+    @property
+    def num_intervals(self):
+        return len(self.choices)
+
+    def __len__(self):
+        return self.answers.shape[0]
+
+    def answer_labels(self, stimulus_id):
+        return [self.choices[interval][index] for interval, index
+                in enumerate(self.answers[stimulus_id])]
+
+    def score(self, stimulus_id, selection):
+        """
+        Whether each interval's selected alternative is correct
+
+        Parameters
+        ----------
+        selection : array_like of int
+            Index of the selected alternative per interval, -1 for none
+
+        Returns
+        -------
+        list of bool
+            One element per interval, as expected by the adaptive tracks
+        """
+        return (np.asarray(selection) == self.answers[stimulus_id]).tolist()
+
+    def score_batch(self, stimulus_ids, selections):
+        """score() for many trials at once, as a (num_trials, num_intervals)
+        bool array"""
+        return np.asarray(selections) == self.answers[np.asarray(stimulus_ids)]
@@ -0,0 +1,211 @@
+from .response_mode import ResponseMode
+from .response_input import ResponseInput
+from .answer_key import AnswerKey
+import numpy as np
+import PySimpleGUI as sg
+
+
+class ClosedSetChoice(ResponseMode):
+    """
+    Closed-set / n-alternative forced choice, e.g. a matrix sentence test
+
+    The window holds a grid of buttons, one column per interval and one
+    button per alternative. It is created on the first prompt and reused for
+    every trial; only the buttons whose state changes are updated. The
+    selection is scored against an AnswerKey in one vectorised comparison
+    and wait() returns one bool per interval.
+
+    Keyboard: 1-9 and 0 (the tenth alternative) choose in the current
+    interval and move to the next one, BackSpace moves back, Return or space
+    submits once every interval has a choice.
+
+    The response log has the correct labels as its keywords and the selected
+    labels in an extra choices column, both joined with keyword_separator.
+    """
+    accelerator_keys = '1234567890'
+    response_log_schema = {**ResponseMode.response_log_schema,
+                           'choices': 'str'}
+
+    def __init__(self, config):
+        """
+        Required settings: see AnswerKey.from_config
+            choices or choices_path, answer_key or answer_key_path
+        Optional settings (defaults in brackets):
+            answer_key_format ("labels") or "indices" for a CSV answer key
+            prompt ("Select what you heard")
+            wait_interval (0) seconds before input is accepted
+            log_path (None)
+        """
+        self.answer_key = AnswerKey.from_config(config)
+        self.num_intervals = self.answer_key.num_intervals
+        self.prompt = config.get("prompt", "Select what you heard")
+        self.wait_interval = config.get("wait_interval", 0)
+
+        self.open_response_log(config)
+
+        self.done_button_key = 'done_button'
+        self.lockout_event = 'lockout_expired'
+        self.window = None
+        self.response_input = None
+
+        self.stimulus_id = None
+        self.selection = np.full(self.num_intervals, -1, dtype=np.int64)
+        self.current_interval = 0
+        self.result = []
+
+    @staticmethod
+    def button_key(interval, index):
+        return ('choice', interval, index)
+
+    def open_window(self):
+        columns = []
+        for interval, labels in enumerate(self.answer_key.choices):
+            columns.append(sg.Column(
+                [[sg.Button(label, key=self.button_key(interval, index),
+                            size=(10, 1), focus=False)]
+                 for index, label in enumerate(labels)],
+                vertical_alignment='top'))
+        layout = [[sg.Text(self.prompt)],
+                  columns,
+                  [sg.Button('Done', key=self.done_button_key,
+                             disabled=True)]]
+        self.window = sg.Window('Closed-set choice', layout,
+                                keep_on_top=True,
+                                return_keyboard_events=True,
+                                finalize=True)
+        self.default_color = self.window[
+            self.button_key(0, 0)].ButtonColor
+        self.response_input = ResponseInput(self.window)
+
+    def close(self):
+        """Close the window and the log at the end of the block"""
+        if self.window is not None:
+            self.response_input.cancel_all()
+            self.window.close()
+            self.window = None
+        self.close_response_log()
+
+    def show_prompt(self, stimulus_id):
+        self.stimulus_id = stimulus_id
+        self.result = []
+        if self.window is None:
+            self.open_window()
+        else:
+            # clear last trial's choices, leaving the other buttons alone
+            for interval in range(self.num_intervals):
+                self.select(interval, -1)
+        self.selection[:] = -1
+        self.current_interval = 0
+        self.set_controls_enabled(False)
+        self.window.refresh()
+        self.mark_prompt_shown()
+
+    def set_controls_enabled(self, enabled):
+        # the choice buttons stay live, input during the lockout is ignored
+        # in wait(), so a trial only touches the buttons which change
+        self.window[self.done_button_key].update(
+            disabled=not (enabled and np.all(self.selection >= 0)))
+
+    def select(self, interval, index):
+        """Highlight alternative index of interval (-1 for no choice)"""
+        previous = self.selection[interval]
+        if previous == index:
+            return
+        if previous >= 0:
+            self.window[self.button_key(interval, previous)].update(
+                button_color=self.default_color)
+        if index >= 0:
+            self.window[self.button_key(interval, index)].update(
+                button_color=('white', 'green'))
+        self.selection[interval] = index
+
+    def handle_choice(self, interval, index):
+        self.select(interval, index)
+        self.current_interval = min(interval + 1, self.num_intervals - 1)
+        self.window[self.done_button_key].update(
+            disabled=not np.all(self.selection >= 0))
+
+    def wait(self):
+        # until the lockout expires only WIN_CLOSED is acted on
+        self.response_input.cancel_all()
+        controls_enabled = False
+        self.response_input.schedule(self.wait_interval, self.lockout_event)
+        while True:
+            event, values, timestamp_ns = self.response_input.read()
+            # named keys arrive as e.g. 'BackSpace:22'
+            key = event.split(':')[0] if isinstance(event, str) else event
+
+            if event == sg.WIN_CLOSED:
+                self.response_input.cancel_all()
+                self.window = None
+                return
+            elif event == self.lockout_event:
+                self.set_controls_enabled(True)
+                self.mark_controls_enabled(timestamp_ns)
+                controls_enabled = True
+            elif not controls_enabled:
+                continue
+            elif isinstance(event, tuple) and event[0] == 'choice':
+                self.mark_input(timestamp_ns)
+                self.handle_choice(event[1], event[2])
+            elif (isinstance(key, str) and len(key) == 1
+                    and key in self.accelerator_keys):
+                index = self.accelerator_keys.index(key)
+                interval = self.current_interval
+                if index < len(self.answer_key.choices[interval]):
+                    self.mark_input(timestamp_ns)
+                    self.handle_choice(interval, index)
+            elif key == 'BackSpace':
+                self.current_interval = max(self.current_interval - 1, 0)
+            elif (event == self.done_button_key
+                    or key in ('\r', 'Return', ' ', 'space')):
+                if np.all(self.selection >= 0):
+                    self.mark_submitted(timestamp_ns)
+                    self.result = self.answer_key.score(self.stimulus_id,
+                                                        self.selection)
+                    self.log_response(
+                        self.stimulus_id,
+                        self.answer_key.answer_labels(self.stimulus_id),
+                        self.result,
+                        choices=self.keyword_separator.join(
+                            self.selection_labels()))
+                    self.set_controls_enabled(False)
+                    return self.result
+
+    def selection_labels(self):
+        return [self.answer_key.choices[interval][index] if index >= 0
+                else '' for interval, index in enumerate(self.selection)]
+
+    def get_trial_record(self):
+        record = {'stimulus_id': self.stimulus_id}
+        answers = self.answer_key.answer_labels(self.stimulus_id)
+        for interval, label in enumerate(self.selection_labels()):
+            record[f'choice_{interval}'] = label
+            record[f'answer_{interval}'] = answers[interval]
+            record[f'correct_{interval}'] = (self.result[interval]
+                                             if self.result else False)
+        record['n_correct'] = sum(self.result)
+        record['n_intervals'] = self.num_intervals
+        record.update(self.timing_summary())
+        return record
+
+    def trial_record_fields(self):
+        fields = ['stimulus_id']
+        for interval in range(self.num_intervals):
+            fields += [f'choice_{interval}', f'answer_{interval}',
+                       f'correct_{interval}']
+        return fields + ['n_correct', 'n_intervals'] + self.timing_fields()
+
+    def continue_when_ready(self, message="Click continue when ready..."):
+        """
+        Parameters
+        ----------
+        message : STR, optional
+            Message to display. The default is "Click continue when ready...".
+
+        Returns
+        -------
+        Bool.:  False if the popup was cancelled
+        """
+        return_dict = {'OK': True, None: False}
+        return return_dict[sg.popup_ok(message)]
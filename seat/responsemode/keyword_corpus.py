@@ -0,0 +1,184 @@
+"""
+Compact, read-only index of the keywords for each stimulus.
+
+A keywords file has one row per stimulus (the row number is the stimulus_id)
+and one comma separated field per keyword. Rows may have different numbers of
+keywords.
+
+All keywords are held in one UTF-8 byte pool. word_offsets[i] is where word i
+starts in the pool and sentence_offsets[j] is the index of the first word of
+sentence j, so the keywords of any stimulus are found with two lookups and no
+padding is stored for short rows.
+
+The index is cached in a sidecar file (<keywords file>.kwidx.npz) which
+records the SHA-256 of the keywords file it was built from. It is rebuilt
+whenever the keywords file changes.
+"""
+import csv
+import hashlib
+import os
+import pathlib
+import tempfile
+
+import numpy as np
+
+
+class KeywordCorpus():
+    """Keywords for each stimulus_id, stored in a flat string pool"""
+    sidecar_suffix = '.kwidx.npz'
+    format_version = 1
+
+    def __init__(self, pool, word_offsets, sentence_offsets, sha256=''):
+        """
+        Use from_file() or from_rows() rather than calling this directly
+
+        Parameters
+        ----------
+        pool : bytes
+            UTF-8 encoded keywords, concatenated
+        word_offsets : array_like of int
+            Start of each word in pool, plus the end of the last word
+        sentence_offsets : array_like of int
+            Index of the first word of each sentence, plus the total number of
+            words
+        sha256 : str, optional
+            Hash of the file the corpus was read from
+        """
+        self.pool = bytes(pool)
+        self.word_offsets = np.asarray(word_offsets, dtype=np.int64)
+        self.sentence_offsets = np.asarray(sentence_offsets, dtype=np.int64)
+        self.sha256 = sha256
+        # plain lists index faster than numpy arrays for single elements
+        self._word_offsets = self.word_offsets.tolist()
+        self._sentence_offsets = self.sentence_offsets.tolist()
+        if len(self.sentence_offsets) > 1:
+            self.max_keywords = int(np.diff(self.sentence_offsets).max())
+        else:
+            self.max_keywords = 0
+
+    @classmethod
+    def from_rows(cls, rows, sha256=''):
+        """Build the index from an iterable of lists of keywords"""
+        encoded_words = []
+        sentence_offsets = [0]
+        for row in rows:
+            # ragged rows read with a fixed number of columns have empty
+            # trailing fields
+            encoded_words.extend(word.strip().encode('utf-8')
+                                 for word in row if word.strip())
+            sentence_offsets.append(len(encoded_words))
+        word_offsets = np.zeros(len(encoded_words) + 1, dtype=np.int64)
+        np.cumsum([len(word) for word in encoded_words], out=word_offsets[1:])
+        return cls(b''.join(encoded_words), word_offsets, sentence_offsets,
+                   sha256)
+
+    @classmethod
+    def from_file(cls, keywords_path, cache=True):
+        """
+        Load the keywords file, using the cached index if it is up to date
+
+        Parameters
+        ----------
+        keywords_path : str or pathlib.Path
+        cache : bool, optional
+            Read and write the sidecar file. If it can't be written (e.g. a
+            read-only directory) the index is just built in memory.
+        """
+        keywords_path = pathlib.Path(keywords_path)
+        sha256 = file_sha256(keywords_path)
+        sidecar_path = cls.sidecar_path(keywords_path)
+        if cache:
+            corpus = cls.load_sidecar(sidecar_path, sha256)
+            if corpus is not None:
+                return corpus
+
+        with open(keywords_path, newline='', encoding='utf-8-sig') as f:
+            corpus = cls.from_rows(csv.reader(f), sha256)
+
+        if cache:
+            try:
+                corpus.save_sidecar(sidecar_path)
+            except OSError as err:
+                print(f'Could not cache keyword index {sidecar_path}: {err}')
+        return corpus
+
+    @classmethod
+    def sidecar_path(cls, keywords_path):
+        keywords_path = pathlib.Path(keywords_path)
+        return keywords_path.with_name(keywords_path.name + cls.sidecar_suffix)
+
+    @classmethod
+    def load_sidecar(cls, sidecar_path, sha256):
+        """
+        Load a cached index, or return None if it is missing, unreadable or
+        was built from a different file
+        """
+        try:
+            with np.load(sidecar_path, allow_pickle=False) as data:
+                if (int(data['format_version']) != cls.format_version
+                        or str(data['sha256']) != sha256):
+                    return None
+                return cls(data['pool'].tobytes(), data['word_offsets'],
+                           data['sentence_offsets'], sha256)
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def save_sidecar(self, sidecar_path):
+        """Write the index atomically so readers never see a partial file"""
+        sidecar_path = pathlib.Path(sidecar_path)
+        fd, tmp_path = tempfile.mkstemp(dir=sidecar_path.parent,
+                                        prefix=sidecar_path.name,
+                                        suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f,
+                         format_version=np.int64(self.format_version),
+                         sha256=np.str_(self.sha256),
+                         pool=np.frombuffer(self.pool, dtype=np.uint8),
+                         word_offsets=self.word_offsets,
+                         sentence_offsets=self.sentence_offsets)
+            os.replace(tmp_path, sidecar_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def __len__(self):
+        return len(self._sentence_offsets) - 1
+
+    def __getitem__(self, stimulus_id):
+        """Tuple of the keywords (str) for stimulus_id"""
+        stimulus_id = int(stimulus_id)
+        if not 0 <= stimulus_id < len(self):
+            raise IndexError(f'stimulus_id {stimulus_id} is not in the '
+                             f'keywords file ({len(self)} rows)')
+        first = self._sentence_offsets[stimulus_id]
+        last = self._sentence_offsets[stimulus_id + 1]
+        offsets = self._word_offsets
+        pool = self.pool
+        return tuple(pool[offsets[i]:offsets[i + 1]].decode('utf-8')
+                     for i in range(first, last))
+
+    def num_keywords(self, stimulus_id):
+        stimulus_id = int(stimulus_id)
+        return (self._sentence_offsets[stimulus_id + 1]
+                - self._sentence_offsets[stimulus_id])
+
+    def pad_result(self, result):
+        """
+        result (one element per keyword of a stimulus) padded with False to
+        max_keywords
+
+        Every trial then gives the same number of results, as when the rows
+        were read into a NaN-padded DataFrame, which the adaptive tracks
+        require.
+        """
+        return list(result) + [False] * (self.max_keywords - len(result))
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,277 @@
+"""
+Automatic scoring of a typed sentence against the keywords of a stimulus.
+
+Keywords and typed words are compared in normal form: Unicode compatibility
+decomposed with accents removed, case folded and with everything but letters
+and digits dropped. Each word also gets a crude stem (plural, -ed and -ing
+endings and a final 'e' removed) so that simple morphological variants match
+exactly, and a keyword is extended with the normal forms and stems of its
+homophones, if any are listed.
+
+Typed words which don't match any form of a keyword exactly are compared by
+Levenshtein distance, bounded according to the length of the keyword form so
+that short words must be spelt correctly. The distances for every (keyword
+form, typed word) pair are computed together, one numpy row operation per
+character of the keyword.
+
+The forms of every keyword in the corpus are computed when the matcher is
+created; the padded arrays for a stimulus are built on first use, which
+ResponseModes should trigger from show_prompt() with prepare().
+"""
+import csv
+import re
+import unicodedata
+
+import numpy as np
+
+
+_word_pattern = re.compile(r"[^\W_]+(?:'[^\W_]+)*")
+
+# (suffix, replacement), first match wins. Applied only when at least three
+# characters remain. ("ss", "ss") stops e.g. glass losing its final s.
+_suffix_rules = (("ies", "y"), ("ied", "y"), ("sses", "ss"), ("ches", "ch"),
+                 ("shes", "sh"), ("xes", "x"), ("ing", ""), ("ed", ""),
+                 ("ss", "ss"), ("s", ""))
+_keep_double = set("lsz")
+
+
+def normalise(text):
+    """Case folded words of text, without accents or punctuation"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(c for c in decomposed
+                       if not unicodedata.combining(c))
+    return [word.replace("'", "")
+            for word in _word_pattern.findall(stripped.casefold())]
+
+
+def stem(word):
+    """
+    Light suffix stripping of a normalised word so that e.g. plank/planks,
+    glue/glued and slide/sliding share a stem
+    """
+    for suffix, replacement in _suffix_rules:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:len(word) - len(suffix)] + replacement
+            if (suffix in ("ing", "ed") and len(word) >= 4
+                    and word[-1] == word[-2] and word[-1] not in _keep_double):
+                word = word[:-1]  # running -> run
+            break
+    if len(word) > 3 and word.endswith("e"):
+        word = word[:-1]
+    return word
+
+
+def default_edit_bound(form):
+    """Spelling errors allowed for a keyword form of this length"""
+    if len(form) <= 3:
+        return 0
+    if len(form) <= 6:
+        return 1
+    return 2
+
+
+def read_homophones(homophones_path):
+    """
+    Read groups of interchangeable spellings, one comma separated group per
+    line (e.g. "two,too,to")
+    """
+    with open(homophones_path, newline='', encoding='utf-8-sig') as f:
+        return [[word for word in row if word.strip()]
+                for row in csv.reader(f)]
+
+
+def _encode(words, pad):
+    """Code points of words in rows of a padded array, and their lengths"""
+    lengths = np.array([len(word) for word in words], dtype=np.int64)
+    codes = np.full((len(words), max(lengths.max(initial=0), 1)), pad,
+                    dtype=np.int64)
+    # scatter the code points of all the words in one go
+    rows = np.repeat(np.arange(len(words)), lengths)
+    starts = np.cumsum(lengths) - lengths
+    columns = np.arange(rows.size) - np.repeat(starts, lengths)
+    codes[rows, columns] = np.frombuffer(''.join(words).encode('utf-32-le'),
+                                         dtype=np.uint32)
+    return codes, lengths
+
+
+def bounded_levenshtein(a_codes, a_lengths, b_codes, b_lengths, bound):
+    """
+    Levenshtein distance between pairs of padded code point arrays
+
+    Parameters
+    ----------
+    a_codes, b_codes : numpy.ndarray
+        (num_pairs, max_length) with different padding values in a and b
+    a_lengths, b_lengths : numpy.ndarray
+        (num_pairs,) lengths of the unpadded words
+    bound : int or numpy.ndarray
+        Largest distance of interest, for all or each pair
+
+    Returns
+    -------
+    numpy.ndarray
+        (num_pairs,) distances, with anything greater than bound given as
+        bound + 1
+    """
+    num_pairs = a_codes.shape[0]
+    bound = np.broadcast_to(bound, (num_pairs,))
+    j = np.arange(b_codes.shape[1] + 1)
+    # rows[i] holds the distances from the first i characters of a to every
+    # prefix of b
+    rows = [np.broadcast_to(j, (num_pairs, j.size))]
+    for i in range(1, a_codes.shape[1] + 1):
+        row = rows[-1]
+        substitute = (b_codes != a_codes[:, i - 1:i])
+        new_row = np.empty_like(row)
+        new_row[:, 0] = i
+        np.minimum(row[:, :-1] + substitute, row[:, 1:] + 1,
+                   out=new_row[:, 1:])
+        # insertions chain along the row: new[j] = min(new[j], new[j-1] + 1)
+        rows.append(np.minimum.accumulate(new_row - j, axis=1) + j)
+        if np.all(rows[-1].min(axis=1) > bound):
+            break  # the minimum of a row never decreases, so stop early
+    last_row = np.minimum(a_lengths, len(rows) - 1)
+    distance = np.stack(rows)[last_row, np.arange(num_pairs), b_lengths]
+    distance[a_lengths > last_row] = bound[a_lengths > last_row] + 1
+    return np.minimum(distance, bound + 1)
+
+
+class KeywordMatcher():
+    """Score typed responses against the keywords of a KeywordCorpus"""
+
+    def __init__(self, corpus, homophones=None, max_edit_distance=2):
+        """
+        Parameters
+        ----------
+        corpus : KeywordCorpus
+        homophones : list of list of str, optional
+            Groups of words to treat as the same word
+        max_edit_distance : int, optional
+            Upper limit on the spelling errors allowed in any keyword. The
+            limit for each keyword also depends on its length (see
+            default_edit_bound()). 0 only accepts exact matches.
+        """
+        self.corpus = corpus
+        self.max_edit_distance = max_edit_distance
+
+        self.homophones = {}
+        for group in homophones or []:
+            group_forms = set()
+            for word in group:
+                for norm in normalise(word):
+                    group_forms.update((norm, stem(norm)))
+            for form in list(group_forms):
+                self.homophones.setdefault(form, set()).update(group_forms)
+
+        # forms of every distinct keyword, computed once per corpus
+        self._prepared = {}
+        self.forms = {}
+        for stimulus_id in range(len(corpus)):
+            for keyword in corpus[stimulus_id]:
+                if keyword not in self.forms:
+                    self.forms[keyword] = self.keyword_forms(keyword)
+
+    def keyword_forms(self, keyword):
+        """Tuple of the accepted normal forms of a keyword"""
+        norm = ''.join(normalise(keyword))
+        forms = {norm, stem(norm)}
+        for form in list(forms):
+            forms.update(self.homophones.get(form, ()))
+        forms.discard('')
+        return tuple(sorted(forms))
+
+    def prepare(self, stimulus_id):
+        """
+        Lookup table and padded arrays for the keywords of one stimulus
+
+        Returns
+        -------
+        tuple
+            (number of keywords, dict of form to keyword numbers, keyword
+            number of each form, code points of the forms, their lengths,
+            their edit distance bounds)
+        """
+        stimulus_id = int(stimulus_id)
+        if stimulus_id in self._prepared:
+            return self._prepared[stimulus_id]
+        keywords = self.corpus[stimulus_id]
+        exact = {}
+        owners = []
+        forms = []
+        for kw_num, keyword in enumerate(keywords):
+            for form in self.forms.get(keyword) or \
+                    self.keyword_forms(keyword):
+                exact.setdefault(form, []).append(kw_num)
+                owners.append(kw_num)
+                forms.append(form)
+        codes, lengths = _encode(forms, pad=-1)
+        bounds = np.array([min(default_edit_bound(form),
+                               self.max_edit_distance) for form in forms],
+                          dtype=np.int64)
+        prepared = (len(keywords), exact, np.array(owners, dtype=np.int64),
+                    codes, lengths, bounds)
+        self._prepared[stimulus_id] = prepared
+        return prepared
+
+    def score(self, stimulus_id, response_text):
+        """
+        Whether each keyword of the stimulus was in the response
+
+        Each typed word can only account for one keyword.
+
+        Returns
+        -------
+        list of bool
+            One element per keyword, as for ExperimenterSelectsCorrectKeywords
+        """
+        (num_keywords, exact, owners, codes, lengths,
+         bounds) = self.prepare(stimulus_id)
+        tokens = normalise(response_text)
+
+        # (distance, keyword number, token number)
+        candidates = []
+        matched = np.zeros(num_keywords, dtype=bool)
+        unmatched_forms = {}  # form: token numbers, for the fuzzy search
+        for tok_num, norm in enumerate(tokens):
+            forms = (norm, stem(norm))
+            kw_nums = exact.get(forms[0], []) + exact.get(forms[1], [])
+            if kw_nums:
+                candidates.extend((0, kw_num, tok_num) for kw_num in kw_nums)
+                matched[kw_nums] = True
+            else:
+                for form in forms:
+                    unmatched_forms.setdefault(form, set()).add(tok_num)
+
+        # spelling errors, only between keywords and typed words without an
+        # exact match
+        fuzzy = np.flatnonzero((bounds > 0) & ~matched[owners])
+        if unmatched_forms and fuzzy.size:
+            token_forms = list(unmatched_forms)
+            token_codes, token_lengths = _encode(token_forms, pad=-2)
+            form_index = np.repeat(fuzzy, len(token_forms))
+            token_index = np.tile(np.arange(len(token_forms)), fuzzy.size)
+            # the distance is at least the difference in length
+            possible = (np.abs(lengths[form_index] - token_lengths[token_index])
+                        <= bounds[form_index])
+            form_index = form_index[possible]
+            token_index = token_index[possible]
+            pair_bounds = bounds[form_index]
+            distance = bounded_levenshtein(
+                codes[form_index], lengths[form_index],
+                token_codes[token_index], token_lengths[token_index],
+                pair_bounds)
+            close = np.flatnonzero(distance <= pair_bounds)
+            for d, kw_num, form_num in zip(distance[close].tolist(),
+                                           owners[form_index[close]].tolist(),
+                                           token_index[close].tolist()):
+                candidates.extend(
+                    (d, kw_num, tok_num)
+                    for tok_num in unmatched_forms[token_forms[form_num]])
+
+        result = [False] * num_keywords
+        used_tokens = set()
+        for _, kw_num, tok_num in sorted(candidates):
+            if not result[kw_num] and tok_num not in used_tokens:
+                result[kw_num] = True
+                used_tokens.add(tok_num)
+        return result
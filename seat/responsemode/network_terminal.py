@@ -0,0 +1,530 @@
+"""
+Response terminal on another device (e.g. a tablet) connected to the booth PC
+over HTTP/WebSocket.
+
+TerminalServer runs an asyncio server in a background thread. GET / serves a
+small page which opens a WebSocket to /ws; from then on everything is pushed
+over that one connection as JSON text messages:
+
+    server -> terminal
+        {"type": "prompt", "trial": n, "stimulus_id": id, "keywords": [...]}
+        {"type": "enable", "trial": n}   input is now accepted
+        {"type": "message", "id": m, "text": "..."}
+    terminal -> server
+        {"type": "shown", "trial": n}    sent as soon as a prompt is drawn
+        {"type": "input", "trial": n}    optional, each toggle
+        {"type": "response", "trial": n, "result": [true, false, ...]}
+        {"type": "cancel", "trial": n}   abandon the trial
+        {"type": "continue", "id": m, "ok": true}
+
+Only one terminal is connected at a time: a new connection replaces the old
+one and is sent the current prompt, so a tablet can reconnect mid-block. All
+times are taken on the server with time.perf_counter_ns() when a message is
+written or read, so the terminal's clock doesn't matter.
+"""
+import asyncio
+import concurrent.futures
+import json
+import math
+import pathlib
+import queue
+import socket
+import threading
+import time
+
+
+import util
+from . import websocket
+from .keyword_corpus import KeywordCorpus
+from .response_mode import ResponseMode
+
+
+TERMINAL_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Response terminal</title>
+<style>
+body {font-family: sans-serif; text-align: center; margin-top: 2em}
+button {font-size: 1.5em; margin: 0.3em; padding: 0.5em 1em}
+.kw {background: #c33; color: white} .kw.correct {background: #3a3}
+</style></head>
+<body>
+<p id="status">Connecting...</p>
+<div id="keywords"></div>
+<button id="done" disabled>Done</button>
+<button id="cancel" disabled>Cancel</button>
+<script>
+let ws, trial = null, result = [];
+const status = document.getElementById('status');
+const keywords = document.getElementById('keywords');
+const done = document.getElementById('done');
+const cancel = document.getElementById('cancel');
+function send(message) { ws.send(JSON.stringify(message)); }
+function setEnabled(enabled) {
+  for (const b of keywords.children) b.disabled = !enabled;
+  done.disabled = !enabled;
+}
+function connect() {
+  ws = new WebSocket('ws://' + location.host + '/ws');
+  ws.onopen = () => { status.textContent = 'Waiting for the next trial'; };
+  ws.onclose = () => { status.textContent = 'Reconnecting...';
+                       setTimeout(connect, 500); };
+  ws.onmessage = (event) => {
+    const m = JSON.parse(event.data);
+    if (m.type === 'prompt') {
+      trial = m.trial;
+      result = m.keywords.map(() => false);
+      keywords.replaceChildren(...m.keywords.map((kw, i) => {
+        const b = document.createElement('button');
+        b.textContent = kw; b.className = 'kw';
+        b.onclick = () => { result[i] = !result[i];
+                            b.classList.toggle('correct', result[i]);
+                            send({type: 'input', trial: trial}); };
+        return b; }));
+      setEnabled(false);
+      cancel.disabled = false;
+      status.textContent = 'Select the correctly identified words';
+      send({type: 'shown', trial: trial});
+    } else if (m.type === 'enable' && m.trial === trial) {
+      setEnabled(true);
+    } else if (m.type === 'message') {
+      const ok = window.confirm(m.text);
+      send({type: 'continue', id: m.id, ok: ok});
+    }
+  };
+}
+done.onclick = () => { setEnabled(false); cancel.disabled = true;
+                       send({type: 'response', trial: trial, result: result}); };
+cancel.onclick = () => { setEnabled(false); cancel.disabled = true;
+                         send({type: 'cancel', trial: trial}); };
+connect();
+</script></body></html>
+"""
+
+
+class TerminalServer():
+    """
+    asyncio HTTP/WebSocket server in a background thread
+
+    Messages from the terminal are put on the events queue as
+    (timestamp_ns, message) tuples. Connection changes arrive as messages of
+    type "connected" and "disconnected".
+    """
+
+    def __init__(self, host='127.0.0.1', port=8765, page=TERMINAL_PAGE,
+                 send_timeout=5):
+        self.host = host
+        self.port = port
+        self.send_timeout = send_timeout
+        self.page = page.encode('utf-8')
+        self.events = queue.Queue()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, daemon=True,
+                                       name='terminal_server')
+        self._server = None
+        self._writer = None  # the current connection
+        self._replay = {}  # latest message of each type, for reconnections
+        self._started = threading.Event()
+        self._startup_error = None
+
+    def start(self, timeout=5):
+        self.thread.start()
+        self._started.wait(timeout)
+        if self._startup_error is not None:
+            raise self._startup_error
+        if self._server is None:
+            raise TimeoutError('terminal server did not start')
+        print(f'Response terminal at http://{self.host}:{self.port}/')
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self._server = self.loop.run_until_complete(
+                asyncio.start_server(self._handle_connection, self.host,
+                                     self.port))
+            # port 0 picks a free port
+            self.port = self._server.sockets[0].getsockname()[1]
+        except OSError as err:
+            self._startup_error = err
+            self._started.set()
+            return
+        self._started.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            self.loop.close()
+
+    def stop(self, timeout=5):
+        if not self.thread.is_alive():
+            return
+        future = asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop)
+        try:
+            future.result(timeout)
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout)
+
+    async def _shutdown(self):
+        self._server.close()
+        if self._writer is not None:
+            self._close_writer(self._writer, 1001, 'server stopping')
+        await self._server.wait_closed()
+
+    def send(self, message, replay=True):
+        """
+        Push a message to the terminal (thread-safe)
+
+        If no terminal is connected it is delivered on connection, as is the
+        latest message of each type sent with replay=True.
+
+        Returns
+        -------
+        int.
+            time.perf_counter_ns() when it was written to the connection, or
+            when it was queued if there is no connection
+
+        Raises TimeoutError if the server thread doesn't send it within
+        send_timeout seconds.
+        """
+        future = concurrent.futures.Future()
+
+        def send_now():
+            if not future.set_running_or_notify_cancel():
+                return  # timed out, don't send it late
+            try:
+                future.set_result(self._send_now(message, replay))
+            except Exception as err:
+                future.set_exception(err)
+        self.loop.call_soon_threadsafe(send_now)
+        try:
+            return future.result(self.send_timeout)
+        except concurrent.futures.TimeoutError:
+            # not the builtin TimeoutError before Python 3.11
+            if not future.cancel():
+                # it started sending just now
+                return future.result()
+            raise TimeoutError('terminal server did not send the '
+                               f'{message["type"]} message within '
+                               f'{self.send_timeout} s') from None
+
+    def send_later(self, delay_s, message, replay=True):
+        """
+        Push a message after delay_s seconds (thread-safe)
+
+        The time it is sent is put on the events queue as a message of type
+        "sent" with the original message under "message".
+        """
+        def fire():
+            timestamp_ns = self._send_now(message, replay)
+            self.events.put((timestamp_ns,
+                             {'type': 'sent', 'message': message}))
+        handle = []
+
+        def schedule():
+            handle.append(self.loop.call_later(delay_s, fire))
+        self.loop.call_soon_threadsafe(schedule)
+
+        def cancel():
+            self.loop.call_soon_threadsafe(
+                lambda: handle and handle[0].cancel())
+        return cancel
+
+    def forget(self, *message_types):
+        """Stop replaying the latest messages of these types (thread-safe)"""
+        def remove():
+            for message_type in message_types:
+                self._replay.pop(message_type, None)
+        self.loop.call_soon_threadsafe(remove)
+
+    def _send_now(self, message, replay):
+        if replay:
+            if message['type'] == 'prompt':
+                # a new trial makes everything else stale
+                self._replay.clear()
+            self._replay[message['type']] = message
+        timestamp_ns = time.perf_counter_ns()
+        if self._writer is not None:
+            self._writer.write(websocket.encode_frame(json.dumps(message)))
+        return timestamp_ns
+
+    def _close_writer(self, writer, code=1000, reason=''):
+        try:
+            writer.write(websocket.encode_frame(
+                websocket.close_payload(code, reason), websocket.OP_CLOSE))
+        except (ConnectionError, RuntimeError):
+            pass
+        writer.close()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            request = await reader.readuntil(b'\r\n\r\n')
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                ConnectionError):
+            writer.close()
+            return
+        lines = request.decode('latin-1').split('\r\n')
+        method, path, *_ = lines[0].split(' ') + ['', '']
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+
+        if method != 'GET':
+            self._http_response(writer, '405 Method Not Allowed')
+        elif (path == '/ws'
+                and headers.get('upgrade', '').lower() == 'websocket'
+                and 'sec-websocket-key' in headers):
+            await self._websocket_session(reader, writer,
+                                          headers['sec-websocket-key'])
+        elif path in ('/', '/index.html'):
+            self._http_response(writer, '200 OK', self.page,
+                                'text/html; charset=utf-8')
+        else:
+            self._http_response(writer, '404 Not Found')
+
+    def _http_response(self, writer, status, body=b'',
+                       content_type='text/plain'):
+        writer.write((f'HTTP/1.1 {status}\r\n'
+                      f'Content-Type: {content_type}\r\n'
+                      f'Content-Length: {len(body)}\r\n'
+                      'Cache-Control: no-store\r\n'
+                      'Connection: close\r\n\r\n').encode('latin-1') + body)
+        writer.close()
+
+    async def _websocket_session(self, reader, writer, key):
+        writer.write(('HTTP/1.1 101 Switching Protocols\r\n'
+                      'Upgrade: websocket\r\n'
+                      'Connection: Upgrade\r\n'
+                      f'Sec-WebSocket-Accept: {websocket.accept_key(key)}'
+                      '\r\n\r\n').encode('latin-1'))
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            # small messages, send them straight away
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        if self._writer is not None:
+            self._close_writer(self._writer, 4000, 'replaced')
+        self._writer = writer
+        self.events.put((time.perf_counter_ns(), {'type': 'connected'}))
+        for message in list(self._replay.values()):
+            writer.write(websocket.encode_frame(json.dumps(message)))
+
+        assembler = websocket.FrameAssembler(expect_masked=True)
+        try:
+            while True:
+                opcode, payload = await websocket.read_message(reader,
+                                                               assembler)
+                timestamp_ns = time.perf_counter_ns()
+                if opcode == websocket.OP_TEXT:
+                    try:
+                        message = json.loads(payload.decode('utf-8'))
+                    except ValueError:
+                        continue
+                    if isinstance(message, dict):
+                        self.events.put((timestamp_ns, message))
+                elif opcode == websocket.OP_PING:
+                    writer.write(websocket.encode_frame(payload,
+                                                        websocket.OP_PONG))
+                elif opcode == websocket.OP_CLOSE:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError,
+                websocket.WebSocketError):
+            pass
+        finally:
+            if self._writer is writer:
+                self._writer = None
+                self.events.put((time.perf_counter_ns(),
+                                 {'type': 'disconnected'}))
+                self._close_writer(writer)
+
+
+class NetworkTerminal(ResponseMode):
+    """
+    Keyword scoring on a remote terminal served by TerminalServer
+
+    The terminal shows the keywords as toggle buttons, as in
+    ExperimenterSelectsCorrectKeywords, and wait() returns one bool per
+    keyword, padded with False to the longest sentence. Without keywords_path
+    the prompt has no keywords and the result is whatever list the terminal
+    sends.
+
+    wait() returns None, as the other modes do when their window is closed,
+    if the trial is cancelled on the terminal or no response arrives within
+    response_timeout seconds.
+    """
+    def __init__(self, config):
+        """
+        Optional settings (defaults in brackets):
+            host ("127.0.0.1") - use "0.0.0.0" to accept other devices
+            port (8765) - 0 picks a free port, see self.server.port
+            keywords_path (None), keywords_cache (True)
+            wait_interval (1) seconds before input is accepted
+            rtt_budget_ms (20) warn when the prompt takes longer than this to
+                be acknowledged
+            response_timeout (None) seconds wait() waits for a response,
+                None waits indefinitely
+            send_timeout (5) seconds to wait for the server thread to send
+                a message
+            log_path (None)
+        """
+        self.corpus = None
+        if "keywords_path" in config:
+            keywords_path = pathlib.Path(config["keywords_path"])
+            util.check_path_is_file(keywords_path)
+            self.corpus = KeywordCorpus.from_file(
+                keywords_path, cache=config.get("keywords_cache", True))
+
+        self.wait_interval = config.get("wait_interval", 1)
+        self.rtt_budget_ms = config.get("rtt_budget_ms", 20)
+        self.response_timeout = config.get("response_timeout", None)
+
+        self.open_response_log(config)
+
+        self.server = TerminalServer(config.get("host", "127.0.0.1"),
+                                     config.get("port", 8765),
+                                     send_timeout=config.get("send_timeout",
+                                                             5))
+        self.server.start()
+
+        self.trial = 0
+        self.message_id = 0
+        self.stimulus_id = None
+        self.keywords = ()
+        self.result = []
+        self.prompt_sent_ns = None
+        self.prompt_rtt_ms = float('nan')
+
+    def close(self):
+        self.server.stop()
+        self.close_response_log()
+
+    def _next_event(self, timeout=None):
+        """Raises queue.Empty if there is no event within timeout seconds"""
+        timestamp_ns, message = self.server.events.get(timeout=timeout)
+        if message['type'] == 'connected':
+            print('Response terminal connected')
+        elif message['type'] == 'disconnected':
+            print('Response terminal disconnected - waiting for it to '
+                  'reconnect')
+        return timestamp_ns, message
+
+    def show_prompt(self, stimulus_id):
+        self.trial += 1
+        self.stimulus_id = stimulus_id
+        self.keywords = (self.corpus[stimulus_id] if self.corpus is not None
+                         else ())
+        self.result = []
+        self.prompt_rtt_ms = float('nan')
+        self.prompt_sent_ns = self.server.send(
+            {'type': 'prompt', 'trial': self.trial,
+             'stimulus_id': int(stimulus_id),
+             'keywords': list(self.keywords)})
+        self.mark_prompt_shown(self.prompt_sent_ns)
+
+    def wait(self):
+        cancel_enable = self.server.send_later(
+            self.wait_interval, {'type': 'enable', 'trial': self.trial})
+        controls_enabled = False
+        if self.response_timeout is not None:
+            deadline = time.monotonic() + self.response_timeout
+        try:
+            while True:
+                timeout = None
+                if self.response_timeout is not None:
+                    timeout = max(deadline - time.monotonic(), 0)
+                try:
+                    timestamp_ns, message = self._next_event(timeout)
+                except queue.Empty:
+                    print(f'No response from the terminal within '
+                          f'{self.response_timeout} s')
+                    self.server.forget('prompt', 'enable')
+                    return
+                kind = message['type']
+                if kind == 'connected' and math.isnan(self.prompt_rtt_ms):
+                    # the prompt is replayed to a new connection
+                    self.prompt_sent_ns = timestamp_ns
+                    continue
+                if kind == 'sent':
+                    kind = 'sent_' + message['message']['type']
+                    message = message['message']
+                if message.get('trial', self.trial) != self.trial:
+                    continue  # left over from an earlier trial
+                if kind == 'shown':
+                    if math.isnan(self.prompt_rtt_ms):  # first
+                        self.prompt_rtt_ms = \
+                            (timestamp_ns - self.prompt_sent_ns) / 1e6
+                        if self.prompt_rtt_ms > self.rtt_budget_ms:
+                            print(f'Response terminal took '
+                                  f'{self.prompt_rtt_ms:.1f} ms to show '
+                                  f'the prompt')
+                elif kind == 'cancel':
+                    print('Trial cancelled on the response terminal')
+                    self.server.forget('prompt', 'enable')
+                    return
+                elif kind == 'sent_enable':
+                    self.mark_controls_enabled(timestamp_ns)
+                    controls_enabled = True
+                elif not controls_enabled:
+                    continue
+                elif kind == 'input':
+                    self.mark_input(timestamp_ns)
+                elif kind == 'response':
+                    result = [bool(r) for r in message.get('result', [])]
+                    if self.corpus is not None and \
+                            len(result) != len(self.keywords):
+                        print('Ignoring response with the wrong number of '
+                              'keywords')
+                        continue
+                    self.mark_submitted(timestamp_ns)
+                    self.result = result
+                    # a terminal reconnecting now shouldn't see this trial
+                    self.server.forget('prompt', 'enable')
+                    self.log_response(self.stimulus_id, self.keywords,
+                                      self.result)
+                    if self.corpus is None:
+                        return self.result
+                    return self.corpus.pad_result(self.result)
+        finally:
+            cancel_enable()
+
+    def get_trial_record(self):
+        record = {'stimulus_id': self.stimulus_id,
+                  'prompt_rtt_ms': self.prompt_rtt_ms}
+        for i, correct in enumerate(self.result):
+            key = 'kw_' + str(i)
+            if i < len(self.keywords):
+                record[key] = self.keywords[i]
+            record[key + '_correct'] = correct
+        record['n_correct'] = sum(self.result)
+        record['n_keywords'] = len(self.result)
+        record.update(self.timing_summary())
+        return record
+
+    def trial_record_fields(self):
+        if self.corpus is None:
+            # the number of results is up to the terminal
+            return None
+        fields = ['stimulus_id', 'prompt_rtt_ms']
+        for i in range(self.corpus.max_keywords):
+            fields += ['kw_' + str(i), 'kw_' + str(i) + '_correct']
+        return fields + ['n_correct', 'n_keywords'] + self.timing_fields()
+
+    def continue_when_ready(self, message="Press OK when ready..."):
+        """
+        Show message on the terminal and wait for it to be acknowledged
+
+        Returns
+        -------
+        Bool.:  False if it was cancelled on the terminal
+        """
+        self.message_id += 1
+        self.server.send({'type': 'message', 'id': self.message_id,
+                          'text': message})
+        while True:
+            _, reply = self._next_event()
+            if reply['type'] == 'continue' and \
+                    reply.get('id') == self.message_id:
+                self.server.forget('message')
+                return bool(reply.get('ok', False))
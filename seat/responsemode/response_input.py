@@ -0,0 +1,102 @@
+import collections
+import threading
+import time
+
+
+TimedEvent = collections.namedtuple('TimedEvent',
+                                    ['event', 'values', 'timestamp_ns'])
+TimedEvent.__doc__ = """
+An event from ResponseInput.read()
+
+event : the window event key, or the key given to schedule()/post()
+values : the window's values. For scheduled/posted events values[event] is
+    the value which was given, as for window.write_event_value().
+timestamp_ns : time.perf_counter_ns() when the input arrived or the timer
+    fired
+"""
+
+
+class ResponseInput():
+    """
+    Single, blocking source of timed events for a PySimpleGUI window
+
+    Key/button events from the window and timers (e.g. the end of a response
+    lockout) arrive through the same blocking window.read(), so nothing needs
+    to poll. Timers run on threading.Timer and post their event with
+    window.write_event_value(), which is thread-safe, stamped with the time
+    they actually fired.
+
+    Window events are stamped with time.perf_counter_ns() when the read
+    returns.
+    """
+    timer_event_prefix = '-timer-'
+
+    def __init__(self, window):
+        self.window = window
+        self._timers = {}
+        self._generation = 0
+
+    def schedule(self, delay_s, event, value=None):
+        """
+        Deliver event (with value) to read() after delay_s seconds
+
+        Scheduling the same event again replaces the pending timer.
+        """
+        self.cancel(event)
+        generation = self._generation
+        window = self.window
+
+        def fire():
+            window.write_event_value(
+                (self.timer_event_prefix, event),
+                (generation, value, time.perf_counter_ns()))
+
+        timer = threading.Timer(delay_s, fire)
+        timer.daemon = True
+        self._timers[event] = timer
+        timer.start()
+        return timer
+
+    def cancel(self, event):
+        """Cancel a pending timer (no effect if it has already fired)"""
+        timer = self._timers.pop(event, None)
+        if timer is not None:
+            timer.cancel()
+
+    def cancel_all(self):
+        """
+        Cancel every pending timer and ignore any which have already posted
+        an event but not yet been read
+        """
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        self._generation += 1
+
+    def post(self, event, value=None):
+        """Queue an event for read() straight away (thread-safe)"""
+        self.window.write_event_value(
+            (self.timer_event_prefix, event),
+            (self._generation, value, time.perf_counter_ns()))
+
+    def read(self):
+        """
+        Block until the next event
+
+        Returns a TimedEvent. The window being closed gives sg.WIN_CLOSED as
+        the event.
+        """
+        while True:
+            event, values = self.window.read()
+            timestamp_ns = time.perf_counter_ns()
+            if (isinstance(event, tuple) and len(event) == 2
+                    and event[0] == self.timer_event_prefix):
+                generation, value, timestamp_ns = values[event]
+                if generation != self._generation:
+                    continue  # cancelled after it fired
+                self._timers.pop(event[1], None)
+                values = dict(values)
+                del values[event]
+                values[event[1]] = value
+                return TimedEvent(event[1], values, timestamp_ns)
+            return TimedEvent(event, values, timestamp_ns)
@@ -1,8 +1,40 @@
 from abc import ABC, abstractmethod
+import math
+import pathlib
+import time
+import pandas as pd
+import seatlog
 
 
 class ResponseMode(ABC):
-    """Abstract base class to define the interface"""
+    """
+    Abstract base class to define the interface
+
+    Also provides per-trial timing marks, recorded with
+    time.perf_counter_ns(). Implementations call mark_prompt_shown() at the
+    end of show_prompt(), mark_controls_enabled() when responses are
+    accepted, mark_input() for every input and mark_submitted() when the
+    response is complete. run_block calls mark_stimulus_presented(). The marks
+    are summarised by get_timing_data().
+    """
+    timing_marks = ('prompt_shown', 'stimulus_presented', 'controls_enabled',
+                    'submitted')
+
+    # fixed schema of the per-response log (see log_response), whatever the
+    # number of keywords
+    response_log_schema = {'stimulus_id': 'int64',
+                           'keywords': 'str',
+                           'correct_mask': 'int64',
+                           'n_keywords': 'int64',
+                           'n_correct': 'int64',
+                           'timestamp': 'float64',
+                           't_controls_enabled_ms': 'float64',
+                           't_submitted_ms': 'float64',
+                           'response_latency_ms': 'float64',
+                           't_inputs_ms': 'str'}
+    keyword_separator = '|'
+    # t_inputs_ms holds the time of every input, joined with this
+    input_times_separator = '|'
 
     @abstractmethod
     def show_prompt(self, stimulus_id):
@@ -12,10 +44,193 @@ class ResponseMode(ABC):
     def wait(self):
         pass
     
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # older implementations only override get_trial_data(). Give them a
+        # get_trial_record() so they still satisfy the abstract method, while
+        # a class with neither can't be instantiated
+        if (getattr(cls.get_trial_record, '__isabstractmethod__', False)
+                and cls.get_trial_data is not ResponseMode.get_trial_data):
+            cls.get_trial_record = ResponseMode._record_from_trial_data
+
     @abstractmethod
+    def get_trial_record(self):
+        """
+        Data describing the latest trial as a dict (e.g. for writing to log)
+
+        Implementations should include timing_summary(). Older
+        implementations which only override get_trial_data() are converted.
+        """
+        pass
+
+    def _record_from_trial_data(self):
+        return seatlog.as_record(self.get_trial_data())
+
+    def trial_record_fields(self):
+        """
+        Names of the fields of get_trial_record(), if they are known before
+        the first trial, otherwise None
+        """
+        return None
+
     def get_trial_data(self):
+        """get_trial_record() as a single row DataFrame, e.g. for analysis"""
+        return pd.DataFrame([self.get_trial_record()])
+
+    # implement conext manager magic
+    def __enter__(self):
+        return self
+
+    # implement conext manager magic
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def connect_renderer(self, avrenderer):
+        """
+        Opportunity to follow the AVRendererControl, e.g. its probe level
+
+        Called by run_block once both have been created. Most response modes
+        get everything they need from the participant so do nothing.
+        """
         pass
 
+    def _reset_timing(self):
+        self.timing_ns = dict.fromkeys(self.timing_marks)
+        self.input_times_ns = []
+
+    def _mark(self, name, timestamp_ns):
+        if not hasattr(self, 'timing_ns'):
+            self._reset_timing()
+        if timestamp_ns is None:
+            timestamp_ns = time.perf_counter_ns()
+        self.timing_ns[name] = timestamp_ns
+
+    def mark_prompt_shown(self, timestamp_ns=None):
+        """Start of a trial's timing - clears the previous trial's marks"""
+        self._reset_timing()
+        self._mark('prompt_shown', timestamp_ns)
+
+    def mark_stimulus_presented(self, timestamp_ns=None):
+        self._mark('stimulus_presented', timestamp_ns)
+
+    def mark_controls_enabled(self, timestamp_ns=None):
+        self._mark('controls_enabled', timestamp_ns)
+
+    def mark_input(self, timestamp_ns=None):
+        """An input which doesn't complete the response, e.g. a toggle"""
+        if not hasattr(self, 'timing_ns'):
+            self._reset_timing()
+        if timestamp_ns is None:
+            timestamp_ns = time.perf_counter_ns()
+        self.input_times_ns.append(timestamp_ns)
+
+    def mark_submitted(self, timestamp_ns=None):
+        self._mark('submitted', timestamp_ns)
+
+    def timing_fields(self):
+        """Names of the fields of timing_summary(), in order"""
+        return (['t_' + name + '_ms' for name in self.timing_marks
+                 if name != 'prompt_shown']
+                + ['num_inputs', 't_first_input_ms', 't_last_input_ms',
+                   't_inputs_ms', 'response_latency_ms'])
+
+    def get_timing_data(self):
+        """Timing of the latest trial as a single row DataFrame"""
+        return pd.DataFrame([self.timing_summary()])
+
+    def timing_summary(self):
+        """
+        Timing of the latest trial as a dict
+
+        Times are in milliseconds relative to the prompt being shown (NaN if
+        the mark wasn't recorded). t_inputs_ms has the time of every input,
+        to the microsecond, joined with input_times_separator (an empty
+        string if there were none). response_latency_ms is from the controls
+        being enabled (or the stimulus, if there is no lockout) to
+        submission.
+        """
+        if not hasattr(self, 'timing_ns'):
+            self._reset_timing()
+        marks = self.timing_ns
+        origin = marks['prompt_shown']
+
+        def relative_ms(timestamp_ns):
+            if (origin is None) or (timestamp_ns is None):
+                return math.nan
+            return (timestamp_ns - origin) / 1e6
+
+        row = {'t_' + name + '_ms': relative_ms(marks[name])
+               for name in self.timing_marks if name != 'prompt_shown'}
+        inputs = self.input_times_ns
+        row['num_inputs'] = len(inputs)
+        row['t_first_input_ms'] = relative_ms(inputs[0] if inputs else None)
+        row['t_last_input_ms'] = relative_ms(inputs[-1] if inputs else None)
+        row['t_inputs_ms'] = self.input_times_separator.join(
+            f'{relative_ms(timestamp_ns):.3f}' for timestamp_ns in inputs)
+        start = marks['controls_enabled']
+        if start is None:
+            start = marks['stimulus_presented']
+        if (start is None) or (marks['submitted'] is None):
+            row['response_latency_ms'] = math.nan
+        else:
+            row['response_latency_ms'] = (marks['submitted'] - start) / 1e6
+        return row
+
+    def open_response_log(self, config):
+        """
+        Start the response log if the settings include log_path
+
+        The log is a seatlog.RecordWriter with response_log_schema, see
+        log_response(). Call close_response_log() in close().
+        """
+        self.response_log = None
+        if "log_path" in config:
+            self.response_log = seatlog.RecordWriter.from_config(
+                pathlib.Path(config["log_path"]), self.response_log_schema,
+                config)
+
+    def log_response(self, stimulus_id, keywords, result, **extra):
+        """
+        Append one response to the log (if there is one)
+
+        The keywords are joined with keyword_separator and the result is
+        stored as a bitmask: bit i is set if keyword i was correct. Call
+        after mark_submitted() so the timing is complete. Subclasses which
+        add columns to response_log_schema pass their values as keyword
+        arguments.
+        """
+        if getattr(self, 'response_log', None) is None:
+            return
+        timing = self.timing_summary()
+        correct_mask = 0
+        for i, correct in enumerate(result):
+            if correct:
+                correct_mask |= 1 << i
+        self.response_log.append({
+            'stimulus_id': stimulus_id,
+            'keywords': self.keyword_separator.join(keywords),
+            'correct_mask': correct_mask,
+            'n_keywords': len(result),
+            'n_correct': sum(bool(correct) for correct in result),
+            'timestamp': time.time(),
+            't_controls_enabled_ms': timing['t_controls_enabled_ms'],
+            't_submitted_ms': timing['t_submitted_ms'],
+            'response_latency_ms': timing['response_latency_ms'],
+            't_inputs_ms': timing['t_inputs_ms'],
+            **extra})
+
+    def close_response_log(self):
+        if getattr(self, 'response_log', None) is not None:
+            self.response_log.close()
+
+    def close(self):
+        """
+        Release any resources (e.g. windows, log files) at the end of a block
+
+        Response modes which hold nothing open needn't override this.
+        """
+        self.close_response_log()
+
     def continue_when_ready(self, message="Press enter when ready..."):
         """
         Parameters
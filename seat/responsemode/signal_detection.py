@@ -1,6 +1,5 @@
 from .response_mode import ResponseMode
 import PySimpleGUI as sg
-import pandas as pd
 
 
 def kw_button(text, key):
@@ -36,6 +35,9 @@ class BinaryChoice(ResponseMode):
         self.window = sg.Window('Binary choice', layout,
                                 keep_on_top=True,
                                 finalize=True)
+        # buttons are live as soon as the window exists
+        self.mark_prompt_shown()
+        self.mark_controls_enabled()
 
     def wait(self):
         while True:             # Event Loop
@@ -45,9 +47,11 @@ class BinaryChoice(ResponseMode):
                 self.window.close()
                 return
             elif event == self.no_key:
+                self.mark_submitted()
                 self.response = False
                 break
             elif event == self.yes_key:
+                self.mark_submitted()
                 self.response = True
                 break
         self.correct = (self.response == self.ground_truth_this_stimulus)
@@ -55,8 +59,12 @@ class BinaryChoice(ResponseMode):
         self.window.close()
         return self.correct
 
-    def get_trial_data(self):
-        return pd.DataFrame([[self.ground_truth_this_stimulus,
-                              self.response, self.correct]],
-                            columns = ['signal_present','signal_reported',
-                                       'correct_response'])
\ No newline at end of file
+    def get_trial_record(self):
+        return {'signal_present': self.ground_truth_this_stimulus,
+                'signal_reported': self.response,
+                'correct_response': self.correct,
+                **self.timing_summary()}
+
+    def trial_record_fields(self):
+        return (['signal_present', 'signal_reported', 'correct_response']
+                + self.timing_fields())
\ No newline at end of file
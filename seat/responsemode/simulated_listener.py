@@ -0,0 +1,92 @@
+from .response_mode import ResponseMode
+import numpy as np
+import time
+from probestrategy import PsychometricFunction
+
+
+class SimulatedListener(ResponseMode):
+    """
+    Non-interactive response mode which answers like a listener with a known
+    psychometric function.
+
+    The probe level of each trial is taken from the AV renderer (see
+    connect_renderer()) so the whole of run_block can be exercised without a
+    participant, e.g. to load test the logging, probe strategy and renderer
+    stubs over thousands of trials. Each keyword is an independent Bernoulli
+    trial so wait() returns a boolean vector, as from
+    ExperimenterSelectsCorrectKeywords.
+    """
+    def __init__(self, config):
+        """
+        Optional settings (defaults in brackets):
+            threshold_db (0), prob_at_threshold (0.5),
+            slope_at_threshold (0.025), probability_of_miss (0),
+            guess_probability (0) - see PsychometricFunction
+            num_responses (5) keywords per trial
+            latency_median_s (0) median response time, 0 responds instantly
+            latency_sigma (0.5) spread of the lognormal response time
+            seed (None)
+        """
+        self.rng = np.random.default_rng(config.get("seed"))
+        self.listener = PsychometricFunction(
+            threshold_db=config.get("threshold_db", 0),
+            prob_at_threshold=config.get("prob_at_threshold", 0.5),
+            slope_at_threshold=config.get("slope_at_threshold", 0.025),
+            probability_of_miss=config.get("probability_of_miss", 0),
+            guess_probability=config.get("guess_probability", 0),
+            rng=self.rng)
+        self.num_responses = config.get("num_responses", 5)
+        self.latency_median_s = config.get("latency_median_s", 0)
+        self.latency_sigma = config.get("latency_sigma", 0.5)
+        # log_path may be supplied by run_block but there is nothing to log
+        # beyond get_trial_record()
+
+        self.probe_level = None
+        self.stimulus_id = None
+        self.result = []
+        self.latency_s = 0.0
+
+    def connect_renderer(self, avrenderer):
+        """Follow the renderer's probe level"""
+        if not hasattr(avrenderer, 'add_probe_level_listener'):
+            raise TypeError(f'{type(avrenderer).__name__} does not report its '
+                            'probe level so cannot drive a SimulatedListener')
+        avrenderer.add_probe_level_listener(self.set_probe_level)
+
+    def set_probe_level(self, probe_level):
+        self.probe_level = probe_level
+
+    def show_prompt(self, stimulus_id):
+        self.stimulus_id = stimulus_id
+        self.mark_prompt_shown()
+
+    def wait(self):
+        if self.probe_level is None:
+            raise RuntimeError('SimulatedListener has no probe level - was '
+                               'connect_renderer() called?')
+        if self.latency_median_s > 0:
+            self.latency_s = self.latency_median_s * np.exp(
+                self.latency_sigma * self.rng.standard_normal())
+            time.sleep(self.latency_s)
+        else:
+            self.latency_s = 0.0
+        response = self.listener.probe_response(self.probe_level,
+                                                self.num_responses)
+        self.result = [bool(r) for r in response]
+        self.mark_submitted()
+        return self.result
+
+    def get_trial_record(self):
+        return {'stimulus_id': self.stimulus_id,
+                'probe_level': self.probe_level,
+                'n_correct': sum(self.result),
+                'latency_s': self.latency_s,
+                **self.timing_summary()}
+
+    def trial_record_fields(self):
+        return (['stimulus_id', 'probe_level', 'n_correct', 'latency_s']
+                + self.timing_fields())
+
+    def continue_when_ready(self, message="Press enter when ready..."):
+        """Never waits"""
+        return True
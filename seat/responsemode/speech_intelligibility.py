@@ -1,25 +1,31 @@
 from .response_mode import ResponseMode
+from .response_input import ResponseInput
+from .keyword_corpus import KeywordCorpus
 import numpy as np
-import pandas as pd
 import PySimpleGUI as sg
 import util
 import pathlib
 import pprint
-import time
 
 def kw_button(text, key):
-    return sg.B(text,
-                size=(10, 1),
-                button_color=('white', 'red'),
-                key=key,
-                disabled=True,
-                focus=False)
+    # pinned so hidden buttons don't shift the rest of the row
+    return sg.pin(sg.B(text,
+                       size=(10, 1),
+                       button_color=('white', 'red'),
+                       key=key,
+                       disabled=True,
+                       focus=False))
 
 
 class ExperimenterSelectsCorrectKeywords(ResponseMode):
     """
     A window is created and populated with buttons. The experimenter clicks on
     the buttons corresponding to the correctly identified keywords.
+
+    The window is created once, on the first prompt, with a pool of buttons
+    large enough for the longest sentence. It is reused for every trial:
+    labels, colours and enabled state are updated in place and unused buttons
+    are hidden. Call close() at the end of the block.
     """
     def __init__(self, config):
         # pprint.pprint(config)
@@ -27,57 +33,36 @@ class ExperimenterSelectsCorrectKeywords(ResponseMode):
         # grab the bits we need
         keywords_path = pathlib.Path(config["keywords_path"])
         util.check_path_is_file(keywords_path)
-        self.keywords_df = pd.read_csv(keywords_path, header=None)
-        # print(self.keywords_df)
-
-        self.write_to_log = False
-        if "log_path" in config:
-            print(config["log_path"])
-            self.write_to_log = True
-            self.log_path = pathlib.Path(config["log_path"])
-            self.log_path.touch(exist_ok=False)  # do NOT overwrite!
+        # indexed once (and cached beside the file) so looking up a
+        # stimulus's keywords doesn't touch pandas
+        self.corpus = KeywordCorpus.from_file(
+            keywords_path, cache=config.get("keywords_cache", True))
+
+        self.open_response_log(config)
         
         self.wait_interval = 1 # default value avoids accidental entry
         if "wait_interval" in config:
             self.wait_interval = config["wait_interval"]
-            
-            
 
-    def show_prompt(self, stimulus_id):
-        # keywords = ['Word 1', 'Word 2', 'Word 3', 'Word 4', 'Word 5']
-        # print(stimulus_id)
-        self.keywords = self.keywords_df.loc[stimulus_id, :]
-        self.stimulus_id = stimulus_id
-        self.result = []
-        # print(self.keywords)
-        
-        # Define stimulus response buttons
-        button_row_layout = []
-        self.button_keys = []
-        self.kw_correct = {}
-        self.keystroke_to_button_key = {}
+        # enough buttons for the longest sentence in the keywords file
+        self.button_pool_keys = ['kw_' + str(kw_num) for kw_num
+                                 in range(self.corpus.max_keywords)]
 
-        for kw_num, keyword in enumerate(self.keywords):
-            button_key = 'kw_' + str(kw_num)
-            button_row_layout += [kw_button(keyword, key=button_key)]
-            self.button_keys += [button_key]
-            self.kw_correct[button_key] = False
-            # map buttons to keystrokes - first button responds to '1'
-            self.keystroke_to_button_key[str(kw_num+1)]  = button_key 
-            
-        # print('button_keys:')
-        # print(self.button_keys)
-        # print('keystroke_keys:')
-        # print(self.keystroke_to_button_key)
-        
-        
         # Define other buttons/special keys
         self.all_correct_keystroke = 'a'
-        
         self.done_button_key = 'done_button'
-        self.done_keystroke = ' ' 
+        self.done_keystroke = ' '
         self.done_event = {self.done_button_key, self.done_keystroke}
-        
+
+        self.window = None
+        self.response_input = None
+        self.lockout_event = 'lockout_expired'
+        self.button_keys = []
+
+    def open_window(self):
+        """Create the window with the full pool of (hidden) buttons"""
+        button_row_layout = [kw_button('', key=button_key)
+                             for button_key in self.button_pool_keys]
         layout = [[sg.Text('Select the correctly identified words')],
                   button_row_layout,
                   [sg.Button('Done', key=self.done_button_key, focus=True,
@@ -89,9 +74,52 @@ class ExperimenterSelectsCorrectKeywords(ResponseMode):
                                 return_keyboard_events=True,
                                 # use_default_focus=False,
                                 finalize=True)
-        
-        # self.disable_buttons()
-        
+        self.response_input = ResponseInput(self.window)
+        for button_key in self.button_pool_keys:
+            self.window[button_key].update(visible=False)
+
+    def close(self):
+        """Close the window and the log at the end of the block"""
+        if self.window is not None:
+            self.response_input.cancel_all()
+            self.window.close()
+            self.window = None
+        self.close_response_log()
+
+
+    def show_prompt(self, stimulus_id):
+        # keywords = ['Word 1', 'Word 2', 'Word 3', 'Word 4', 'Word 5']
+        # print(stimulus_id)
+        self.keywords = self.corpus[stimulus_id]
+        self.stimulus_id = stimulus_id
+        self.result = []
+        # print(self.keywords)
+
+        if self.window is None:
+            self.open_window()
+
+        # Relabel the stimulus response buttons, hide any spare ones
+        self.button_keys = self.button_pool_keys[:len(self.keywords)]
+        self.kw_correct = {}
+        self.keystroke_to_button_key = {}
+        for kw_num, button_key in enumerate(self.button_pool_keys):
+            if kw_num < len(self.keywords):
+                self.window[button_key].update(
+                    text=self.keywords[kw_num],
+                    button_color=('white', 'red'),
+                    disabled=True,
+                    visible=True)
+                self.kw_correct[button_key] = False
+                # map buttons to keystrokes - first button responds to '1'
+                self.keystroke_to_button_key[str(kw_num+1)] = button_key
+            else:
+                self.window[button_key].update(visible=False)
+        self.window[self.done_button_key].update(disabled=True)
+
+        # apply the changes now rather than when wait() is called
+        self.window.refresh()
+        self.mark_prompt_shown()
+
     def update_button_status(self):
         for key in self.button_keys:
             self.window.Element(key).Update(
@@ -114,67 +142,75 @@ class ExperimenterSelectsCorrectKeywords(ResponseMode):
         
 
     def wait(self):
-        # initial loop only responds to WIN_CLOSED
-        target_time = time.monotonic() + self.wait_interval
-        while (time.monotonic() < target_time):             # Event Loop
-            event, values = self.window.Read(timeout=50) # need timeout otherwise we get stuck!
-            if event == sg.WIN_CLOSED:
-                self.window.close()
-                return
-            
-        # start responding to all events
-        self.enable_buttons()
+        # until the lockout expires only WIN_CLOSED is acted on
+        self.response_input.cancel_all()
+        controls_enabled = False
+        self.response_input.schedule(self.wait_interval, self.lockout_event)
         while True:             # Event Loop
-            event, values = self.window.Read()
+            event, values, timestamp_ns = self.response_input.read()
             # print(event, values)
             # if len(event) == 1:
             #     print('%s - %s' % (event, ord(event)))
             # else:
             #     print(event,values)
-            
+
             if event == sg.WIN_CLOSED:
-                self.window.close()
+                self.response_input.cancel_all()
+                self.window = None
                 return
+            elif event == self.lockout_event:
+                # start responding to all events
+                self.enable_buttons()
+                self.mark_controls_enabled(timestamp_ns)
+                controls_enabled = True
+            elif not controls_enabled:
+                # ignore input during the lockout
+                continue
             elif event in self.done_event:
+                self.mark_submitted(timestamp_ns)
                 # convert output to an array
                 for i in range(len(self.button_keys)):
                     self.result.append(self.kw_correct[self.button_keys[i]])
                 # print(result)
 
-                if self.write_to_log:
-                    df_to_write = pd.concat(
-                        [pd.DataFrame([self.stimulus_id]),
-                         self.keywords,
-                         pd.DataFrame(self.result)]
-                        )
-                    df_to_write.T.to_csv(self.log_path,
-                                         index=False,
-                                         header=False,
-                                         mode='a')
-                self.window.close()
-                return self.result
+                self.log_response(self.stimulus_id, self.keywords,
+                                  self.result)
+                # keep the window for the next trial
+                self.disable_buttons()
+                # short sentences score their missing keywords as incorrect
+                return self.corpus.pad_result(self.result)
             elif event == self.all_correct_keystroke:
+                self.mark_input(timestamp_ns)
                 for button in self.button_keys:
                     self.kw_correct[button] = True
                 self.update_button_status()
             elif event in self.button_keys:
+                self.mark_input(timestamp_ns)
                 self.handle_keyword_button_press(event)
             elif event in self.keystroke_to_button_key:
+                self.mark_input(timestamp_ns)
                 self.handle_keyword_button_press(self.keystroke_to_button_key[event])
  
             # print(self.kw_correct)
 
-    def get_trial_data(self):
-        df = pd.DataFrame([self.stimulus_id],columns=['stimulus_id']);
+    def get_trial_record(self):
+        record = {'stimulus_id': self.stimulus_id}
         ncorrect = 0
         for i, key in enumerate(self.button_keys):
-            df[key] = self.keywords[i] # store the <i>th keyword in column kw_<i>
-            df[key+'_correct'] = self.kw_correct[key]
+            record[key] = self.keywords[i] # store the <i>th keyword in column kw_<i>
+            record[key+'_correct'] = self.kw_correct[key]
             if self.kw_correct[key]==True:
                 ncorrect +=1
-        df['n_correct'] = ncorrect
-        df['n_keywords'] = i+1
-        return df
+        record['n_correct'] = ncorrect
+        record['n_keywords'] = len(self.button_keys)
+        record.update(self.timing_summary())
+        return record
+
+    def trial_record_fields(self):
+        fields = ['stimulus_id']
+        for key in self.button_pool_keys:
+            fields += [key, key+'_correct']
+        return fields + ['n_correct', 'n_keywords'] + self.timing_fields()
     
     def continue_when_ready(self, message="Click continue when ready..."):
         """
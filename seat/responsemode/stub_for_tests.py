@@ -1,5 +1,6 @@
+import collections
+import queue
 from .response_mode import ResponseMode
-import pandas as pd
 
 
 class AlwaysCorrect(ResponseMode):
@@ -11,13 +12,17 @@ class AlwaysCorrect(ResponseMode):
 
     def show_prompt(self, stimulus_id):
         print(f'ResponseMode.show_prompt() called for simulus_id {stimulus_id}')
+        self.mark_prompt_shown()
 
     def wait(self):
+        self.mark_submitted()
         return True
     
-    def get_trial_data(self):
-        return pd.DataFrame([[True]],
-                            columns = ['correct_response'])
+    def get_trial_record(self):
+        return {'correct_response': True, **self.timing_summary()}
+
+    def trial_record_fields(self):
+        return ['correct_response'] + self.timing_fields()
 
     def continue_when_ready(self, message="Press enter when ready..."):
         """
@@ -50,9 +55,8 @@ class FailsOnWait(ResponseMode):
         if True:
             raise RuntimeError('Exception was raised intentionally by FailsOnWait test stub.')
     
-    def get_trial_data(self):
-        return pd.DataFrame([[True]],
-                            columns = ['correct_response'])
+    def get_trial_record(self):
+        return {'correct_response': True}
 
     def continue_when_ready(self, message="Press enter when ready..."):
         """
@@ -69,3 +73,58 @@ class FailsOnWait(ResponseMode):
         """
         print(f'{message}')
         return True
+
+
+class ScriptedElement():
+    """Element of a ScriptedWindow: keeps the latest value of each property"""
+
+    def __init__(self):
+        self.properties = {}
+
+    def update(self, value=None, **kwargs):
+        if value is not None:
+            kwargs['value'] = value
+        self.properties.update(kwargs)
+
+    Update = update
+
+    def set_focus(self):
+        pass
+
+
+class ScriptedWindow():
+    """
+    Stand-in for a PySimpleGUI Window so GUI response modes can be run without
+    a display
+
+    window[key] is a ScriptedElement. script is a list of (event, values)
+    which are read after the next timer event (e.g. the end of the lockout),
+    so they act as the participant's input.
+    """
+
+    def __init__(self, script=()):
+        self.events = queue.Queue()
+        self.script = list(script)
+        self.elements = collections.defaultdict(ScriptedElement)
+        self.closed = False
+
+    def __getitem__(self, key):
+        return self.elements[key]
+
+    def Element(self, key):
+        return self.elements[key]
+
+    def refresh(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def write_event_value(self, key, value):
+        self.events.put((key, {key: value}))
+        for event, values in self.script:
+            self.events.put((event, values))
+        self.script = []
+
+    def read(self, timeout=None):
+        return self.events.get(timeout=5)
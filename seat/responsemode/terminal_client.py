@@ -0,0 +1,138 @@
+"""
+Scripted stand-in for the browser page served by TerminalServer, for
+automated tests and rehearsing a block without a tablet.
+"""
+import json
+import socket
+import threading
+import time
+import urllib.parse
+
+from . import websocket
+
+
+class ScriptedTerminalClient():
+    """
+    Connects to a TerminalServer and answers prompts with a script
+
+    The client runs in its own thread. It acknowledges each prompt as soon as
+    it arrives and, once input is enabled, waits response_delay_s and sends
+    respond(prompt) as the result. Messages are answered with
+    continue_ok. Everything received is kept in self.received.
+    """
+
+    def __init__(self, url, respond=None, response_delay_s=0,
+                 continue_ok=True, connect_timeout=5):
+        """
+        Parameters
+        ----------
+        url : str
+            e.g. "ws://127.0.0.1:8765/ws" or just "http://127.0.0.1:8765"
+        respond : callable, optional
+            Called with the prompt message (a dict), returns the list of
+            bools to send, or None to cancel the trial. The default gets
+            every keyword right.
+        """
+        parts = urllib.parse.urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.path = parts.path if parts.path not in ('', '/') else '/ws'
+        self.respond = respond or (lambda prompt:
+                                   [True] * len(prompt['keywords']))
+        self.response_delay_s = response_delay_s
+        self.continue_ok = continue_ok
+        self.received = []
+
+        self.sock = socket.create_connection((self.host, self.port),
+                                             timeout=connect_timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._handshake()
+        self.sock.settimeout(None)
+        self._send_lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, daemon=True,
+                                       name='scripted_terminal')
+        self.thread.start()
+
+    def _handshake(self):
+        key = websocket.new_client_key()
+        self.sock.sendall((f'GET {self.path} HTTP/1.1\r\n'
+                           f'Host: {self.host}:{self.port}\r\n'
+                           'Upgrade: websocket\r\n'
+                           'Connection: Upgrade\r\n'
+                           f'Sec-WebSocket-Key: {key}\r\n'
+                           'Sec-WebSocket-Version: 13\r\n\r\n'
+                           ).encode('latin-1'))
+        response = b''
+        while b'\r\n\r\n' not in response:
+            chunk = self.sock.recv(1024)
+            if not chunk:
+                raise ConnectionError('server closed during the handshake')
+            response += chunk
+        head, self._buffer = response.split(b'\r\n\r\n', 1)
+        lines = head.decode('latin-1').split('\r\n')
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if (lines[0].split(' ')[1:2] != ['101'] or
+                headers.get('sec-websocket-accept')
+                != websocket.accept_key(key)):
+            raise ConnectionError(f'WebSocket handshake failed: {lines[0]}')
+
+    def _read_exactly(self, n):
+        while len(self._buffer) < n:
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                raise ConnectionError('connection closed')
+            self._buffer += chunk
+        data, self._buffer = self._buffer[:n], self._buffer[n:]
+        return data
+
+    def send(self, message):
+        with self._send_lock:
+            self.sock.sendall(websocket.encode_frame(json.dumps(message),
+                                                     mask=True))
+
+    def _run(self):
+        assembler = websocket.FrameAssembler(expect_masked=False)
+        prompt = None
+        try:
+            while True:
+                opcode, payload = websocket.read_message_blocking(
+                    self._read_exactly, assembler)
+                if opcode == websocket.OP_CLOSE:
+                    break
+                if opcode != websocket.OP_TEXT:
+                    continue
+                message = json.loads(payload.decode('utf-8'))
+                self.received.append(message)
+                if message['type'] == 'prompt':
+                    prompt = message
+                    self.send({'type': 'shown', 'trial': prompt['trial']})
+                elif (message['type'] == 'enable' and prompt is not None
+                        and message['trial'] == prompt['trial']):
+                    if self.response_delay_s > 0:
+                        time.sleep(self.response_delay_s)
+                    result = self.respond(prompt)
+                    if result is None:
+                        self.send({'type': 'cancel',
+                                   'trial': prompt['trial']})
+                    else:
+                        self.send({'type': 'response',
+                                   'trial': prompt['trial'],
+                                   'result': list(result)})
+                elif message['type'] == 'message':
+                    self.send({'type': 'continue', 'id': message['id'],
+                               'ok': self.continue_ok})
+        except (ConnectionError, OSError, websocket.WebSocketError):
+            pass
+
+    def close(self):
+        try:
+            with self._send_lock:
+                self.sock.sendall(websocket.encode_frame(
+                    websocket.close_payload(), websocket.OP_CLOSE, mask=True))
+        except OSError:
+            pass
+        self.thread.join(1)
+        self.sock.close()
@@ -0,0 +1,170 @@
+from .response_mode import ResponseMode
+from .response_input import ResponseInput
+from .keyword_corpus import KeywordCorpus
+from .keyword_matcher import KeywordMatcher, read_homophones
+import PySimpleGUI as sg
+import util
+import pathlib
+
+
+class TypedResponse(ResponseMode):
+    """
+    The participant types (or the experimenter transcribes) the sentence they
+    heard and the keywords are scored automatically by a KeywordMatcher.
+
+    As with ExperimenterSelectsCorrectKeywords one window is created on the
+    first prompt and reused for every trial, input is ignored until
+    wait_interval has elapsed and wait() returns one bool per keyword, padded
+    with False to the longest sentence. Enter or the Done button submits the
+    response. Call close() at the end of the block.
+    """
+    response_log_schema = {**ResponseMode.response_log_schema,
+                           'response_text': 'str'}
+
+    def __init__(self, config):
+        """
+        Required settings:
+            keywords_path - one row of keywords per stimulus_id
+        Optional settings (defaults in brackets):
+            keywords_cache (True) - see KeywordCorpus.from_file
+            homophones_path (None) - groups of interchangeable spellings, one
+                comma separated group per line
+            max_edit_distance (2) - most spelling errors allowed in a keyword
+            wait_interval (1) seconds before input is accepted
+            log_path (None)
+        """
+        keywords_path = pathlib.Path(config["keywords_path"])
+        util.check_path_is_file(keywords_path)
+        self.corpus = KeywordCorpus.from_file(
+            keywords_path, cache=config.get("keywords_cache", True))
+
+        homophones = None
+        if "homophones_path" in config:
+            homophones_path = pathlib.Path(config["homophones_path"])
+            util.check_path_is_file(homophones_path)
+            homophones = read_homophones(homophones_path)
+        self.matcher = KeywordMatcher(
+            self.corpus, homophones=homophones,
+            max_edit_distance=config.get("max_edit_distance", 2))
+
+        self.open_response_log(config)
+
+        self.wait_interval = config.get("wait_interval", 1)
+
+        self.text_key = 'response_text'
+        self.done_button_key = 'done_button'
+        self.lockout_event = 'lockout_expired'
+        self.window = None
+        self.response_input = None
+
+        self.stimulus_id = None
+        self.keywords = ()
+        self.response_text = ''
+        self.result = []
+
+    def open_window(self):
+        layout = [[sg.Text('Type the sentence you heard')],
+                  [sg.Input(key=self.text_key, size=(60, 1),
+                            enable_events=True, disabled=True)],
+                  [sg.Button('Done', key=self.done_button_key,
+                             bind_return_key=True, disabled=True)]
+                  ]
+        self.window = sg.Window('Speech intelligibility - typed response',
+                                layout,
+                                keep_on_top=True,
+                                finalize=True)
+        self.response_input = ResponseInput(self.window)
+
+    def close(self):
+        """Close the window and the log at the end of the block"""
+        if self.window is not None:
+            self.response_input.cancel_all()
+            self.window.close()
+            self.window = None
+        self.close_response_log()
+
+    def show_prompt(self, stimulus_id):
+        self.stimulus_id = stimulus_id
+        self.keywords = self.corpus[stimulus_id]
+        # build the matcher's arrays now, not between the response and the
+        # next trial
+        self.matcher.prepare(stimulus_id)
+        self.response_text = ''
+        self.result = []
+
+        if self.window is None:
+            self.open_window()
+        self.window[self.text_key].update(value='', disabled=True)
+        self.window[self.done_button_key].update(disabled=True)
+        self.window.refresh()
+        self.mark_prompt_shown()
+
+    def set_controls_enabled(self, enabled):
+        self.window[self.text_key].update(disabled=not enabled)
+        self.window[self.done_button_key].update(disabled=not enabled)
+        if enabled:
+            self.window[self.text_key].set_focus()
+
+    def wait(self):
+        # until the lockout expires only WIN_CLOSED is acted on
+        self.response_input.cancel_all()
+        controls_enabled = False
+        self.response_input.schedule(self.wait_interval, self.lockout_event)
+        while True:
+            event, values, timestamp_ns = self.response_input.read()
+
+            if event == sg.WIN_CLOSED:
+                self.response_input.cancel_all()
+                self.window = None
+                return
+            elif event == self.lockout_event:
+                self.set_controls_enabled(True)
+                self.mark_controls_enabled(timestamp_ns)
+                controls_enabled = True
+            elif not controls_enabled:
+                continue
+            elif event == self.text_key:
+                self.mark_input(timestamp_ns)
+            elif event == self.done_button_key:
+                self.mark_submitted(timestamp_ns)
+                self.response_text = values[self.text_key]
+                self.result = self.matcher.score(self.stimulus_id,
+                                                 self.response_text)
+                self.log_response(self.stimulus_id, self.keywords,
+                                  self.result,
+                                  response_text=self.response_text)
+                # keep the window for the next trial
+                self.set_controls_enabled(False)
+                return self.corpus.pad_result(self.result)
+
+    def get_trial_record(self):
+        record = {'stimulus_id': self.stimulus_id,
+                  'response_text': self.response_text}
+        for i, keyword in enumerate(self.keywords):
+            key = 'kw_' + str(i)
+            record[key] = keyword
+            record[key + '_correct'] = self.result[i] if self.result else False
+        record['n_correct'] = sum(self.result)
+        record['n_keywords'] = len(self.keywords)
+        record.update(self.timing_summary())
+        return record
+
+    def trial_record_fields(self):
+        fields = ['stimulus_id', 'response_text']
+        for i in range(self.corpus.max_keywords):
+            fields += ['kw_' + str(i), 'kw_' + str(i) + '_correct']
+        return fields + ['n_correct', 'n_keywords'] + self.timing_fields()
+
+    def continue_when_ready(self, message="Click continue when ready..."):
+        """
+        Parameters
+        ----------
+        message : STR, optional
+            Message to display. The default is "Click continue when ready...".
+
+        Returns
+        -------
+        Bool.:  False if the popup was cancelled
+        """
+        return_dict = {'OK': True, None: False}
+        return return_dict[sg.popup_ok(message)]
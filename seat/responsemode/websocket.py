@@ -0,0 +1,153 @@
+"""
+Minimal WebSocket (RFC 6455) framing, enough for JSON messages between the
+booth PC and a response terminal without any dependencies beyond the
+standard library.
+
+Only what the terminal needs is supported: unfragmented or fragmented text
+frames, ping/pong and close. Clients must mask their frames; servers must
+not.
+"""
+import base64
+import hashlib
+import os
+import struct
+
+
+GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+MAX_PAYLOAD = 1 << 20
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+
+class WebSocketError(Exception):
+    """The peer broke the protocol"""
+    pass
+
+
+def accept_key(key):
+    """Sec-WebSocket-Accept value for a client's Sec-WebSocket-Key"""
+    digest = hashlib.sha1((key + GUID).encode('ascii')).digest()
+    return base64.b64encode(digest).decode('ascii')
+
+
+def new_client_key():
+    return base64.b64encode(os.urandom(16)).decode('ascii')
+
+
+def apply_mask(payload, mask):
+    """XOR payload with the repeated 4 byte mask (its own inverse)"""
+    n = len(payload)
+    if n == 0:
+        return b''
+    repeated = (mask * (n // 4 + 1))[:n]
+    return (int.from_bytes(payload, 'big')
+            ^ int.from_bytes(repeated, 'big')).to_bytes(n, 'big')
+
+
+def encode_frame(payload, opcode=OP_TEXT, mask=False):
+    """A single, final frame. Clients pass mask=True."""
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+    n = len(payload)
+    mask_bit = 0x80 if mask else 0
+    if n < 126:
+        header = struct.pack('!BB', 0x80 | opcode, mask_bit | n)
+    elif n < (1 << 16):
+        header = struct.pack('!BBH', 0x80 | opcode, mask_bit | 126, n)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, mask_bit | 127, n)
+    if mask:
+        mask_key = os.urandom(4)
+        return header + mask_key + apply_mask(payload, mask_key)
+    return header + payload
+
+
+def close_payload(code=1000, reason=''):
+    return struct.pack('!H', code) + reason.encode('utf-8')
+
+
+def _parse_header(first_two):
+    fin = bool(first_two[0] & 0x80)
+    opcode = first_two[0] & 0x0F
+    masked = bool(first_two[1] & 0x80)
+    length = first_two[1] & 0x7F
+    return fin, opcode, masked, length
+
+
+def _extended_length_size(length):
+    return {126: 2, 127: 8}.get(length, 0)
+
+
+class FrameAssembler:
+    """Joins fragments into messages and checks masking"""
+
+    def __init__(self, expect_masked):
+        self.expect_masked = expect_masked
+        self.fragments = []
+        self.fragment_opcode = None
+
+    def check_header(self, masked, length):
+        if masked != self.expect_masked:
+            raise WebSocketError('frame masking is wrong for this end')
+        if length > MAX_PAYLOAD:
+            raise WebSocketError('frame too large')
+
+    def add(self, fin, opcode, payload):
+        """Return (opcode, payload) of a complete message, else None"""
+        if opcode >= OP_CLOSE:  # control frames are never fragmented
+            return opcode, payload
+        if opcode == OP_CONTINUATION:
+            if self.fragment_opcode is None:
+                raise WebSocketError('unexpected continuation frame')
+        else:
+            self.fragment_opcode = opcode
+            self.fragments = []
+        self.fragments.append(payload)
+        if sum(len(f) for f in self.fragments) > MAX_PAYLOAD:
+            raise WebSocketError('message too large')
+        if not fin:
+            return None
+        message = (self.fragment_opcode, b''.join(self.fragments))
+        self.fragment_opcode = None
+        self.fragments = []
+        return message
+
+
+async def read_message(reader, assembler):
+    """Read frames from an asyncio.StreamReader until a message is complete"""
+    while True:
+        fin, opcode, masked, length = _parse_header(
+            await reader.readexactly(2))
+        size = _extended_length_size(length)
+        if size:
+            length = int.from_bytes(await reader.readexactly(size), 'big')
+        assembler.check_header(masked, length)
+        mask_key = await reader.readexactly(4) if masked else b''
+        payload = await reader.readexactly(length)
+        if mask_key:
+            payload = apply_mask(payload, mask_key)
+        message = assembler.add(fin, opcode, payload)
+        if message is not None:
+            return message
+
+
+def read_message_blocking(read_exactly, assembler):
+    """As read_message() for a blocking read_exactly(n) function"""
+    while True:
+        fin, opcode, masked, length = _parse_header(read_exactly(2))
+        size = _extended_length_size(length)
+        if size:
+            length = int.from_bytes(read_exactly(size), 'big')
+        assembler.check_header(masked, length)
+        mask_key = read_exactly(4) if masked else b''
+        payload = read_exactly(length)
+        if mask_key:
+            payload = apply_mask(payload, mask_key)
+        message = assembler.add(fin, opcode, payload)
+        if message is not None:
+            return message
@@ -4,12 +4,9 @@ import util
 import seatlog as sl
 
 import sys
-import PySimpleGUI as sg
-import time
 from datetime import datetime
 import random
 import numpy as np
-import pandas as pd
 import yaml
 import pathlib
 import argparse
@@ -18,6 +15,20 @@ import argparse
 
 
 
+def _block_record(data, name, id_column):
+    """subject_data/condition_data as a record, with basic checks"""
+    if data is None:
+        # minimal empty data
+        return {id_column: ''}
+    try:
+        # a dict, dataclass or (as before) a single row DataFrame
+        return sl.as_record(data)
+    except TypeError:
+        raise TypeError(f'{name} should be a dict or DataFrame') from None
+    except ValueError:
+        raise ValueError(f'{name} should have a single row') from None
+
+
 def run_block(config, subject_data=None, condition_data=None):
     """Main function for executing a test
     TODO:
@@ -31,28 +42,18 @@ def run_block(config, subject_data=None, condition_data=None):
     if "App" not in config:
         raise RuntimeError("The config supplied to run_block did not have an App entry")
 
-    if (subject_data is None):
-        # minimal empty data
-        subject_data = pd.DataFrame([['']], columns=['subject_id'])
-    else:
-        # basic checks
-        if not isinstance(subject_data, pd.DataFrame):
-            raise TypeError('subject_data should be a DataFrame')
-        if (subject_data.shape[0] != 1):
-            raise ValueError('subject_data should have a single row')
-
-    if (condition_data is None):
-        # minimal empty data
-        condition_data = pd.DataFrame([['']], columns=['condition_id'])
-    else:
-        # basic checks
-        if not isinstance(condition_data, pd.DataFrame):
-            raise TypeError('condition_data should be a DataFrame')
-        if (subject_data.shape[0] != 1):
-            raise ValueError('condition_data should have a single row')
+    subject_data = _block_record(subject_data, 'subject_data', 'subject_id')
+    condition_data = _block_record(condition_data, 'condition_data',
+                                   'condition_id')
 
     # settings
     pre_trial_delay = (0.1, 0.2)
+    if "pre_trial_delay" in config["App"]:
+        # e.g. [0, 0] to run a simulated block at full speed
+        pre_trial_delay = config["App"]["pre_trial_delay"]
+
+    # trial timing: deadlines are relative to the start of each trial
+    scheduler = util.DeadlineScheduler.from_config(config["App"])
 
     # state
     test_was_cancelled = False
@@ -72,93 +73,115 @@ def run_block(config, subject_data=None, condition_data=None):
             # ResponseMode
             config["ResponseMode"]["settings"]["log_path"] = pathlib.Path(
                 config["App"]["log_dir"], 'response_log.csv')
-            response_mode = util.instance_builder(config["ResponseMode"])
-
-
-            # Ready to start - opportunity for hint to experimenter/participant
-            # (depends on the ResponseMode)
-            if ("pre_block_hint" in config["App"]) and config["App"]["pre_block_hint"]:
-                response_mode.continue_when_ready(config["App"]["pre_block_hint"])
-
-
-            # TODO: ensure compatibility of probe_strategy, response_mode and
-            #       avrenderer
-
-            # start test
-            #    - play background video
-            #    - play background audio
-            avrenderer.start_scene()
-
-            # opportunity to show, e.g. face of the target talker
-            avrenderer.present_preparatory_content()
-
-            # wait for experimenter
-            response_mode.continue_when_ready(
-                'Scene has started. Press Enter to start first trial...')
-
-
-            # main loop
-            trial_id = 0  # 1-based counter is incremented at start of loop
-            while not probe_strategy.is_finished():
-
-                trial_id += 1
-
-                # Get required parameters
-                stimulus_id = probe_strategy.get_next_stimulus_id()
-                probe_level = probe_strategy.get_next_probe_level()
-
-                # console feedback
-                print('Presenting trial...')
-                print('stimulus_id: ' + str(stimulus_id))
-                print('probe_level:'
-                      + probe_strategy.get_next_probe_level_as_string())
-
-                # Prepare the renderer (behaviour depends on  implementation)
-                avrenderer.set_probe_level(probe_level)
-
-                # Show the response display UI
-                response_mode.show_prompt(stimulus_id)
-
-                # Pause
-                # (random duration between preTrialDelay[0] and preTrialDelay[1])
-                time.sleep(pre_trial_delay[0]
-                           + ((pre_trial_delay[1]-pre_trial_delay[0])
-                              * random.random()))
-
-                # Present the stimulus//mixture
-                # e.g. send OSC commands to start videos/samplers
-                avrenderer.present_trial(stimulus_id)
-
-                # Wait for response
-                # - result type depends on the response mode
-                # - ProbeStrategy and ResponseMode must be chosen to be compatible
-                result = response_mode.wait()
-
-                if result is None:
-                    # window was closed/cancelled - attempt to end gracefully
-                    test_was_cancelled = True
-                    break
-
-                probe_strategy.store_trial_result(result)
-
-                # Trial is finished. Collect and push log data
-                mylogger.append(trial_id, subject_data)
-                mylogger.append(trial_id, condition_data)
-                mylogger.append(trial_id, probe_strategy.get_trial_data(),
-                                prefix='ps_')
-                mylogger.append(trial_id, avrenderer.get_trial_data(),
-                                prefix='av_')
-                mylogger.append(trial_id, response_mode.get_trial_data(),
-                                prefix='rm_')
-
-            print(str(probe_strategy.get_current_estimate()))
-            if test_was_cancelled:
-                raise RuntimeError("The test was cancelled")
-
-            if ("post_block_hint" in config["App"]) and config["App"]["post_block_hint"]:
-                response_mode.continue_when_ready(config["App"]["post_block_hint"])
-
-            return
+            with util.instance_builder(config["ResponseMode"]) as response_mode:
+                response_mode.connect_renderer(avrenderer)
+
+
+                # Ready to start - opportunity for hint to experimenter/participant
+                # (depends on the ResponseMode)
+                if ("pre_block_hint" in config["App"]) and config["App"]["pre_block_hint"]:
+                    response_mode.continue_when_ready(config["App"]["pre_block_hint"])
+
+
+                # TODO: ensure compatibility of probe_strategy, response_mode and
+                #       avrenderer
+
+                # start test
+                #    - play background video
+                #    - play background audio
+                avrenderer.start_scene()
+
+                # opportunity to show, e.g. face of the target talker
+                avrenderer.present_preparatory_content()
+
+                # wait for experimenter
+                response_mode.continue_when_ready(
+                    'Scene has started. Press Enter to start first trial...')
+
+
+                # fix the log's columns up front so rows are written as they
+                # are finalised, not rewritten when a new column turns up
+                mylogger.declare_columns(subject_data)
+                mylogger.declare_columns(condition_data)
+                mylogger.declare_columns(
+                    util.DeadlineScheduler.summary_fields(['stimulus']),
+                    prefix='app_')
+                for component, prefix in ((probe_strategy, 'ps_'),
+                                          (avrenderer, 'av_'),
+                                          (response_mode, 'rm_')):
+                    fields = component.trial_record_fields()
+                    if fields is not None:
+                        mylogger.declare_columns(fields, prefix=prefix)
+
+                # main loop
+                trial_id = 0  # 1-based counter is incremented at start of loop
+                while not probe_strategy.is_finished():
+
+                    trial_id += 1
+                    scheduler.start()
+                    stimulus_onset_s = (
+                        pre_trial_delay[0]
+                        + ((pre_trial_delay[1]-pre_trial_delay[0])
+                           * random.random()))
+
+                    # Get required parameters
+                    stimulus_id = probe_strategy.get_next_stimulus_id()
+                    probe_level = probe_strategy.get_next_probe_level()
+
+                    # console feedback
+                    print('Presenting trial...')
+                    print('stimulus_id: ' + str(stimulus_id))
+                    print('probe_level:'
+                          + probe_strategy.get_next_probe_level_as_string())
+
+                    # Prepare the renderer (behaviour depends on  implementation)
+                    avrenderer.set_probe_level(probe_level)
+
+                    # Show the response display UI
+                    response_mode.show_prompt(stimulus_id)
+
+                    # Pause
+                    # (random duration between preTrialDelay[0] and
+                    # preTrialDelay[1], counted from the start of the trial)
+                    scheduler.wait_until('stimulus', stimulus_onset_s)
+
+                    # Present the stimulus//mixture
+                    # e.g. send OSC commands to start videos/samplers
+                    avrenderer.present_trial(stimulus_id)
+                    response_mode.mark_stimulus_presented()
+
+                    # Wait for response
+                    # - result type depends on the response mode
+                    # - ProbeStrategy and ResponseMode must be chosen to be compatible
+                    result = response_mode.wait()
+
+                    if result is None:
+                        # window was closed/cancelled - attempt to end gracefully
+                        test_was_cancelled = True
+                        break
+
+                    probe_strategy.store_trial_result(result)
+
+                    # Trial is finished. Collect and push log data
+                    mylogger.append(trial_id, subject_data)
+                    mylogger.append(trial_id, condition_data)
+                    mylogger.append(trial_id, scheduler.summary(),
+                                    prefix='app_')
+                    mylogger.append(trial_id, probe_strategy.get_trial_record(),
+                                    prefix='ps_')
+                    mylogger.append(trial_id, avrenderer.get_trial_record(),
+                                    prefix='av_')
+                    mylogger.append(trial_id, response_mode.get_trial_record(),
+                                    prefix='rm_')
+
+                print(str(probe_strategy.get_current_estimate()))
+                if test_was_cancelled:
+                    raise RuntimeError("The test was cancelled")
+
+                if ("post_block_hint" in config["App"]) and config["App"]["post_block_hint"]:
+                    response_mode.continue_when_ready(config["App"]["post_block_hint"])
+
+                return
 
 
 if __name__ == '__main__':
@@ -177,7 +200,8 @@ if __name__ == '__main__':
         file = args.file
         print('Config file: ' + file)
     else:
-        # get file
+        # get file - the GUI toolkit is only loaded when it is needed
+        import PySimpleGUI as sg
         file = sg.popup_get_file(
             'Choose the config file',
             file_types=(('yml', '*.yml'),)
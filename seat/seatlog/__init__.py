@@ -1 +1,7 @@
 from .seat_log import CSVLogger
+from .seat_log import as_record
+from .seat_log import record_fields
+from .row_writer import CSVRowWriter
+from .row_writer import FlushPolicy
+from .record_writer import RecordWriter
+from .record_writer import read_records
@@ -0,0 +1,208 @@
+import csv
+import json
+import math
+import pathlib
+import queue
+import threading
+import weakref
+
+
+# column types which can be declared in a schema, with the pandas dtype used
+# to read them back
+DTYPES = {'int64': 'int64', 'float64': 'float64', 'bool': 'bool',
+          'str': 'string'}
+
+
+def schema_path(filepath):
+    """Path of the JSON sidecar describing a record log's columns"""
+    filepath = pathlib.Path(filepath)
+    return filepath.with_name(filepath.name + '.schema.json')
+
+
+def _format(value, dtype):
+    if dtype == 'float64':
+        value = float(value)
+        return '' if math.isnan(value) else repr(value)
+    if dtype == 'int64':
+        return str(int(value))
+    if dtype == 'bool':
+        return 'True' if value else 'False'
+    return str(value)
+
+
+class _BackgroundWriter:
+    """Owns the file, the thread and the records not yet handed to the
+    thread, so the finalizer needn't reference the RecordWriter"""
+
+    def __init__(self, file, dtypes):
+        self.file = file
+        self.dtypes = dtypes
+        self.writer = csv.writer(file)
+        self.pending = []  # the batch being filled by RecordWriter.append
+        self.batches = queue.Queue()
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True,
+                                       name='record_writer')
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            batch = self.batches.get()
+            try:
+                if batch is None:
+                    return
+                if self.error is None:
+                    self.writer.writerows(
+                        [_format(value, dtype)
+                         for value, dtype in zip(values, self.dtypes)]
+                        for values in batch)
+                    self.file.flush()
+            except Exception as err:
+                # reported to the experiment thread on its next call
+                self.error = err
+            finally:
+                self.batches.task_done()
+
+    def submit(self):
+        if self.pending:
+            self.batches.put(self.pending)
+            self.pending = []
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.submit()
+        self.batches.put(None)
+        self.thread.join()
+        self.file.close()
+
+
+class RecordWriter:
+    """
+    RecordWriter logs fixed-schema records in batches from a background
+    thread
+
+    - the schema (column names and types) is given up front; the header is
+      written at once and the types go in a JSON sidecar (see schema_path()),
+      so read_records() can load the log with the right dtypes
+    - append() only stores the values in memory; every batch_size records
+      the batch is handed to a background thread which formats and writes it
+      in one go
+    - records still in memory are written when flush() or close() is called,
+      when used as a context manager or, failing that, when the writer is
+      garbage collected or the interpreter exits
+
+    An error in the background thread is raised by the next append(), flush()
+    or close().
+    """
+
+    def __init__(self, filepath, schema, batch_size=32):
+        """
+        Parameters
+        ----------
+        filepath : str or pathlib.Path
+            File to create. It is an error if it (or its sidecar) already
+            exists.
+        schema : dict
+            Column name: type, in order. Types are 'int64', 'float64', 'bool'
+            or 'str'.
+        batch_size : int, optional
+            Records kept in memory before they are handed to the writer
+            thread. The default is 32.
+        """
+        for name, dtype in schema.items():
+            if dtype not in DTYPES:
+                raise ValueError(f'Column {name} has unknown type {dtype}, '
+                                 f'use one of {list(DTYPES)}')
+        if batch_size < 1:
+            raise ValueError('batch_size must be at least 1')
+        self.log_path = pathlib.Path(filepath)
+        self.schema = dict(schema)
+        self.columns = list(schema)
+        self.batch_size = int(batch_size)
+        self.num_records = 0
+
+        file = open(self.log_path, 'x', newline='')  # do NOT overwrite!
+        try:
+            with open(schema_path(self.log_path), 'x') as f:
+                json.dump({'columns': [{'name': name, 'type': dtype}
+                                       for name, dtype
+                                       in self.schema.items()]},
+                          f, indent=2)
+        except BaseException:
+            # don't leave an empty log behind either
+            file.close()
+            self.log_path.unlink()
+            raise
+        csv.writer(file).writerow(self.columns)
+        self._worker = _BackgroundWriter(file, list(self.schema.values()))
+        self._finalizer = weakref.finalize(self, self._worker.close)
+
+    @classmethod
+    def from_config(cls, filepath, schema, config):
+        """
+        Create a writer using the optional logging keys of a settings dict
+
+        log_batch_size: records per batch
+        """
+        return cls(filepath, schema,
+                   batch_size=config.get("log_batch_size", 32))
+
+    # implement conext manager magic
+    def __enter__(self):
+        return self
+
+    # implement conext manager magic
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def closed(self):
+        return not self._finalizer.alive
+
+    def _raise_worker_error(self):
+        if self._worker.error is not None:
+            raise RuntimeError(f'Writing {self.log_path} failed') \
+                from self._worker.error
+
+    def append(self, record):
+        """Add a dict of values keyed by column name"""
+        self._raise_worker_error()
+        if len(record) != len(self.columns):
+            raise ValueError('Record does not match the schema: '
+                             f'{list(record)} vs {self.columns}')
+        try:
+            self._worker.pending.append([record[name]
+                                         for name in self.columns])
+        except KeyError as err:
+            raise ValueError('Record does not match the schema: '
+                             f'{list(record)} vs {self.columns}') from err
+        self.num_records += 1
+        if len(self._worker.pending) >= self.batch_size:
+            self._worker.submit()
+
+    def flush(self):
+        """Write everything appended so far and wait for it to be written"""
+        self._worker.submit()
+        self._worker.batches.join()
+        self._raise_worker_error()
+
+    def close(self):
+        """Write any remaining records and close the file"""
+        if self.closed:
+            return
+        self._finalizer()
+        self._raise_worker_error()
+
+
+def read_records(filepath):
+    """Load a RecordWriter log as a DataFrame with the declared dtypes"""
+    import pandas as pd
+    with open(schema_path(filepath)) as f:
+        columns = json.load(f)['columns']
+    return pd.read_csv(filepath, keep_default_na=False,
+                       na_values={column['name']: ['']
+                                  for column in columns
+                                  if column['type'] == 'float64'},
+                       dtype={column['name']: DTYPES[column['type']]
+                              for column in columns})
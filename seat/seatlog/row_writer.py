@@ -0,0 +1,158 @@
+import csv
+import enum
+import os
+import pathlib
+import weakref
+
+
+class FlushPolicy(enum.Enum):
+    """When buffered rows are pushed from python to the operating system"""
+    EVERY_ROW = enum.auto()
+    EVERY_N_ROWS = enum.auto()
+    ON_CLOSE = enum.auto()
+
+
+def _close_file(file, fsync):
+    """Flush and close - used on close() and by the finalizer at exit"""
+    if file.closed:
+        return
+    file.flush()
+    if fsync:
+        os.fsync(file.fileno())
+    file.close()
+
+
+class CSVRowWriter:
+    """
+    CSVRowWriter streams rows to a comma separated values log file
+
+    - the file is created (never overwritten) and kept open
+    - the column schema is fixed by the first row and a header written
+    - rows are formatted directly with the csv module, no pandas involved
+    - flushing follows a FlushPolicy, optionally with fsync for crash safety
+
+    Any rows still buffered are flushed when close() is called, when used as
+    a context manager or, failing that, when the interpreter exits.
+    """
+
+    def __init__(self, filepath, header=True,
+                 flush_policy=FlushPolicy.EVERY_ROW, flush_every=10,
+                 fsync=False):
+        """
+        Parameters
+        ----------
+        filepath : str or pathlib.Path
+            File to create. It is an error if it already exists.
+        header : bool, optional
+            Write the column names before the first row. The default is True.
+        flush_policy : FlushPolicy or str, optional
+            One of FlushPolicy or its name (case insensitive). The default is
+            FlushPolicy.EVERY_ROW.
+        flush_every : int, optional
+            Number of rows between flushes for FlushPolicy.EVERY_N_ROWS.
+        fsync : bool, optional
+            Also ask the operating system to commit each flush to disk.
+        """
+        if isinstance(flush_policy, str):
+            flush_policy = FlushPolicy[flush_policy.upper()]
+        if flush_every < 1:
+            raise ValueError('flush_every must be at least 1')
+        self.log_path = pathlib.Path(filepath)
+        self.header = header
+        self.flush_policy = flush_policy
+        self.flush_every = int(flush_every)
+        self.fsync = fsync
+        self.columns = None
+        self.num_rows = 0
+        self._rows_since_flush = 0
+
+        self._file = open(self.log_path, 'x', newline='')  # do NOT overwrite!
+        self._writer = csv.writer(self._file)
+        self._finalizer = weakref.finalize(self, _close_file, self._file,
+                                           fsync)
+
+    @classmethod
+    def from_config(cls, filepath, config, header=True):
+        """
+        Create a writer using the optional logging keys of a settings dict
+
+        log_flush_policy: name of a FlushPolicy
+        log_flush_every: rows between flushes for every_n_rows
+        log_fsync: bool
+        """
+        return cls(filepath, header=header,
+                   flush_policy=config.get("log_flush_policy", "every_row"),
+                   flush_every=config.get("log_flush_every", 10),
+                   fsync=config.get("log_fsync", False))
+
+    # implement conext manager magic
+    def __enter__(self):
+        return self
+
+    # implement conext manager magic
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def set_columns(self, columns):
+        """Fix the column schema (and write the header) before any rows"""
+        if self.columns is not None:
+            raise RuntimeError('Column schema has already been fixed')
+        self.columns = list(columns)
+        if self.header:
+            self._writer.writerow(self.columns)
+
+    def write_row(self, row):
+        """
+        Write a dict of values keyed by column name
+
+        The first row fixes the schema, after which every row must have
+        exactly the same keys.
+        """
+        if self.columns is None:
+            self.set_columns(row.keys())
+        elif len(row) != len(self.columns):
+            raise ValueError('Row does not match the column schema: '
+                             f'{list(row)} vs {self.columns}')
+        try:
+            values = [row[name] for name in self.columns]
+        except KeyError as err:
+            raise ValueError('Row does not match the column schema: '
+                             f'{list(row)} vs {self.columns}') from err
+        self._write(values)
+
+    def write_values(self, values):
+        """
+        Write a sequence of values
+
+        If the schema has been fixed the number of values must match.
+        Otherwise rows are written as they are (e.g. ragged, headerless logs).
+        """
+        if (self.columns is not None) and (len(values) != len(self.columns)):
+            raise ValueError(f'Expected {len(self.columns)} values, '
+                             f'got {len(values)}')
+        self._write(values)
+
+    def _write(self, values):
+        self._writer.writerow(values)
+        self.num_rows += 1
+        self._rows_since_flush += 1
+        if self.flush_policy is FlushPolicy.EVERY_ROW:
+            self.flush()
+        elif ((self.flush_policy is FlushPolicy.EVERY_N_ROWS)
+              and (self._rows_since_flush >= self.flush_every)):
+            self.flush()
+
+    def flush(self):
+        """Push buffered rows to the operating system (and disk if fsync)"""
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._rows_since_flush = 0
+
+    def close(self):
+        """Flush any remaining rows and close the file"""
+        self._finalizer()
@@ -1,7 +1,48 @@
-import numpy as np
-import pandas as pd
+import csv
+import dataclasses
 import pathlib
 
+
+def as_record(data):
+    """
+    Convert trial data to a record (a dict of column name: value)
+
+    Accepts a dict (returned as it is), a dataclass instance (including
+    __slots__ dataclasses) or, for older components, a single row DataFrame.
+    """
+    if isinstance(data, dict):
+        return data
+    if dataclasses.is_dataclass(data) and not isinstance(data, type):
+        return {field.name: getattr(data, field.name)
+                for field in dataclasses.fields(data)}
+    if hasattr(data, 'ndim') and hasattr(data, 'iloc'):
+        # pandas DataFrame, checked without importing pandas
+        if data.ndim != 2:
+            raise ValueError("Expected a pandas DataFrame")
+        if data.shape[0] != 1:
+            raise ValueError("Expected a single row")
+        return {str(name): value for name, value
+                in zip(data.columns, data.iloc[0].tolist())}
+    raise TypeError('Expected a dict, dataclass or single row DataFrame, '
+                    f'got {type(data).__name__}')
+
+
+def record_fields(data):
+    """Names of the fields of a record, dataclass (or its type) or
+    DataFrame"""
+    if isinstance(data, type) and dataclasses.is_dataclass(data):
+        return [field.name for field in dataclasses.fields(data)]
+    return list(as_record(data))
+
+
+def _format(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value != value:
+        return ''  # NaN, as pandas writes it
+    return value
+
+
 class CSVLogger:
     """
     CSVLogger wraps up mundane stuff to do with creating a comma separated
@@ -9,32 +50,37 @@ class CSVLogger:
     - create the file
     - dynamically add data
     - write data to the log
-    
+
+    Each row is assembled from records (dicts, dataclasses or single row
+    DataFrames) appended with the same row_id, with an optional prefix on
+    their column names. Rows are written with the csv module as soon as the
+    next row is started, so no pandas is involved.
+
+    The columns can be declared up front with declare_columns(). Otherwise
+    they are fixed by the first row. A later row with new columns extends the
+    header and the file is rewritten (rare, e.g. with ragged keyword counts).
+    Missing values are left empty.
+
     CSVLogger inherits from ContextManager so the file should always be saved
     in a valid state
-    
     """
-    
-    
-    
-    
+
     def __init__(self, filepath):
         """
-        on creation, check that we can write to the file
- 
-        TODO: handle empty filename
-        TODO: handle file already exists
+        on creation, check that we can write to the file (which must not
+        already exist)
         """
-        # print(filepath)
         self.log_path = pathlib.Path(filepath)
         self.log_path.touch(exist_ok=False)  # do NOT overwrite!
-        
-        self.current_row_id = []  # unique key for dataframe - probaby the trial number
-        self.current_row_df = pd.DataFrame(columns=['row_id'])      # dataframe being built for the current row
-        self.full_df = pd.DataFrame(columns=['row_id'])         # dataframe containing all the data
-        
-        self.current_row_df.set_index('row_id',inplace=True)
-        self.full_df.set_index('row_id',inplace=True)
+
+        self.columns = ['row_id']  # header, declared or as written so far
+        self._known_columns = {'row_id'}
+        self._header_written = False
+        self.current_row_id = None  # probably the trial number
+        self.current_row = {}
+        self._finalised_row_ids = set()
+        self._file = None
+        self._writer = None
 
     # implement conext manager magic
     def __enter__(self):
@@ -46,110 +92,96 @@ class CSVLogger:
         CSVLogger
             This object provides the interface
         """
-        # self.file = open(self.log_path, 'w')
-        # return self.file
         return self
 
     # implement conext manager magic
     def __exit__(self, exc_type, exc_value, traceback):
         """
         context manager magic
-        
-        closes the file
-        
-        TODO: makes sure all data has been written
+
+        writes the last row and closes the file
         """
-        # if self.file:
-        #     self.finalise_current_row()
-        #     self.file.close()
-        self.finalise_current_row()
+        self.close()
 
+    def close(self):
+        """Write the last row and close the file"""
+        self.finalise_current_row()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
 
-    def dfs_are_consistent(self):
+    def declare_columns(self, fields, prefix=''):
         """
-        Checks whether the saved dataframe and the row dataframe are consistent
-        
-        Currently this just checks the column names but it could be extended
-
-        Returns
-        -------
-        Bool: True if they are the same
+        Add columns to the header before the first row is written
 
+        fields may be a list of names or anything accepted by
+        record_fields(). This fixes the column order and means rows which
+        leave a field out don't cause the file to be rewritten.
         """
-        return self.current_row_df.columns.equals(self.full_df.columns)
-        
-        
+        if self._header_written:
+            raise RuntimeError('Columns must be declared before the first '
+                               'row is written')
+        if not isinstance(fields, (list, tuple)):
+            fields = record_fields(fields)
+        self._add_columns(prefix + name for name in fields)
+
+    def _add_columns(self, names):
+        new_columns = [name for name in names
+                       if name not in self._known_columns]
+        self.columns.extend(new_columns)
+        self._known_columns.update(new_columns)
+        return new_columns
 
     # save data to the log
     def append(self, row_id, data, prefix=''):
-        # error checking
-        if (data.ndim != 2):
-            raise ValueError("Expected a pandas DataFrame")
-        shape = data.shape
-        if (shape[0] != 1):
-            raise ValueError("Expected a single row")
-
-        # add prefix to column names just in case they get duplicated
-        if (prefix != ''):
-            data = data.add_prefix(prefix)
-            
-        # force the index of the added dataframe row
-        # print(data)
-        data = data.reset_index() # get rid of current index (in some cases it is called row_id)
-        # data["row_id"]=row_id # causes SettingWithCopyWarning
-        # print(data)
-        data.loc[:,"row_id"] = row_id
-        # print(data)
-        data.set_index("row_id", inplace=True)
-        # print(data)
+        record = as_record(data)
 
         # check if we are appending to the current row or starting a new one
-        if (row_id is not self.current_row_id):
-            # print(self.full_df)
-            if (row_id in self.full_df.index.values):
+        if row_id != self.current_row_id:
+            if row_id in self._finalised_row_ids:
                 raise ValueError('Cannot reuse row_id once row is finalised')
-            self.finalise_current_row()
+            if self.current_row:
+                self.finalise_current_row()
             self.current_row_id = row_id
-            self.current_row_df = data
-        else:
-            # index of single row should always match
-            self.current_row_df = pd.concat([self.current_row_df, data],
-                                            axis=1)
-    
-        # sanity check
-        # print(self.current_row_df)
-        if (self.current_row_df.shape[0] != 1):
-            raise ValueError("The concatenated dataframe isn't a row")
-    
-    
+            self.current_row = {'row_id': row_id}
+
+        row = self.current_row
+        for name, value in record.items():
+            # prefix column names just in case they get duplicated
+            row[prefix + name] = value
+
     # append the current row to the full log
     def finalise_current_row(self):
-        # print('Entered finalise_current_row')
-        # print(self.full_df)
-        # print(self.current_row_df)
-        
-        if (self.current_row_df.shape[0] == 0):
+        if not self.current_row:
             print('Nothing to save')
-        else:       
-            if self.dfs_are_consistent():
-                # write row then join
-                self.current_row_df.to_csv(self.log_path,
-                     index=True,
-                     header=False,
-                     mode='a')
-                self.full_df = pd.concat([self.full_df, self.current_row_df])
-            else:            
-                # join then overwrite full log
-                self.full_df = pd.concat([self.full_df, self.current_row_df])
-                self.full_df.to_csv(self.log_path,
-                index=True,
-                header=True,
-                mode='w')
-
-               
-            
-        # df_to_write.T.to_csv(self.log_path,
-        #              index=False,
-        #              header=False,
-        #              mode='a')
- 
\ No newline at end of file
+            return
+
+        row = self.current_row
+        new_columns = self._add_columns(row)
+        if self._header_written and new_columns:
+            self._rewrite_with_header()
+        if self._file is None:
+            self._file = open(self.log_path, 'a', newline='')
+            self._writer = csv.writer(self._file)
+        if not self._header_written:
+            self._writer.writerow(self.columns)
+            self._header_written = True
+        self._writer.writerow([_format(row.get(name))
+                               for name in self.columns])
+        # keep the log complete on disk after every trial
+        self._file.flush()
+        self._finalised_row_ids.add(self.current_row_id)
+        self.current_row_id = None
+        self.current_row = {}
+
+    def _rewrite_with_header(self):
+        """Rewrite the rows already saved with the extended header"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        with open(self.log_path, newline='') as f:
+            saved_rows = list(csv.DictReader(f))
+        with open(self.log_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=self.columns, restval='')
+            writer.writeheader()
+            writer.writerows(saved_rows)
@@ -0,0 +1,81 @@
+import pathlib
+import tempfile
+import unittest
+import numpy as np
+from responsemode.answer_key import AnswerKey
+
+
+class TestAnswerKey(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.dir = pathlib.Path(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_matrix_from_files(self):
+        # one column per word position, shorter columns left blank
+        (self.dir / 'choices.csv').write_text('Peter,got,three\n'
+                                              'Kathy,sees,nine\n'
+                                              'Lucy,,two\n')
+        (self.dir / 'answers.csv').write_text('Lucy,sees,two\n'
+                                              'Peter,got,nine\n')
+        key = AnswerKey.from_config(
+            {"choices_path": str(self.dir / 'choices.csv'),
+             "answer_key_path": str(self.dir / 'answers.csv')})
+        self.assertEqual(key.num_intervals, 3)
+        self.assertEqual(len(key), 2)
+        self.assertEqual(key.choices[1], ['got', 'sees'])
+        np.testing.assert_array_equal(key.answers, [[2, 1, 2], [0, 0, 1]])
+        self.assertEqual(key.answer_labels(1), ['Peter', 'got', 'nine'])
+        self.assertEqual(key.score(0, [2, 0, 2]), [True, False, True])
+
+    def test_numeric_labels(self):
+        # with digits as labels, "0,1,2" must not be read partly as labels
+        # and partly as indices
+        choices = [['1', '2', '3']] * 3
+        path = self.dir / 'answers.csv'
+        path.write_text('0,1,2\n')
+        key = AnswerKey.from_config({"choices": choices,
+                                     "answer_key_path": str(path),
+                                     "answer_key_format": "indices"})
+        np.testing.assert_array_equal(key.answers, [[0, 1, 2]])
+        with self.assertRaises(ValueError):
+            AnswerKey.from_config({"choices": choices,
+                                   "answer_key_path": str(path)})
+        path.write_text('1,2,3\n')
+        key = AnswerKey.from_config({"choices": choices,
+                                     "answer_key_path": str(path)})
+        np.testing.assert_array_equal(key.answers, [[0, 1, 2]])
+        path.write_text('one,1,2\n')
+        with self.assertRaises(ValueError):
+            AnswerKey.from_config({"choices": choices,
+                                   "answer_key_path": str(path),
+                                   "answer_key_format": "indices"})
+        with self.assertRaises(ValueError):
+            AnswerKey.from_config({"choices": choices,
+                                   "answer_key_path": str(path),
+                                   "answer_key_format": "mixed"})
+
+    def test_nafc_from_npy(self):
+        np.save(self.dir / 'answers.npy', np.array([0, 2, 1]))
+        key = AnswerKey.from_config(
+            {"choices": [['1', '2', '3']],
+             "answer_key_path": str(self.dir / 'answers.npy')})
+        self.assertEqual(key.score(1, [2]), [True])
+        self.assertEqual(key.score(2, [0]), [False])
+        np.testing.assert_array_equal(
+            key.score_batch([0, 1, 2, 0], [[0], [1], [1], [-1]]),
+            [[True], [False], [True], [False]])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            AnswerKey([['a', 'b']], [0, 2])
+        with self.assertRaises(ValueError):
+            AnswerKey([['a', 'b'], ['c']], [0, 1])
+        with self.assertRaises(ValueError):
+            AnswerKey.indices_from_labels([['a', 'b']], [['z']])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import pathlib
+import tempfile
+import unittest
+from responsemode import ClosedSetChoice
+from responsemode.response_input import ResponseInput
+from responsemode.stub_for_tests import ScriptedWindow
+from seatlog import read_records
+
+
+class TestClosedSetChoice(unittest.TestCase):
+    def setUp(self):
+        # matrix test: names and numbers, stimulus 0 is "Lucy two"
+        self.rm = ClosedSetChoice({"choices": [['Peter', 'Kathy', 'Lucy'],
+                                               ['one', 'two']],
+                                   "answer_key": [[2, 1], [0, 0]]})
+
+    def run_trial(self, script, stimulus_id=0):
+        rm = self.rm
+        rm.window = ScriptedWindow(script)
+        rm.response_input = ResponseInput(rm.window)
+        rm.default_color = ('black', 'grey')
+        rm.show_prompt(stimulus_id)
+        return rm.wait()
+
+    def test_buttons(self):
+        result = self.run_trial([(ClosedSetChoice.button_key(0, 2), {}),
+                                 (ClosedSetChoice.button_key(1, 0), {}),
+                                 (self.rm.done_button_key, {})])
+        self.assertEqual(result, [True, False])
+        record = self.rm.get_trial_record()
+        self.assertEqual(record['choice_0'], 'Lucy')
+        self.assertEqual(record['answer_1'], 'two')
+        self.assertEqual(record['n_correct'], 1)
+        self.assertEqual(record['num_inputs'], 2)
+        self.assertEqual(list(record), self.rm.trial_record_fields())
+
+    def test_log(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            log_path = pathlib.Path(tmpdir, 'response_log.csv')
+            self.rm = ClosedSetChoice({"choices": [['Peter', 'Lucy'],
+                                                   ['one', 'two']],
+                                       "answer_key": [[1, 1]],
+                                       "log_path": log_path})
+            self.run_trial([('2', {}), ('1', {}), ('Return:36', {})])
+            self.rm.close()
+            log = read_records(log_path)
+        self.assertEqual(list(log.columns),
+                         list(ClosedSetChoice.response_log_schema))
+        self.assertEqual(log.keywords[0], 'Lucy|two')
+        self.assertEqual(log.choices[0], 'Lucy|one')
+        self.assertEqual(log.correct_mask[0], 0b01)
+        self.assertEqual(log.n_keywords[0], 2)
+
+    def test_keyboard(self):
+        # 3 picks Lucy and moves on, 1 picks one, BackSpace goes back to the
+        # names so 1 then replaces Lucy with Peter, and 2 picks two
+        result = self.run_trial([('3', {}), ('1', {}), ('BackSpace:22', {}),
+                                 ('1', {}), ('2', {}), ('Return:36', {})],
+                                stimulus_id=1)
+        self.assertEqual(result, [True, False])
+        self.assertEqual(self.rm.selection_labels(), ['Peter', 'two'])
+        # Peter is highlighted and Lucy is back to normal
+        self.assertEqual(self.rm.window[ClosedSetChoice.button_key(0, 2)]
+                         .properties['button_color'], ('black', 'grey'))
+        self.assertEqual(self.rm.window[ClosedSetChoice.button_key(0, 0)]
+                         .properties['button_color'], ('white', 'green'))
+
+    def test_incomplete_selection_is_not_submitted(self):
+        # Return does nothing until every interval has a choice, and keys
+        # past the end of a short interval are ignored
+        result = self.run_trial([('3', {}), ('Return:36', {}), ('9', {}),
+                                 ('2', {}), ('space:65', {})])
+        self.assertEqual(result, [True, True])
+        self.assertEqual(self.rm.get_trial_record()['num_inputs'], 2)
+
+    def test_closed_window(self):
+        self.assertIsNone(self.run_trial([(None, {})]))
+        self.assertIsNone(self.rm.window)
+
+
+if __name__ == '__main__':
+    unittest.main()
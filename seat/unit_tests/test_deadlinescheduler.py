@@ -0,0 +1,70 @@
+import time
+import unittest
+from util import DeadlineScheduler
+
+
+class TestDeadlineScheduler(unittest.TestCase):
+    def test_deadlines_are_relative_to_start(self):
+        scheduler = DeadlineScheduler()
+        origin = scheduler.start()
+        # work between waits doesn't delay the next deadline
+        time.sleep(0.01)
+        first = scheduler.wait_until('video', 0.02)
+        second = scheduler.wait_until('audio', 0.035)
+        self.assertGreaterEqual(first - origin, 20_000_000)
+        self.assertGreaterEqual(second - origin, 35_000_000)
+
+        summary = scheduler.summary()
+        self.assertEqual(list(summary),
+                         DeadlineScheduler.summary_fields(['video', 'audio']))
+        self.assertEqual(summary['t_video_ms'], 20.)
+        self.assertEqual(summary['t_audio_ms'], 35.)
+        # the errors are exactly when each wait returned. How small they are
+        # depends on the load on the machine, so it isn't asserted here
+        self.assertEqual(summary['video_error_ms'],
+                         (first - origin - 20_000_000) / 1e6)
+        self.assertEqual(summary['audio_error_ms'],
+                         (second - origin - 35_000_000) / 1e6)
+
+    def test_action_is_included_in_the_event(self):
+        scheduler = DeadlineScheduler()
+        origin = scheduler.start()
+        achieved = scheduler.wait_until('send', 0.005,
+                                        lambda: time.sleep(0.01))
+        self.assertGreaterEqual(achieved - origin, 15_000_000)
+        self.assertGreaterEqual(scheduler.summary()['send_error_ms'], 10.)
+
+    def test_record_early_event(self):
+        scheduler = DeadlineScheduler()
+        scheduler.start()
+        scheduler.record('audio', 1.)
+        self.assertLess(scheduler.summary()['audio_error_ms'], 0.)
+        start = time.perf_counter_ns()
+        scheduler.wait(0.)
+        self.assertLess(time.perf_counter_ns() - start, 5_000_000)
+        self.assertEqual(list(scheduler.summary()),
+                         DeadlineScheduler.summary_fields(['audio']))
+
+    def test_missed_deadline_is_recorded(self):
+        scheduler = DeadlineScheduler()
+        scheduler.start()
+        time.sleep(0.01)
+        start = time.perf_counter_ns()
+        scheduler.wait_until('stimulus', 0.)
+        self.assertLess(time.perf_counter_ns() - start, 5_000_000)
+        self.assertGreaterEqual(scheduler.summary()['stimulus_error_ms'], 10.)
+
+    def test_start_clears_events(self):
+        scheduler = DeadlineScheduler.from_config({"scheduler_spin_s": 0.})
+        scheduler.start()
+        scheduler.wait_until('cue', 0.)
+        scheduler.start()
+        self.assertEqual(scheduler.summary(), {})
+
+    def test_must_start_first(self):
+        self.assertRaises(RuntimeError, DeadlineScheduler().wait_until,
+                          'cue', 0.)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import pathlib
+import subprocess
+import sys
+import unittest
+
+# packages which should only be loaded when a feature which needs them is
+# configured (plotting or a GUI response mode)
+HEAVY_PACKAGES = {'matplotlib', 'seaborn', 'PySimpleGUI', 'tkinter'}
+
+# generous upper bound (seconds) - the point is to catch a heavy package
+# creeping back in, not to benchmark the machine
+BUDGET_S = 5.0
+
+
+def import_times(module_name):
+    """
+    Import module_name in a fresh interpreter with -X importtime
+
+    Returns a dict of {imported module: self time in microseconds}
+    """
+    seat_dir = pathlib.Path(__file__).resolve().parents[1]
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module_name}'],
+        cwd=seat_dir, capture_output=True, text=True, check=True)
+    times = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # header
+        times[fields[2].strip()] = int(fields[0])
+    return times
+
+
+class TestImportTime(unittest.TestCase):
+    entry_points = ['seat', 'probestrategy', 'probestrategy.simulation',
+                    'responsemode', 'seatlog']
+
+    def test_entry_points(self):
+        for entry_point in self.entry_points:
+            with self.subTest(entry_point=entry_point):
+                times = import_times(entry_point)
+                total_s = sum(times.values()) / 1e6
+                print(f'import {entry_point}: {total_s:.3f} s, '
+                      f'{len(times)} modules')
+                heavy = {name.split('.')[0] for name in times} \
+                    & HEAVY_PACKAGES
+                self.assertEqual(heavy, set())
+                self.assertLess(total_s, BUDGET_S)
+
+    def test_lazy_response_mode(self):
+        """Response modes are still available as package attributes"""
+        import responsemode
+        self.assertTrue(hasattr(responsemode, 'AlwaysCorrect'))
+        with self.assertRaises(AttributeError):
+            responsemode.NotAResponseMode
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import pathlib
+import tempfile
+import unittest
+from responsemode.keyword_corpus import KeywordCorpus
+
+
+class TestKeywordCorpus(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.keywords_path = pathlib.Path(self.tmpdir.name, 'keywords.txt')
+        self.keywords_path.write_text('birch,canoe,slid,smooth,planks\n'
+                                      'glue,sheet,dark,blue\n'
+                                      'café,naïve,,,\n',
+                                      encoding='utf-8')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_ragged_rows(self):
+        corpus = KeywordCorpus.from_file(self.keywords_path, cache=False)
+        self.assertEqual(len(corpus), 3)
+        self.assertEqual(corpus.max_keywords, 5)
+        self.assertEqual(corpus[0], ('birch', 'canoe', 'slid', 'smooth',
+                                     'planks'))
+        self.assertEqual(corpus[1], ('glue', 'sheet', 'dark', 'blue'))
+        self.assertEqual(corpus[2], ('café', 'naïve'))
+        self.assertEqual(corpus.num_keywords(1), 4)
+        with self.assertRaises(IndexError):
+            corpus[3]
+        self.assertFalse(
+            KeywordCorpus.sidecar_path(self.keywords_path).exists())
+
+    def test_sidecar_reused(self):
+        first = KeywordCorpus.from_file(self.keywords_path)
+        sidecar_path = KeywordCorpus.sidecar_path(self.keywords_path)
+        self.assertTrue(sidecar_path.exists())
+        cached = KeywordCorpus.load_sidecar(sidecar_path, first.sha256)
+        self.assertIsNotNone(cached)
+        for stimulus_id in range(len(first)):
+            self.assertEqual(cached[stimulus_id], first[stimulus_id])
+        # no temporary files left behind
+        self.assertEqual(sorted(os.listdir(self.tmpdir.name)),
+                         ['keywords.txt', sidecar_path.name])
+
+    def test_sidecar_rebuilt_when_file_changes(self):
+        KeywordCorpus.from_file(self.keywords_path)
+        self.keywords_path.write_text('one,two\n', encoding='utf-8')
+        corpus = KeywordCorpus.from_file(self.keywords_path)
+        self.assertEqual(len(corpus), 1)
+        self.assertEqual(corpus[0], ('one', 'two'))
+        self.assertEqual(KeywordCorpus.from_file(self.keywords_path)[0],
+                         ('one', 'two'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import itertools
+import time
+import unittest
+import numpy as np
+from responsemode.keyword_corpus import KeywordCorpus
+from responsemode.keyword_matcher import (KeywordMatcher, bounded_levenshtein,
+                                          normalise, stem, _encode)
+
+
+def levenshtein(a, b):
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+class TestKeywordMatcher(unittest.TestCase):
+    def setUp(self):
+        corpus = KeywordCorpus.from_rows(
+            [['birch', 'canoe', 'slid', 'smooth', 'planks'],
+             ['two', 'dark', 'blue'],
+             ['the', 'cat', 'the', 'hat']])
+        self.matcher = KeywordMatcher(corpus,
+                                      homophones=[['two', 'too', 'to']])
+
+    def test_normalise(self):
+        self.assertEqual(normalise("Café, it's NAÏVE!"),
+                         ['cafe', 'its', 'naive'])
+        self.assertEqual([stem(word) for word in
+                          ['planks', 'glued', 'sliding', 'running', 'glass']],
+                         ['plank', 'glu', 'slid', 'run', 'glass'])
+
+    def test_bounded_levenshtein(self):
+        words = [''.join(chars) for n in range(5)
+                 for chars in itertools.product('abé', repeat=n)]
+        pairs = list(itertools.product(words[::3], words[::5]))
+        a_codes, a_lengths = _encode([a for a, _ in pairs], pad=-1)
+        b_codes, b_lengths = _encode([b for _, b in pairs], pad=-2)
+        for bound in [0, 1, 2, 5]:
+            expected = [min(levenshtein(a, b), bound + 1) for a, b in pairs]
+            np.testing.assert_array_equal(
+                bounded_levenshtein(a_codes, a_lengths, b_codes, b_lengths,
+                                    bound),
+                expected)
+
+    def test_score(self):
+        self.assertEqual(
+            self.matcher.score(0, 'The birch canoe slid on the smooth planks.'),
+            [True] * 5)
+        # variants and spelling errors
+        self.assertEqual(
+            self.matcher.score(0, 'A BIRCH canoes sliding on smoth plank'),
+            [True] * 5)
+        self.assertEqual(self.matcher.score(0, 'a burch cane'),
+                         [True, True, False, False, False])
+        self.assertEqual(self.matcher.score(0, ''), [False] * 5)
+
+    def test_short_words_and_homophones(self):
+        self.assertEqual(self.matcher.score(1, 'too dork blew'),
+                         [True, True, False])
+        self.assertEqual(self.matcher.score(1, 'tow deck blue'),
+                         [False, False, True])
+
+    def test_each_word_scores_once(self):
+        self.assertEqual(self.matcher.score(2, 'the cat hat'),
+                         [True, True, False, True])
+        self.assertEqual(self.matcher.score(2, 'the cat the hat'),
+                         [True, True, True, True])
+
+    def test_score_is_fast(self):
+        self.matcher.prepare(0)
+        num_repeats = 200
+        start = time.perf_counter()
+        for _ in range(num_repeats):
+            self.matcher.score(0, 'The burch canoo slides on the smoth plank')
+        mean_s = (time.perf_counter() - start) / num_repeats
+        # typically a few tenths of a millisecond, leave room for busy hosts
+        self.assertLess(mean_s, 0.005)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import os
+import pathlib
+import tempfile
+import time
+import unittest
+from avrenderercontrol.media_manifest import MediaManifest
+
+
+class TestMediaManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.tmpdir.name)
+        self.media_paths = []
+        for talker in ('a', 'b'):
+            (self.root / talker).mkdir()
+            for i in range(3):
+                path = self.root / talker / f'{i}.mp4'
+                path.write_bytes(b'x' * i)
+                self.media_paths.append(path)
+        (self.root / 'lists').mkdir()
+        self.list_path = self.root / 'lists' / 'video.txt'
+        self.write_list(self.media_paths)
+        self.age_corpus()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_list(self, paths):
+        self.list_path.write_text(''.join(f'{path}\n' for path in paths))
+
+    def age_corpus(self):
+        # a corpus which was set up a while ago: changes made by the tests
+        # are well clear of the mtimes recorded in the manifest
+        mtime = time.time() - 3600
+        for directory, _, filenames in os.walk(self.root):
+            for name in filenames:
+                os.utime(os.path.join(directory, name), (mtime, mtime),
+                         follow_symlinks=False)
+            os.utime(directory, (mtime, mtime))
+
+    def test_paths_in_order(self):
+        manifest = MediaManifest.from_file(self.list_path, cache=False)
+        self.assertEqual(manifest.paths, self.media_paths)
+        self.assertEqual(manifest.num_checked, 6)
+        self.assertFalse(MediaManifest.sidecar_path(self.list_path).exists())
+
+    def test_unchanged_corpus_is_not_rechecked(self):
+        MediaManifest.from_file(self.list_path)
+        self.assertTrue(MediaManifest.sidecar_path(self.list_path).exists())
+        manifest = MediaManifest.from_file(self.list_path)
+        self.assertEqual(manifest.paths, self.media_paths)
+        self.assertEqual(manifest.num_checked, 0)
+
+    def test_replaced_file_is_rechecked(self):
+        MediaManifest.from_file(self.list_path)
+        # e.g. a re-encoded video saved over the old one
+        new_path = self.media_paths[4].with_suffix('.tmp')
+        new_path.write_bytes(b'longer')
+        os.replace(new_path, self.media_paths[4])
+        manifest = MediaManifest.from_file(self.list_path)
+        self.assertEqual(manifest.num_checked, 3)
+
+    def test_recently_changed_directory_is_checked_again(self):
+        MediaManifest.from_file(self.list_path)
+        self.media_paths[0].unlink()
+        self.media_paths[0].write_bytes(b'')
+        # its mtime may be in the same tick as a further change, so it
+        # isn't trusted until it is older
+        for _ in range(2):
+            manifest = MediaManifest.from_file(self.list_path)
+            self.assertEqual(manifest.num_checked, 3)
+
+    def test_missing_file(self):
+        MediaManifest.from_file(self.list_path)
+        self.media_paths[1].unlink()
+        self.assertRaises(FileNotFoundError, MediaManifest.from_file,
+                          self.list_path)
+
+    def test_broken_symlink(self):
+        store = self.root / 'store'
+        store.mkdir()
+        target = store / 'shared.mp4'
+        target.write_bytes(b'x')
+        link = self.root / 'a' / 'shared.mp4'
+        try:
+            link.symlink_to(target)
+        except (OSError, NotImplementedError):
+            self.skipTest('symlinks are not supported here')
+        self.write_list(self.media_paths + [link])
+        self.age_corpus()
+        manifest = MediaManifest.from_file(self.list_path)
+        self.assertEqual(manifest.link_dirs, {str(link): str(store)})
+        # the directory the link points into is only known after the first
+        # check, so it is read then
+        self.assertEqual(MediaManifest.from_file(self.list_path).num_checked,
+                         1)
+        self.assertEqual(MediaManifest.from_file(self.list_path).num_checked,
+                         0)
+        # removing the target doesn't change the link's directory
+        target.unlink()
+        self.assertRaises(FileNotFoundError, MediaManifest.from_file,
+                          self.list_path)
+
+    def test_list_change_invalidates_cache(self):
+        MediaManifest.from_file(self.list_path)
+        self.write_list(self.media_paths[:1])
+        manifest = MediaManifest.from_file(self.list_path)
+        self.assertEqual(manifest.paths, self.media_paths[:1])
+        self.assertEqual(manifest.num_checked, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
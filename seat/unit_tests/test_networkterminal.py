@@ -0,0 +1,111 @@
+import pathlib
+import statistics
+import tempfile
+import time
+import unittest
+import urllib.request
+from responsemode.network_terminal import NetworkTerminal
+from seatlog import read_records
+from responsemode.terminal_client import ScriptedTerminalClient
+
+
+class TestNetworkTerminal(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        keywords_path = pathlib.Path(self.tmpdir.name, 'keywords.txt')
+        keywords_path.write_text('birch,canoe,slid,smooth,planks\n'
+                                 'glue,sheet,dark\n')
+        self.log_path = pathlib.Path(self.tmpdir.name, 'response_log.csv')
+        self.terminal = NetworkTerminal({'port': 0,
+                                         'keywords_path': str(keywords_path),
+                                         'keywords_cache': False,
+                                         'wait_interval': 0,
+                                         'log_path': self.log_path})
+        self.url = f'http://127.0.0.1:{self.terminal.server.port}'
+        self.clients = []
+
+    def tearDown(self):
+        for client in self.clients:
+            client.close()
+        self.terminal.close()
+        self.tmpdir.cleanup()
+
+    def connect(self, **kwargs):
+        client = ScriptedTerminalClient(self.url, **kwargs)
+        self.clients.append(client)
+        return client
+
+    def test_serves_page(self):
+        with urllib.request.urlopen(self.url + '/', timeout=5) as response:
+            self.assertIn(b'WebSocket', response.read())
+
+    def test_trials(self):
+        self.connect(respond=lambda prompt: [i % 2 == 0 for i in
+                                             range(len(prompt['keywords']))])
+        rtts = []
+        for trial in range(20):
+            stimulus_id = trial % 2
+            self.terminal.show_prompt(stimulus_id)
+            result = self.terminal.wait()
+            # padded to the longest sentence
+            self.assertEqual(result, [[True, False, True, False, True],
+                                      [True, False, True, False, False]]
+                             [stimulus_id])
+            row = self.terminal.get_trial_data().iloc[0]
+            self.assertEqual(row.stimulus_id, stimulus_id)
+            self.assertEqual(row.n_correct, sum(result))
+            self.assertLessEqual(row.t_controls_enabled_ms,
+                                 row.t_submitted_ms)
+            rtts.append(row.prompt_rtt_ms)
+        self.assertLess(statistics.median(rtts), 20)
+        self.assertTrue(self.terminal.continue_when_ready('Next block'))
+
+        self.terminal.close()
+        log = read_records(self.log_path)
+        self.assertEqual(len(log), 20)
+        self.assertEqual(log.keywords[1], 'glue|sheet|dark')
+        self.assertEqual(list(log.correct_mask[:2]), [0b10101, 0b101])
+        self.assertEqual(list(log.n_keywords[:2]), [5, 3])
+
+    def test_prompt_before_connection_and_reconnect(self):
+        # the prompt is pushed when the terminal connects
+        self.terminal.show_prompt(1)
+        first = self.connect(respond=lambda prompt: [True, True, True])
+        self.assertEqual(self.terminal.wait(),
+                         [True, True, True, False, False])
+        first.close()
+        self.terminal.show_prompt(0)
+        self.connect(respond=lambda prompt: [False] * 5)
+        self.assertEqual(self.terminal.wait(), [False] * 5)
+
+    def test_cancel_on_terminal(self):
+        self.connect(respond=lambda prompt: None)
+        self.terminal.show_prompt(0)
+        self.assertIsNone(self.terminal.wait())
+        self.terminal.close()
+        self.assertEqual(len(read_records(self.log_path)), 0)
+
+    def test_response_timeout(self):
+        self.terminal.response_timeout = 0.1
+        # no terminal connected
+        self.terminal.show_prompt(0)
+        start = time.monotonic()
+        self.assertIsNone(self.terminal.wait())
+        self.assertLess(time.monotonic() - start, 2)
+
+    def test_send_timeout(self):
+        server = self.terminal.server
+        server.send_timeout = 0.1
+        # hold up the server thread
+        server.loop.call_soon_threadsafe(time.sleep, 0.5)
+        # the builtin TimeoutError with its message, whichever Python
+        with self.assertRaisesRegex(TimeoutError, 'did not send'):
+            server.send({'type': 'message', 'id': 0, 'text': ''})
+        # and the message was cancelled, not sent late
+        server.send_timeout = 5
+        server.send({'type': 'enable', 'trial': 0})
+        self.assertNotIn('message', server._replay)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import socket
+import time
+import unittest
+from pythonosc import udp_client
+from pythonosc.osc_bundle import OscBundle
+from avrenderercontrol.osc_bundle import BundleCollector
+
+
+class TestBundleCollector(unittest.TestCase):
+    def setUp(self):
+        # two receivers standing in for unity and tascar
+        self.servers = []
+        for _ in range(2):
+            server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            server.bind(('127.0.0.1', 0))
+            server.settimeout(2)
+            self.servers.append(server)
+        self.clients = [udp_client.SimpleUDPClient('127.0.0.1',
+                                                   server.getsockname()[1])
+                        for server in self.servers]
+
+    def tearDown(self):
+        for server in self.servers:
+            server.close()
+        for client in self.clients:
+            client._sock.close()
+
+    def receive(self, server):
+        dgram = server.recv(65536)
+        self.assertTrue(OscBundle.dgram_is_bundle(dgram))
+        return OscBundle(dgram)
+
+    def test_one_datagram_per_destination(self):
+        video, tascar = self.clients
+        # a second client with the same destination shares its bundle
+        tascar_again = udp_client.SimpleUDPClient(*self.servers[1]
+                                                  .getsockname())
+        self.addCleanup(tascar_again._sock.close)
+
+        phase = BundleCollector()
+        phase.add(tascar, '/scene/target/pos', [1.0, 0.0, 0.0])
+        phase.add(video, '/video/position', [1, 0.0, 90.0])
+        phase.add(tascar_again, '/scene/masker/pos', [0.0, 1.0, 0.0])
+        phase.add(video, '/video/play', [1, 'cue.mp4'])
+        self.assertEqual(len(phase), 4)
+
+        timetag = time.time() + 0.5
+        self.assertEqual(phase.send(timetag), 2)
+        self.assertEqual(len(phase), 0)
+
+        video_bundle = self.receive(self.servers[0])
+        self.assertEqual([(m.address, m.params) for m in video_bundle],
+                         [('/video/position', [1, 0.0, 90.0]),
+                          ('/video/play', [1, 'cue.mp4'])])
+        self.assertAlmostEqual(video_bundle.timestamp, timetag, places=3)
+
+        tascar_bundle = self.receive(self.servers[1])
+        self.assertEqual([m.address for m in tascar_bundle],
+                         ['/scene/target/pos', '/scene/masker/pos'])
+
+    def test_immediate(self):
+        phase = BundleCollector()
+        phase.add(self.clients[0], '/transport/start', None)
+        phase.add(self.clients[0], '/gain', 0.5)
+        phase.send()
+        bundle = self.receive(self.servers[0])
+        self.assertEqual(bundle.timestamp, 0)
+        self.assertEqual([m.params for m in bundle], [[], [0.5]])
+
+    def test_compiled_phase_with_variable_gain(self):
+        phase = BundleCollector()
+        phase.add(self.clients[0], '/target/3/add', [1, 1.0],
+                  variable='target_gain')
+        phase.add(self.clients[0], '/masker/3/add', [1, 1.0],
+                  variable='masker_gain')
+        self.assertRaises(ValueError, phase.add, self.clients[1],
+                          '/masker/3/add', [1, 'loud'], variable='gain')
+        compiled = phase.compile()
+        self.assertEqual(compiled.destinations,
+                         [self.servers[0].getsockname()])
+
+        # the same encoded phase is reused with new gains every trial
+        for gain in (0.25, 2.0):
+            compiled.set('target_gain', gain)
+            self.assertEqual(compiled.send(), 1)
+            bundle = self.receive(self.servers[0])
+            self.assertEqual([(m.address, m.params) for m in bundle],
+                             [('/target/3/add', [1, gain]),
+                              ('/masker/3/add', [1, 1.0])])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+import pathlib
+import tempfile
+import unittest
+from pythonosc import udp_client
+from avrenderercontrol.lep_tascar_osc import TargetSpeechTwoMaskers
+from avrenderercontrol.osc_bundle import BundleCollector
+from oscmock import MockRenderers
+from oscmock import report
+
+
+class TestMockRenderers(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.dir = pathlib.Path(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_messages_are_recorded(self):
+        log_path = self.dir / 'osc_log.csv'
+        with MockRenderers(unity_port=0, tascar_port=0, sampler_ports=[0],
+                           log_path=log_path, verbosity=0) as mocks:
+            unity = udp_client.SimpleUDPClient('127.0.0.1', mocks.unity.port)
+            tascar = udp_client.SimpleUDPClient('127.0.0.1',
+                                                mocks.tascar.port)
+            sampler = udp_client.SimpleUDPClient('127.0.0.1',
+                                                 mocks.samplers[0].port)
+            for client in (unity, tascar, sampler):
+                self.addCleanup(client._sock.close)
+
+            tascar.send_message('/transport/start', [])
+            phase = BundleCollector()
+            phase.add(tascar, '/scene/target/pos', [1., 0., 0.])
+            phase.add(unity, '/video/play', [1, 'target.mp4'])
+            phase.add(unity, '/video/nonsense', 1)
+            phase.send()
+            sampler.send_message('/target/3/add', [1, 0.5])
+            mocks.wait_for_messages(5)
+
+        self.assertTrue(mocks.tascar.rolling)
+        self.assertEqual(mocks.tascar.positions['/scene/target'],
+                         (1., 0., 0.))
+        self.assertEqual(mocks.unity.playing, {1: 'target.mp4'})
+        self.assertEqual(mocks.samplers[0].triggers,
+                         [('target', 3, 1, 0.5)])
+
+        records = report.load_log(log_path)
+        self.assertEqual([record['address'] for record in records],
+                         [record['address'] for record in mocks.records])
+        summary = report.summarise(records)
+        self.assertEqual(summary['num_messages'], 5)
+        self.assertEqual(summary['num_datagrams'], 4)
+        self.assertEqual(summary['num_unknown'], 1)
+        self.assertEqual(
+            summary['pairs']['unity:/video/play -> sampler*:*/add']['n'], 1)
+
+    def test_target_speech_two_maskers_end_to_end(self):
+        with MockRenderers(unity_port=0, tascar_port=0,
+                           sampler_ports=[0, 0], verbosity=0) as mocks:
+            record = self.present_trials(mocks)
+            mocks.wait_for_messages(4 + 2 * 8)
+
+        # every phase was sent at or after its deadline
+        self.assertEqual(record['t_audio_ms'], 20. + 50.)
+        for phase in ('cue', 'video', 'audio'):
+            self.assertGreaterEqual(record[phase + '_error_ms'], 0.)
+
+        self.assertTrue(mocks.tascar.rolling)
+        self.assertEqual(mocks.unity.playing[1],
+                         str(self.dir / 'target_1.mp4'))
+        self.assertEqual(mocks.tascar.positions['/scene/masker'],
+                         (-1., 0., 0.))
+        target_triggers = mocks.samplers[0].triggers
+        self.assertEqual([trigger[:2] for trigger in target_triggers],
+                         [('target', 1), ('target', 2)])
+        self.assertAlmostEqual(target_triggers[1][3], 10 ** (-6 / 20),
+                               places=6)
+
+        # one datagram per destination per phase: positions and cue to
+        # tascar and unity, the videos to unity and each sampler's /add
+        trials = [record for record in mocks.records
+                  if record['address'] not in ('/set_client_address',
+                                               '/transport/locate',
+                                               '/transport/start')
+                  and not (record['address'] == '/video/play'
+                           and record['args'].startswith('[0,'))]
+        self.assertEqual(len({record['datagram'] for record in trials}),
+                         2 * 5)
+        summary = report.summarise(mocks.records)
+        self.assertEqual(summary['num_unknown'], 0)
+        latency = summary['pairs']['unity:/video/play -> sampler*:*/add']
+        # audio follows the target video by audio_delay. The bounds are
+        # loose as the mocks share the interpreter (and perhaps a single
+        # core) with the renderer, which delays their receive timestamps
+        self.assertGreater(latency['min_ms'], 50 - 10)
+        self.assertLess(latency['max_ms'], 50 + 30)
+
+    def test_schedule_ahead_records_every_phase(self):
+        with MockRenderers(unity_port=0, tascar_port=0,
+                           sampler_ports=[0, 0], verbosity=0) as mocks:
+            record = self.present_trials(mocks, osc_schedule_ahead=0.1)
+            mocks.wait_for_messages(4 + 2 * 8)
+
+        # all phases are sent at the start of the trial, well before the
+        # time they are tagged to be executed
+        self.assertEqual(record['t_cue_ms'], 100.)
+        self.assertEqual(record['t_audio_ms'], 100. + 20. + 50.)
+        for phase in ('cue', 'video', 'audio'):
+            self.assertLess(record[phase + '_error_ms'], 0.)
+        summary = report.summarise(mocks.records)
+        self.assertEqual(summary['timetag_lateness']['n'], 2 * 8)
+
+    def present_trials(self, mocks, **config):
+        """Run two trials against the mocks and return the last record"""
+        renderer = TargetSpeechTwoMaskers(None)
+        renderer.moduleConfig['unity']['oscport'].set(mocks.unity.port)
+        renderer.load_config({**self.make_config(mocks), **config})
+        with renderer:
+            renderer.start_scene()
+            for stimulus_id, probe_level in enumerate([0., -6.]):
+                renderer.set_probe_level(probe_level)
+                renderer.present_trial(stimulus_id)
+            record = renderer.get_trial_record()
+            renderer.close_osc()
+        self.assertEqual(list(record), renderer.trial_record_fields())
+        return record
+
+    def make_config(self, mocks):
+        (self.dir / 'skybox.mp4').touch()
+        for name in ('cue_0', 'cue_1', 'target_0', 'target_1'):
+            (self.dir / f'{name}.mp4').touch()
+        (self.dir / 'cue.txt').write_text(
+            f"{self.dir / 'cue_0.mp4'}\n{self.dir / 'cue_1.mp4'}\n")
+        (self.dir / 'target.txt').write_text(
+            f"{self.dir / 'target_0.mp4'}\n{self.dir / 'target_1.mp4'}\n")
+        (self.dir / 'target_locations.txt').write_text('front\nfront\n')
+        (self.dir / 'masker_locations.txt').write_text('left\nback\n')
+
+        def position(x, y):
+            return {'tascar': {'x': x, 'y': y, 'z': 0.},
+                    'unity': {'rot_X_deg': 0., 'rot_Y_deg': 0.,
+                              'rot_Z_deg': 0., 'quad_x_euler': 0.,
+                              'quad_y_euler': 0., 'quad_x_scale': 1.,
+                              'quad_y_scale': 1.}}
+
+        def source(name, sampler, present_video):
+            return {'present_video': present_video,
+                    'video_paths_file': str(self.dir / 'target.txt'),
+                    'present_cue_video': present_video,
+                    'cue_videos_paths_file': str(self.dir / 'cue.txt'),
+                    'locations_file': str(self.dir / f'{name}_locations.txt'),
+                    'tascar_scene': 'scene',
+                    'tascar_source': name,
+                    'sampler_ip_address': '127.0.0.1',
+                    'sampler_osc_port': sampler.port,
+                    'video_id': 1 if present_video else 2}
+
+        return {
+            'TascarCommandLineInterface': {
+                'class': 'oscmock.MockTascarCli',
+                'settings': {'osc_port': mocks.tascar.port}},
+            'skybox_path': str(self.dir / 'skybox.mp4'),
+            'cue_duration': 0.02,
+            'audio_delay': 0.05,
+            'target_names': ['target'],
+            'masker_names': ['masker'],
+            'sources': {'target': source('target', mocks.samplers[0], True),
+                        'masker': source('masker', mocks.samplers[1],
+                                         False)},
+            'named_locations': {'front': position(1., 0.),
+                                'left': position(0., 1.),
+                                'back': position(-1., 0.)}}
+
+
+if __name__ == '__main__':
+    unittest.main()
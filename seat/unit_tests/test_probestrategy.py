@@ -1,11 +1,19 @@
+import pathlib
+import shutil, tempfile
+import time
 import unittest
+from unittest import mock
 import numpy as np
 from probestrategy import FixedProbeLevel
 from probestrategy import TargetEightyPercent
 from probestrategy import TargetFiftyPercent
 from probestrategy import TargetTwentyPercent
+from probestrategy import InterleavedAdaptiveTrack
 from probestrategy import DualTargetTwentyEightyPercent
+from probestrategy import QuestPlus
 from probestrategy import PsychometricFunction
+from probestrategy import track_assignment
+from probestrategy.track_assignment import random_track_assignment
 
 class TestFixedProbeLevel(unittest.TestCase):
     def test_end_criterion(self):
@@ -338,6 +346,27 @@ class TestTargetFiftyPercent(unittest.TestCase):
                   ' (db): ' + str(estimation_error))
             self.assertTrue(estimation_error <= acceptable_margin)
 
+    def test_plots_saved_in_background(self):
+        """
+        Test that the end-of-block figures are written after the last trial
+        """
+        test_dir = pathlib.Path(tempfile.mkdtemp())
+        try:
+            config = {"initial_probe_level": 0,
+                      "max_num_trials": 10,
+                      "save_probe_history_plot": True,
+                      "probe_fig_save_path": test_dir / 'history.pdf',
+                      "save_regression_plot": True,
+                      "regression_fig_save_path": test_dir / 'regression.pdf'}
+            ps = TargetFiftyPercent(config)
+            while not ps.is_finished():
+                ps.store_trial_result([True, False, True, False, True])
+            ps.wait_for_plots()
+            self.assertTrue((test_dir / 'history.pdf').is_file())
+            self.assertTrue((test_dir / 'regression.pdf').is_file())
+        finally:
+            shutil.rmtree(test_dir)
+
 
 class TestDualTargetTwentyEightyPercent(unittest.TestCase):
     def test_convergence(self):
@@ -412,7 +441,236 @@ class TestDualTargetTwentyEightyPercent(unittest.TestCase):
         # print(f'maximum sequence lenfth {max_all_runs}')
         
         self.assertTrue(max_all_runs<=max_run_per_track)
+
+    def test_track_assignment_long_block(self):
+        """
+        Test that a long block with short runs is balanced and seedable
+        """
+        config = {"initial_probe_level": 0,
+                  "max_num_trials": 500,
+                  "max_run_per_track": 2,
+                  "seed": 42}
+        ta = DualTargetTwentyEightyPercent(config).track_assignment
+        np.testing.assert_array_equal(np.bincount(ta), [250, 250])
+        run_lengths = np.diff(np.flatnonzero(np.r_[1, np.diff(ta), 1]))
+        self.assertTrue(np.amax(run_lengths) <= 2)
+        np.testing.assert_array_equal(
+            ta, DualTargetTwentyEightyPercent(config).track_assignment)
+
+
+class TestInterleavedAdaptiveTrack(unittest.TestCase):
+    def make_config(self):
+        return {"max_num_trials": 9,
+                "scheduler": "round_robin",
+                "tracks": [
+                    {"target_level": 0.5, "initial_probe_level": 0,
+                     "change_vector": [3, 2, 1, -1, -2, -3]},
+                    {"target_level": 0.5, "initial_probe_level": 10,
+                     "change_vector": [3, 2, 1, -1, -2, -3],
+                     "step_size": 2, "stimulus_ids": [100, 101, 102]},
+                    {"target_level": 0.8, "initial_probe_level": -10,
+                     "change_vector": [4, 3, 2, 1, 0, -1]}]}
+
+    def test_tracks_are_independent(self):
+        ps = InterleavedAdaptiveTrack(self.make_config())
+        all_correct = [True] * 5
+        none_correct = [False] * 5
+        expected = [(0, 0, 0), (1, 10, 100), (2, -10, 2),
+                    (0, -4.5, 3), (1, 16, 101), (2, -11.5, 5),
+                    (0, -9, 6), (1, 22, 102), (2, -13, 8)]
+        for i, (track_id, level, stimulus_id) in enumerate(expected):
+            self.assertEqual(ps.get_track_id(), track_id)
+            self.assertEqual(ps.get_next_probe_level(), level)
+            self.assertEqual(ps.get_next_stimulus_id(), stimulus_id)
+            # tracks 0 and 2 always correct, track 1 never correct
+            ps.store_trial_result(none_correct if track_id == 1
+                                  else all_correct)
+        self.assertTrue(ps.is_finished())
+        np.testing.assert_array_equal(ps.track_state['num_trials'], [3, 3, 3])
+        np.testing.assert_array_equal(ps.results_df.track_id,
+                                      [0, 1, 2] * 3)
+
+    def test_reversals(self):
+        config = self.make_config()
+        config["tracks"] = config["tracks"][:1]
+        ps = InterleavedAdaptiveTrack(config)
+        for num_correct in [5, 5, 0, 0, 5, 3, 0, 0]:
+            ps.store_trial_result([i < num_correct for i in range(5)])
+        self.assertEqual(ps.track_state['num_reversals'][0], 3)
+
+    def test_many_tracks_random_runs(self):
+        tracks = [{"target_level": 0.5, "initial_probe_level": 0,
+                   "change_vector": [3, 2, 1, -1, -2, -3]}] * 4
+        config = {"max_num_trials": 200, "tracks": tracks, "seed": 0}
+        start = time.perf_counter()
+        ps = InterleavedAdaptiveTrack(config)
+        self.assertLess(time.perf_counter() - start, 2)
+        np.testing.assert_array_equal(np.bincount(ps.track_assignment),
+                                      [50] * 4)
+        config["max_run_per_track"] = 1
+        with self.assertRaisesRegex(ValueError, 'round_robin'):
+            InterleavedAdaptiveTrack(config)
+        config["scheduler"] = "round_robin"
+        InterleavedAdaptiveTrack(config)
+
+    def test_unprobed_track_starts_from_first_trial(self):
+        config = self.make_config()
+        config["initial_probe_level"] = 1
+        for track in config["tracks"]:
+            del track["initial_probe_level"]
+        ps = InterleavedAdaptiveTrack(config)
+        self.assertEqual(ps.get_next_probe_level(), 1)
+        ps.store_trial_result([True] * 5)
+        self.assertEqual(ps.get_next_probe_level(), 1 - 2 * 3)
+        ps.store_trial_result([True] * 5)
+        self.assertEqual(ps.get_next_probe_level(), 1 - 1.5 * 1)
+
+
+class TestTrackAssignment(unittest.TestCase):
+    def test_uniform(self):
+        """
+        Test that every valid sequence is (roughly) equally likely
+        """
+        # there are 14 sequences of three 0s and three 1s with runs <= 2
+        rng = np.random.default_rng(0)
+        num_repeats = 7000
+        counts = {}
+        for i in range(num_repeats):
+            seq = tuple(random_track_assignment([3, 3], 2, rng))
+            counts[seq] = counts.get(seq, 0) + 1
+        self.assertEqual(len(counts), 14)
+        expected = num_repeats / 14
+        for count in counts.values():
+            self.assertLess(abs(count - expected), 0.2 * expected)
+
+    def test_three_tracks(self):
+        ta = random_track_assignment([10, 10, 11], 1, 0)
+        np.testing.assert_array_equal(np.bincount(ta), [10, 10, 11])
+        self.assertFalse(np.any(np.diff(ta) == 0))
+
+    def test_impossible(self):
+        with self.assertRaises(ValueError):
+            random_track_assignment([10, 2], 3)
+
+    def test_shuffles_are_uniform(self):
+        """
+        Test that the fallback for large blocks is uniform too
+        """
+        rng = np.random.default_rng(1)
+        num_repeats = 7000
+        counts = {}
+        with mock.patch.object(track_assignment, 'MAX_STATES', 1):
+            for i in range(num_repeats):
+                seq = tuple(random_track_assignment([3, 3], 2, rng))
+                counts[seq] = counts.get(seq, 0) + 1
+        self.assertEqual(len(counts), 14)
+        expected = num_repeats / 14
+        for count in counts.values():
+            self.assertLess(abs(count - expected), 0.2 * expected)
+
+    def test_many_tracks(self):
+        # 51**4 states, far too many to count
+        start = time.perf_counter()
+        ta = random_track_assignment([50] * 4, 3, 0)
+        self.assertLess(time.perf_counter() - start, 2)
+        np.testing.assert_array_equal(np.bincount(ta), [50] * 4)
+        run_lengths = np.diff(np.flatnonzero(np.r_[1, np.diff(ta), 1]))
+        self.assertTrue(np.amax(run_lengths) <= 3)
+        # and no shuffle of these alternates perfectly
+        with self.assertRaisesRegex(ValueError, 'too many'):
+            random_track_assignment([50] * 4, 1, 0)
+
+    def test_cache_is_bounded(self):
+        with mock.patch.object(track_assignment, 'MAX_CACHE_BYTES', 2**20):
+            for n in range(100, 140, 4):
+                random_track_assignment([n, n], 2, 0)
+            self.assertLessEqual(sum(value[1].nbytes for value
+                                     in track_assignment._cache.values()),
+                                 2**20)
+        self.assertIn(((136, 136), 2), track_assignment._cache)
         
         
+
+
+class TestQuestPlus(unittest.TestCase):
+    def test_posterior_is_normalised(self):
+        config = {"max_num_trials": 3}
+        ps = QuestPlus(config)
+        for result in [[True]*5, [False]*5, [True, False, True, False, True]]:
+            ps.store_trial_result(result)
+            self.assertAlmostEqual(np.sum(ps.posterior), 1.0)
+            self.assertIn(ps.get_next_probe_level(), ps.probe_levels)
+        self.assertTrue(ps.is_finished())
+
+    def test_probe_moves_in_the_right_direction(self):
+        config = {"max_num_trials": 10, "initial_probe_level": 0}
+        ps = QuestPlus(config)
+        ps.store_trial_result([True]*5)
+        self.assertLess(ps.get_next_probe_level(), 0)
+        ps = QuestPlus(config)
+        ps.store_trial_result([False]*5)
+        self.assertGreater(ps.get_next_probe_level(), 0)
+
+    def test_expected_entropy(self):
+        ps = QuestPlus({"max_num_trials": 3, "probe_level_step": 5.0})
+        ps.store_trial_result([True, True, False, False, False])
+        likelihood = ps.likelihood.astype(np.float64).reshape(
+            ps.probe_levels.size, ps.num_outcomes, -1)
+        expected = []
+        for level_likelihood in likelihood:
+            entropy = 0.0
+            for outcome_likelihood in level_likelihood:
+                joint = outcome_likelihood * ps.posterior
+                z = joint.sum()
+                updated = joint[joint > 0] / z
+                entropy -= z * np.sum(updated * np.log(updated))
+            expected.append(entropy)
+        np.testing.assert_allclose(ps.expected_entropy(), expected,
+                                   rtol=1e-4)
+
+    def test_convergence(self):
+        num_trials = 30
+        true_slope = 0.15
+        acceptable_margin = 3.0
+        # seeded so the simulated responses are the same on every run
+        for seed, true_threshold in enumerate([-8, 0, 6]):
+            config = {"max_num_trials": num_trials}
+            ps = QuestPlus(config)
+            dummy_listener = PsychometricFunction(threshold_db=true_threshold,
+                                                  slope_at_threshold=true_slope,
+                                                  rng=seed)
+            while not ps.is_finished():
+                probe_level = ps.get_next_probe_level()
+                success_vector = dummy_listener.probe_response(probe_level,
+                                                               num_responses=5)
+                ps.store_trial_result(success_vector)
+            estimation_error = np.abs(ps.get_current_estimate()-true_threshold)
+            self.assertTrue(estimation_error <= acceptable_margin)
+
+    def test_update_time_on_a_fine_grid(self):
+        # 81 thresholds x 41 slopes x 30 miss probabilities, about 1e5 cells
+        config = {"max_num_trials": 30,
+                  "slope_values": np.geomspace(0.025, 0.5, 41),
+                  "miss_probability_values": np.linspace(0, 0.1, 30)}
+        ps = QuestPlus(config)
+        self.assertEqual(ps.grid_threshold.size, 99630)
+        # nothing per trial is the size of the grid
+        self.assertLessEqual(ps.entropy_cells.size, 1536)
+        dummy_listener = PsychometricFunction(threshold_db=4,
+                                              slope_at_threshold=0.1, rng=0)
+        update_times = []
+        for trial in range(30):
+            probe_level = ps.probe_level
+            num_correct = int(np.sum(dummy_listener.probe_response(
+                probe_level, num_responses=5)))
+            start = time.perf_counter()
+            ps.update_posterior(probe_level, num_correct)
+            ps.probe_level = ps.select_probe_level()
+            update_times.append(time.perf_counter() - start)
+        self.assertLess(np.median(update_times), 1e-3)
+        self.assertLess(abs(ps.get_current_estimate() - 4), 3.0)
+        self.assertAlmostEqual(np.sum(ps.posterior), 1.0)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -50,6 +50,67 @@ class TestPsychometricFunction(unittest.TestCase):
             # print(str(p_target) + ': ' + str(p_response))
             self.assertTrue(np.abs(p_target-p_response) < allowable_error)
 
+    def test_asymptotes(self):
+        pf = PsychometricFunction(threshold_db=-5, prob_at_threshold=0.7,
+                                  slope_at_threshold=0.5,
+                                  probability_of_miss=0.05,
+                                  guess_probability=0.25)
+        np.testing.assert_allclose(pf.probability_of_success([-1000, -5, 1000]),
+                                   [0.25, 0.7, 0.95])
+
+    def test_inverse(self):
+        pf = PsychometricFunction(threshold_db=3, prob_at_threshold=0.6,
+                                  slope_at_threshold=0.065,
+                                  probability_of_miss=0.02,
+                                  guess_probability=0.1)
+        probe_levels = np.linspace(-20, 20, 41)
+        np.testing.assert_allclose(
+            pf.inverse(pf.probability_of_success(probe_levels)), probe_levels,
+            atol=1e-9)
+        self.assertTrue(np.isnan(pf.inverse(0.05)))
+
+    def test_derivative(self):
+        pf = PsychometricFunction(prob_at_threshold=0.4,
+                                  slope_at_threshold=0.12,
+                                  guess_probability=0.2)
+        probe_levels = np.linspace(-10, 10, 21)
+        delta = 1e-6
+        numerical = (pf.probability_of_success(probe_levels + delta)
+                     - pf.probability_of_success(probe_levels - delta)) \
+            / (2 * delta)
+        np.testing.assert_allclose(pf.derivative(probe_levels), numerical,
+                                   rtol=1e-6)
+
+    def test_slope_is_gradient_at_threshold(self):
+        slopes = np.array([0.05, 0.1, 0.2])
+        pf = PsychometricFunction(threshold_db=-2, prob_at_threshold=0.7,
+                                  slope_at_threshold=slopes,
+                                  probability_of_miss=0.05,
+                                  guess_probability=0.25)
+        np.testing.assert_allclose(pf.derivative(-2), slopes)
+
+    def test_broadcast_over_listeners(self):
+        thresholds = np.array([-10.0, 0.0, 10.0])
+        pf = PsychometricFunction(threshold_db=thresholds)
+        np.testing.assert_allclose(pf.probability_of_success(thresholds), 0.5)
+        response = pf.probe_response(thresholds, num_responses=5)
+        self.assertEqual(response.shape, (3, 5))
+
+    def test_reproducible(self):
+        pf = PsychometricFunction()
+        first = pf.probe_response(0, 20, rng=np.random.default_rng(1))
+        second = pf.probe_response(0, 20, rng=np.random.default_rng(1))
+        np.testing.assert_array_equal(first, second)
+        np.testing.assert_array_equal(PsychometricFunction(rng=2).num_correct(
+            np.zeros(10), 5), PsychometricFunction(rng=2).num_correct(
+            np.zeros(10), 5))
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            PsychometricFunction(prob_at_threshold=0.2, guess_probability=0.25)
+        with self.assertRaises(ValueError):
+            PsychometricFunction(probability_of_miss=0.5, guess_probability=0.5)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,51 @@
+import queue
+import time
+import unittest
+from responsemode.response_input import ResponseInput
+
+
+class QueueWindow():
+    """Minimal stand-in for sg.Window: events go through a queue"""
+
+    def __init__(self):
+        self.events = queue.Queue()
+
+    def write_event_value(self, key, value):
+        self.events.put((key, {key: value}))
+
+    def read(self):
+        return self.events.get(timeout=5)
+
+
+class TestResponseInput(unittest.TestCase):
+    def test_timer_is_delivered_with_its_firing_time(self):
+        window = QueueWindow()
+        response_input = ResponseInput(window)
+        start_ns = time.perf_counter_ns()
+        response_input.schedule(0.05, 'lockout', value=1)
+        event, values, timestamp_ns = response_input.read()
+        self.assertEqual(event, 'lockout')
+        self.assertEqual(values['lockout'], 1)
+        self.assertGreaterEqual(timestamp_ns - start_ns, 0.05e9)
+
+    def test_window_events_pass_through(self):
+        window = QueueWindow()
+        response_input = ResponseInput(window)
+        window.events.put(('kw_0', {'kw_0': None}))
+        event, values, timestamp_ns = response_input.read()
+        self.assertEqual(event, 'kw_0')
+
+    def test_cancelled_events_are_dropped(self):
+        window = QueueWindow()
+        response_input = ResponseInput(window)
+        response_input.post('stale')
+        response_input.schedule(10, 'never')
+        response_input.cancel_all()
+        response_input.post('fresh')
+        event, values, timestamp_ns = response_input.read()
+        self.assertEqual(event, 'fresh')
+        self.assertTrue(window.events.empty())
+
+
+if __name__ == '__main__':
+    unittest.main()
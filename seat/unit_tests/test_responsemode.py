@@ -0,0 +1,160 @@
+import math
+import pathlib
+import tempfile
+import unittest
+import pandas as pd
+from probestrategy import TargetFiftyPercent
+import responsemode
+from responsemode import AlwaysCorrect
+from responsemode import ExperimenterSelectsCorrectKeywords
+from responsemode import TypedResponse
+from responsemode.response_mode import ResponseMode
+from responsemode.response_input import ResponseInput
+from responsemode.stub_for_tests import ScriptedWindow
+
+
+class TestResponseModeTiming(unittest.TestCase):
+    def test_marks_relative_to_prompt(self):
+        rm = AlwaysCorrect({})
+        rm.mark_prompt_shown(timestamp_ns=1_000_000_000)
+        rm.mark_stimulus_presented(timestamp_ns=1_100_000_000)
+        rm.mark_controls_enabled(timestamp_ns=1_500_000_000)
+        rm.mark_input(timestamp_ns=1_600_000_000)
+        rm.mark_input(timestamp_ns=1_700_000_000)
+        rm.mark_submitted(timestamp_ns=1_900_000_000)
+        row = rm.get_timing_data().iloc[0]
+        self.assertEqual(row.t_stimulus_presented_ms, 100)
+        self.assertEqual(row.t_controls_enabled_ms, 500)
+        self.assertEqual(row.num_inputs, 2)
+        self.assertEqual(row.t_first_input_ms, 600)
+        self.assertEqual(row.t_last_input_ms, 700)
+        self.assertEqual(row.t_inputs_ms, '600.000|700.000')
+        self.assertEqual(row.t_submitted_ms, 900)
+        self.assertEqual(row.response_latency_ms, 400)
+
+    def test_new_prompt_clears_marks(self):
+        rm = AlwaysCorrect({})
+        rm.show_prompt(0)
+        rm.mark_input()
+        rm.wait()
+        rm.show_prompt(1)
+        row = rm.get_timing_data().iloc[0]
+        self.assertEqual(row.num_inputs, 0)
+        self.assertEqual(row.t_inputs_ms, '')
+        self.assertTrue(math.isnan(row.t_submitted_ms))
+
+    def test_trial_data_includes_timing(self):
+        rm = AlwaysCorrect({})
+        rm.show_prompt(0)
+        rm.wait()
+        df = rm.get_trial_data()
+        self.assertEqual(df.shape[0], 1)
+        self.assertIn('correct_response', df.columns)
+        self.assertGreaterEqual(df.t_submitted_ms.iloc[0], 0)
+
+
+class TestExperimenterSelectsCorrectKeywords(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.keywords_path = pathlib.Path(self.tmpdir.name, 'keywords.txt')
+        self.keywords_path.write_text('birch,canoe,slid,smooth,planks\n'
+                                      'glue,sheet,dark\n')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def respond(self, rm, stimulus_id, script):
+        """Present stimulus_id in a ScriptedWindow and return the result"""
+        rm.window = ScriptedWindow(script)
+        rm.response_input = ResponseInput(rm.window)
+        rm.show_prompt(stimulus_id)
+        return rm.wait()
+
+    def test_ragged_rows_through_adaptive_track(self):
+        rm = ExperimenterSelectsCorrectKeywords(
+            {"keywords_path": self.keywords_path, "keywords_cache": False,
+             "wait_interval": 0})
+        track = TargetFiftyPercent({"initial_probe_level": 0,
+                                    "max_num_trials": 2})
+        # both keywords typed as '1' and '3', then Done
+        script = [('1', {}), ('3', {}), (' ', {})]
+
+        result = self.respond(rm, 1, script)
+        self.assertEqual(result, [True, False, True, False, False])
+        record = rm.get_trial_record()
+        self.assertEqual(record['n_keywords'], 3)
+        self.assertEqual(record['n_correct'], 2)
+        self.assertEqual(record['num_inputs'], 2)
+        self.assertNotIn('kw_3', record)
+        self.assertEqual(rm.window['kw_3'].properties['visible'], False)
+        track.store_trial_result(result)
+
+        result = self.respond(rm, 0, [('a', {}), (' ', {})])
+        self.assertEqual(result, [True] * 5)
+        track.store_trial_result(result)
+        self.assertEqual(list(track.trials['num_correct']), [2, 5])
+        self.assertTrue(track.is_finished())
+
+
+class TestTrialRecordContract(unittest.TestCase):
+    def test_needs_trial_record_or_data(self):
+        class Incomplete(ResponseMode):
+            def show_prompt(self, stimulus_id):
+                pass
+
+            def wait(self):
+                return True
+
+            def continue_when_ready(self, message=''):
+                return True
+
+        # fails when it is created, not at the first trial
+        self.assertRaises(TypeError, Incomplete)
+
+        class OnlyTrialData(Incomplete):
+            def get_trial_data(self):
+                return pd.DataFrame([{'correct': True}])
+
+        self.assertEqual(OnlyTrialData().get_trial_record(),
+                         {'correct': True})
+
+    def test_existing_modes_conform(self):
+        for name in responsemode.__all__:
+            cls = getattr(responsemode, name)
+            if isinstance(cls, type) and issubclass(cls, ResponseMode):
+                self.assertFalse(getattr(cls, '__abstractmethods__', None),
+                                 name)
+
+
+class TestTypedResponse(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.keywords_path = pathlib.Path(self.tmpdir.name, 'keywords.txt')
+        self.keywords_path.write_text('birch,canoe,slid,smooth,planks\n'
+                                      'glue,sheet,dark\n')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_ragged_rows_through_adaptive_track(self):
+        rm = TypedResponse({"keywords_path": self.keywords_path,
+                            "keywords_cache": False, "wait_interval": 0})
+        track = TargetFiftyPercent({"initial_probe_level": 0,
+                                    "max_num_trials": 1})
+        text = 'the glue was dork'
+        rm.window = ScriptedWindow(
+            [(rm.text_key, {rm.text_key: text}),
+             (rm.done_button_key, {rm.text_key: text})])
+        rm.response_input = ResponseInput(rm.window)
+        rm.show_prompt(1)
+        result = rm.wait()
+        self.assertEqual(result, [True, False, True, False, False])
+        record = rm.get_trial_record()
+        self.assertEqual(record['n_keywords'], 3)
+        self.assertEqual(record['response_text'], text)
+        track.store_trial_result(result)
+        self.assertEqual(list(track.trials['num_correct']), [2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import pathlib
+import shutil, tempfile
+import time
+import unittest
+import pandas as pd
+import seat
+
+
+class TestRunBlock(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = pathlib.Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def make_config(self, num_trials):
+        return {
+            "App": {"log_dir": str(self.test_dir),
+                    "pre_trial_delay": [0, 0]},
+            "AVRendererControl": {
+                "class": "avrenderercontrol.Dummy",
+                "settings": {"verbosity": 0}},
+            "ProbeStrategy": {
+                "class": "probestrategy.TargetFiftyPercent",
+                "settings": {"initial_probe_level": 10,
+                             "max_num_trials": num_trials,
+                             "step_size": 1.0}},
+            "ResponseMode": {
+                "class": "responsemode.SimulatedListener",
+                "settings": {"threshold_db": -3,
+                             "slope_at_threshold": 0.125,
+                             "seed": 0}}}
+
+    def test_end_to_end(self):
+        """
+        Test that a simulated listener can run a whole block
+        """
+        num_trials = 40
+        start_time = time.perf_counter()
+        seat.run_block(self.make_config(num_trials))
+        elapsed = time.perf_counter() - start_time
+        print(f'run_block: {num_trials/elapsed:.0f} trials/s')
+
+        probe_log = pd.read_csv(self.test_dir / 'probe_log.csv')
+        self.assertEqual(len(probe_log), num_trials)
+        block_log = pd.read_csv(self.test_dir / 'log.csv')
+        self.assertEqual(len(block_log), num_trials)
+        # the listener heard the level the strategy asked for
+        pd.testing.assert_series_equal(block_log.rm_probe_level,
+                                       probe_log.probe_level,
+                                       check_names=False)
+        # the track should have come down towards the threshold
+        self.assertLess(probe_log.probe_level.iloc[-10:].mean(), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,16 @@
 import shutil, tempfile
+import gc
+import subprocess
+import sys
+import dataclasses
 import pathlib
 import unittest
 import pandas as pd
 import pandas.testing as pd_testing
 from seatlog import CSVLogger
+from seatlog import CSVRowWriter
+from seatlog import RecordWriter, read_records
+from seatlog.record_writer import schema_path
 
 
 
@@ -227,5 +234,186 @@ class TestSeatLog(unittest.TestCase):
         with CSVLogger(log_path) as mylogger:
             self.assertRaises(Exception, mylogger.append, row_id, df_11)
 
+
+    def test_records(self):
+        """
+        dicts and dataclasses give the same log as DataFrames
+        """
+        @dataclasses.dataclass
+        class Trial:
+            __slots__ = ('n_correct', 'latency_ms')
+            n_correct: int
+            latency_ms: float
+
+        log_path = pathlib.Path(self.test_dir,'new_file.csv')
+        with CSVLogger(log_path) as mylogger:
+            mylogger.declare_columns(['subject_id'])
+            mylogger.declare_columns(Trial, prefix='rm_')
+            mylogger.append(1, {'subject_id': 'S1'})
+            mylogger.append(1, Trial(3, 512.5), prefix='rm_')
+            mylogger.append(2, {'subject_id': 'S1'})
+            mylogger.append(2, Trial(2, 430.0), prefix='rm_')
+
+        expected = pd.DataFrame([[1, 'S1', 3, 512.5], [2, 'S1', 2, 430.0]],
+                                columns=['row_id', 'subject_id',
+                                         'rm_n_correct', 'rm_latency_ms'])
+        self.assertEqual(pd.read_csv(log_path), expected)
+
+    def test_ragged_rows(self):
+        """
+        Undeclared columns extend the header and missing values are empty
+        """
+        log_path = pathlib.Path(self.test_dir,'new_file.csv')
+        with CSVLogger(log_path) as mylogger:
+            mylogger.append(1, {'kw_0': 'cat'})
+            mylogger.append(2, {'kw_0': 'dog', 'kw_1': 'sat'})
+            mylogger.append(3, {'kw_1': 'mat'})
+
+        with open(log_path) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines, ['row_id,kw_0,kw_1', '1,cat,', '2,dog,sat',
+                                 '3,,mat'])
+
+    def test_declare_after_first_row_fails(self):
+        log_path = pathlib.Path(self.test_dir,'new_file.csv')
+        with CSVLogger(log_path) as mylogger:
+            mylogger.append(1, {'a': 1})
+            mylogger.append(2, {'a': 2})
+            self.assertRaises(RuntimeError, mylogger.declare_columns, ['b'])
+
+
+class TestCSVRowWriter(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.log_path = pathlib.Path(self.test_dir, 'new_file.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_fails_on_file_exists(self):
+        self.log_path.touch()
+        self.assertRaises(FileExistsError, CSVRowWriter, self.log_path)
+
+    def test_rows_with_header(self):
+        true_df = pd.DataFrame([[0, 1.5, 'A', True], [1, -3.0, 'B', False]],
+                               columns=['row_id', 'level', 'word', 'correct'])
+        with CSVRowWriter(self.log_path) as writer:
+            for row in true_df.to_dict('records'):
+                writer.write_row(row)
+        in_df = pd.read_csv(self.log_path)
+        pd_testing.assert_frame_equal(in_df, true_df)
+
+    def test_schema_is_fixed_by_first_row(self):
+        with CSVRowWriter(self.log_path) as writer:
+            writer.write_row({'a': 1, 'b': 2})
+            self.assertRaises(ValueError, writer.write_row, {'a': 1, 'c': 2})
+            self.assertRaises(ValueError, writer.write_row, {'a': 1})
+            self.assertRaises(ValueError, writer.write_values, [1, 2, 3])
+
+    def test_flush_on_close(self):
+        writer = CSVRowWriter(self.log_path, header=False,
+                              flush_policy='on_close')
+        writer.write_values([1, 'x'])
+        writer.write_values([2, 'y', 'z'])  # ragged rows are allowed
+        writer.close()
+        self.assertTrue(writer.closed)
+        with open(self.log_path) as f:
+            self.assertEqual(f.read().splitlines(), ['1,x', '2,y,z'])
+
+    def test_flush_every_n_rows(self):
+        with CSVRowWriter(self.log_path, flush_policy='every_n_rows',
+                          flush_every=2, fsync=True) as writer:
+            writer.write_row({'a': 1})
+            writer.write_row({'a': 2})
+            with open(self.log_path) as f:
+                self.assertEqual(f.read().splitlines(), ['a', '1', '2'])
+
+
+class TestRecordWriter(unittest.TestCase):
+    schema = {'stimulus_id': 'int64', 'keywords': 'str',
+              'correct_mask': 'int64', 'latency_ms': 'float64',
+              'flagged': 'bool'}
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.log_path = pathlib.Path(self.test_dir, 'new_file.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_typed_round_trip(self):
+        records = [{'stimulus_id': i, 'keywords': 'birch|canoe',
+                    'correct_mask': i % 4,
+                    'latency_ms': float('nan') if i == 3 else i / 2,
+                    'flagged': i % 2 == 0} for i in range(10)]
+        with RecordWriter(self.log_path, self.schema, batch_size=4) as writer:
+            for record in records:
+                writer.append(record)
+        in_df = read_records(self.log_path)
+        self.assertEqual(list(in_df.columns), list(self.schema))
+        self.assertEqual(str(in_df.stimulus_id.dtype), 'int64')
+        self.assertEqual(str(in_df.flagged.dtype), 'bool')
+        self.assertEqual(in_df.keywords[0], 'birch|canoe')
+        self.assertTrue(pd.isna(in_df.latency_ms[3]))
+        self.assertEqual(in_df.latency_ms[5], 2.5)
+        self.assertEqual(list(in_df.correct_mask), [i % 4 for i in range(10)])
+
+    def test_batches_written_in_background(self):
+        writer = RecordWriter(self.log_path, {'a': 'int64'}, batch_size=3)
+        for i in range(4):
+            writer.append({'a': i})
+        writer.flush()
+        with open(self.log_path) as f:
+            self.assertEqual(f.read().splitlines(), ['a', '0', '1', '2', '3'])
+        writer.close()
+        self.assertTrue(writer.closed)
+
+    def test_unclosed_writer_is_written(self):
+        writer = RecordWriter(self.log_path, {'a': 'int64'}, batch_size=32)
+        for i in range(5):
+            writer.append({'a': i})
+        del writer
+        gc.collect()
+        with open(self.log_path) as f:
+            self.assertEqual(f.read().splitlines(),
+                             ['a', '0', '1', '2', '3', '4'])
+
+    def test_unclosed_writer_is_written_at_exit(self):
+        script = ('import sys\n'
+                  'from seatlog import RecordWriter\n'
+                  'writer = RecordWriter(sys.argv[1], {"a": "int64"})\n'
+                  'for i in range(5):\n'
+                  '    writer.append({"a": i})\n')
+        subprocess.run([sys.executable, '-c', script, str(self.log_path)],
+                       cwd=pathlib.Path(__file__).parents[1], check=True)
+        self.assertEqual(list(read_records(self.log_path).a), list(range(5)))
+
+    def test_schema_is_fixed(self):
+        with RecordWriter(self.log_path, {'a': 'int64', 'b': 'str'}) as writer:
+            self.assertRaises(ValueError, writer.append, {'a': 1})
+            self.assertRaises(ValueError, writer.append, {'a': 1, 'c': 'x'})
+        self.assertRaises(ValueError, RecordWriter,
+                          pathlib.Path(self.test_dir, 'other.csv'),
+                          {'a': 'complex'})
+        self.assertRaises(FileExistsError, RecordWriter, self.log_path,
+                          {'a': 'int64'})
+
+    def test_existing_files_are_left_alone(self):
+        # an existing log doesn't leave a new sidecar behind
+        self.log_path.write_text('a\n1\n')
+        self.assertRaises(FileExistsError, RecordWriter, self.log_path,
+                          {'a': 'int64'})
+        self.assertEqual(list(pathlib.Path(self.test_dir).iterdir()),
+                         [self.log_path])
+        # nor does an existing sidecar leave a new log behind
+        other_path = pathlib.Path(self.test_dir, 'other.csv')
+        sidecar = schema_path(other_path)
+        sidecar.write_text('{}')
+        self.assertRaises(FileExistsError, RecordWriter, other_path,
+                          {'a': 'int64'})
+        self.assertFalse(other_path.exists())
+        self.assertEqual(sidecar.read_text(), '{}')
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import numpy as np
+from probestrategy import PsychometricFunction
+from probestrategy import simulation
+
+
+class TestSimulation(unittest.TestCase):
+    def setUp(self):
+        self.listener = PsychometricFunction(threshold_db=-4,
+                                             slope_at_threshold=0.15)
+        self.config = {"class": "probestrategy.TargetFiftyPercent",
+                       "settings": {"initial_probe_level": 6,
+                                    "max_num_trials": 30,
+                                    "step_size": 1.0,
+                                    "log_path": "not_used.csv"}}
+
+    def test_batch_is_reproducible(self):
+        a = simulation.simulate(self.config, self.listener, num_listeners=50,
+                                seed=1)
+        b = simulation.simulate(self.config, self.listener, num_listeners=50,
+                                seed=1)
+        self.assertEqual(a['method'], 'batch')
+        np.testing.assert_array_equal(a['runs']['probe_level'],
+                                      b['runs']['probe_level'])
+        self.assertEqual(a['runs']['probe_level'].shape, (50, 30))
+
+    def test_batch_matches_single_listener_path(self):
+        """Both paths implement the same rule so statistics should agree"""
+        batch = simulation.simulate(self.config, self.listener,
+                                    num_listeners=400, seed=2)
+        single = simulation.simulate(self.config, self.listener,
+                                     num_listeners=400, seed=3,
+                                     allow_batch=False, max_workers=1)
+        self.assertEqual(single['method'], 'process_pool')
+        self.assertLess(abs(batch['bias'] - single['bias']), 0.5)
+        self.assertLess(abs(batch['sd'] - single['sd']), 0.5)
+        np.testing.assert_array_equal(single['runs']['probe_level'][:, 0], 6)
+
+    def test_process_pool(self):
+        config = {"class": "probestrategy.DualTargetTwentyEightyPercent",
+                  "settings": {"initial_probe_level": 0,
+                               "max_num_trials": 10}}
+        summary = simulation.simulate(config, self.listener, num_listeners=8,
+                                      seed=0, max_workers=2)
+        self.assertEqual(summary['method'], 'process_pool')
+        self.assertEqual(summary['runs']['probe_level'].shape, (8, 10))
+        self.assertTrue(np.isfinite(summary['mean_estimate']))
+
+    def test_tracks_are_summarised_separately(self):
+        config = {"class": "probestrategy.DualTargetTwentyEightyPercent",
+                  "settings": {"initial_probe_level": 0,
+                               "max_num_trials": 40,
+                               "num_trials_to_average": 6}}
+        summary = simulation.simulate(config, self.listener,
+                                      num_listeners=20, seed=0, max_workers=1)
+        runs = summary['runs']
+        self.assertEqual(runs['track_estimate'].shape, (20, 2))
+        np.testing.assert_array_equal(np.sum(runs['track_id'] == 0, axis=1),
+                                      20)
+        reference = self.listener.inverse(np.array([0.2, 0.8]))
+        np.testing.assert_allclose(summary['reference_level'], reference)
+        for track_id in range(2):
+            errors = runs['track_estimate'][:, track_id] - reference[track_id]
+            self.assertAlmostEqual(summary[f'track_{track_id}_bias'],
+                                   np.mean(errors))
+            # each track ends up near its own reference level
+            self.assertLess(abs(summary[f'track_{track_id}_bias']), 2.)
+        self.assertAlmostEqual(
+            summary['rmse'],
+            np.sqrt(np.mean((runs['track_estimate'] - reference)**2)))
+
+    def test_track_trials(self):
+        probe_level = np.array([[1., 2., 3., 4.],
+                                [5., 6., 7., np.nan]])
+        track_id = np.array([[0, 1, 1, 0],
+                             [1, 1, 0, np.nan]])
+        np.testing.assert_array_equal(
+            simulation._track_trials(probe_level, track_id, 1),
+            [[2., 3.], [5., 6.]])
+        np.testing.assert_array_equal(
+            simulation._track_trials(probe_level, track_id, 0),
+            [[1., 4.], [7., np.nan]])
+
+    def test_trials_to_convergence(self):
+        probe_level = np.array([[5, 3, 1, 0, 0],
+                                [0, 0, 0, 0, 0],
+                                [0, 0, 0, 0, 5],
+                                [5, 0, np.nan, np.nan, np.nan]])
+        ttc = simulation.trials_to_convergence(probe_level, 0, 1.0)
+        np.testing.assert_array_equal(ttc, [2, 0, np.nan, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import math
+import unittest
+import numpy as np
+from probestrategy import PsychometricFunction
+from probestrategy import TargetFiftyPercent
+from probestrategy import stopping
+
+
+class TestConvergenceMonitor(unittest.TestCase):
+    def test_reversal_statistics(self):
+        monitor = stopping.ConvergenceMonitor(num_reversals_to_discard=1)
+        levels = [0, -1, -2, -1, 0, -1, 0, -1]
+        directions = np.sign(np.diff(levels + [0]))
+        directions[-1] = 1
+        for level, direction in zip(levels, directions):
+            monitor.update(level, direction)
+        # reversals at -2, 0, -1, 0, -1; the first is discarded
+        self.assertEqual(monitor.num_reversals, 5)
+        self.assertEqual(monitor.num_estimate_reversals, 4)
+        self.assertAlmostEqual(monitor.estimate, -0.5)
+        self.assertAlmostEqual(monitor.standard_error,
+                               np.std([0, -1, 0, -1], ddof=1) / 2)
+
+    def test_no_reversals(self):
+        monitor = stopping.ConvergenceMonitor()
+        for level in range(5):
+            monitor.update(level, 1)
+        self.assertTrue(math.isnan(monitor.estimate))
+        self.assertEqual(monitor.standard_error, math.inf)
+
+
+class TestStoppingCriteria(unittest.TestCase):
+    def test_stable_estimate(self):
+        criterion = stopping.StableEstimate({"num_trials": 3,
+                                              "tolerance": 0.5})
+        monitor = stopping.ConvergenceMonitor()
+        met = []
+        for estimate in [math.nan, 5, 4, 3.8, 3.9, 3.7, 2]:
+            monitor.mean = estimate
+            criterion.update(monitor)
+            met.append(criterion.is_met(monitor))
+        self.assertEqual(met, [False, False, False, False, True, True, False])
+
+    def test_track_stops_early(self):
+        config = {"initial_probe_level": 10,
+                  "max_num_trials": 200,
+                  "step_size": 1.0,
+                  "num_reversals_to_discard": 0,
+                  "stopping_criteria": [
+                      {"class": "probestrategy.stopping.ReversalCount",
+                       "settings": {"num_reversals": 6}}]}
+        ps = TargetFiftyPercent(config)
+        self.assertFalse(ps.supports_batch_simulation)
+        listener = PsychometricFunction(slope_at_threshold=0.125, rng=0)
+        while not ps.is_finished():
+            ps.store_trial_result(
+                listener.probe_response(ps.get_next_probe_level(), 5))
+        self.assertLess(len(ps.trials), 200)
+        self.assertEqual(ps.convergence.num_reversals, 6)
+        self.assertEqual(ps.get_current_estimate(), ps.convergence.estimate)
+
+    def test_batch_matches_track(self):
+        """simulate_batch() gives the same estimate as running the track"""
+        config = {"initial_probe_level": 8, "max_num_trials": 40,
+                  "step_size": 1.0}
+        listener = PsychometricFunction(threshold_db=-2,
+                                        slope_at_threshold=0.125)
+        ps = TargetFiftyPercent(config)
+        rng = np.random.default_rng(5)
+        while not ps.is_finished():
+            ps.store_trial_result(listener.probe_response(
+                ps.get_next_probe_level(), 5, rng=rng))
+        runs = TargetFiftyPercent(config).simulate_batch(
+            listener, 1, np.random.default_rng(5))
+        np.testing.assert_array_equal(runs['probe_level'][0],
+                                      ps.trials['probe_level'])
+        self.assertAlmostEqual(runs['estimate'][0], ps.get_current_estimate())
+
+
+if __name__ == '__main__':
+    unittest.main()
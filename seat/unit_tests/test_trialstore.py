@@ -0,0 +1,66 @@
+import unittest
+import numpy as np
+from probestrategy.trial_store import TrialStore
+
+
+class TestTrialStore(unittest.TestCase):
+    def test_append_beyond_initial_capacity(self):
+        """
+        Test that columns grow and keep their contents
+        """
+        num_trials = 100
+        store = TrialStore(num_response_intervals=5, initial_capacity=4)
+        for i in range(num_trials):
+            success_vector = np.arange(5) < (i % 6)
+            store.append(trial_id=i, stimulus_id=i+10, target_level=0.5,
+                         probe_level=-i, success_vector=success_vector)
+        self.assertEqual(len(store), num_trials)
+        np.testing.assert_array_equal(store['trial_id'], np.arange(num_trials))
+        np.testing.assert_array_equal(store['probe_level'],
+                                      -np.arange(num_trials))
+        np.testing.assert_array_equal(store['num_correct'],
+                                      np.minimum(np.arange(num_trials) % 6, 5))
+        self.assertEqual(store['success_vector'].shape, (num_trials, 5))
+
+    def test_last_row_of_track(self):
+        store = TrialStore(num_response_intervals=2)
+        self.assertIsNone(store.last_row())
+        for i, track_id in enumerate([0, 1, 1, 0, 1]):
+            store.append(trial_id=i, stimulus_id=i, target_level=0.2,
+                         probe_level=i, success_vector=[True, False],
+                         track_id=track_id)
+        self.assertEqual(store.last_row(), 4)
+        self.assertEqual(store.last_row(0), 3)
+        self.assertEqual(store.last_row(1), 4)
+        self.assertIsNone(store.last_row(2))
+
+    def test_dataframe_view(self):
+        store = TrialStore(num_response_intervals=3)
+        store.append(trial_id=0, stimulus_id=0, target_level=0.5,
+                     probe_level=-5, success_vector=[True, False, True])
+        df = store.to_dataframe()
+        self.assertEqual(list(df.columns), store.dataframe_columns)
+        self.assertIs(df, store.to_dataframe())  # cached between appends
+        self.assertEqual(df.num_correct.iloc[0], 2)
+
+        store.append(trial_id=1, stimulus_id=1, target_level=0.5,
+                     probe_level=-4, success_vector=[False, False, False])
+        df = store.to_dataframe()
+        self.assertEqual(len(df), 2)
+        self.assertEqual(df.trial_mean.iloc[1], 0)
+        np.testing.assert_array_equal(df.success_vector.iloc[0],
+                                      [True, False, True])
+
+    def test_dataframe_with_track_id(self):
+        store = TrialStore(num_response_intervals=1, include_track_id=True)
+        store.append(trial_id=0, stimulus_id=0, target_level=0.5,
+                     probe_level=0, success_vector=[True], track_id=3)
+        df = store.to_dataframe()
+        self.assertEqual(list(df.columns)[:3],
+                         ['trial_id', 'stimulus_id', 'track_id'])
+        self.assertEqual(df.track_id.iloc[0], 3)
+        self.assertNotIn('track_id', TrialStore.dataframe_columns)
+
+
+if __name__ == '__main__':
+    unittest.main()
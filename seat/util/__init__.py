@@ -4,6 +4,8 @@ import ipaddress
 import os
 import subprocess
 
+from .deadline_scheduler import DeadlineScheduler
+
 
 def check_path_is_file(pathlib_path):
     if not pathlib_path.is_file():
@@ -0,0 +1,143 @@
+import time
+
+
+class DeadlineScheduler:
+    """
+    Waits for deadlines fixed relative to the start of a schedule (e.g. a
+    trial) and records when each event actually happened
+
+    Deadlines are absolute times on the time.perf_counter_ns() clock, so time
+    spent between waits (drawing a prompt, printing, building OSC messages)
+    doesn't push later events back. Each wait sleeps until shortly before the
+    deadline, then spins for the remainder, which avoids the granularity of
+    the OS sleep (up to ~15 ms on some systems).
+
+    Usage::
+
+        scheduler.start()
+        ...
+        scheduler.wait_until('video', cue_duration)
+        ...
+        scheduler.wait_until('audio', cue_duration + audio_delay)
+        record = scheduler.summary()
+    """
+
+    def __init__(self, spin_s=0.002):
+        """
+        Parameters
+        ----------
+        spin_s : float, optional
+            How long before each deadline to stop sleeping and spin. The
+            default is 0.002.
+        """
+        self.spin_ns = int(spin_s * 1e9)
+        self.origin_ns = None
+        self.events = []  # (name, intended_ns, achieved_ns)
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Create a scheduler using the optional keys of a settings dict
+
+        scheduler_spin_s: see __init__
+        """
+        return cls(spin_s=config.get("scheduler_spin_s", 0.002))
+
+    def start(self, origin_ns=None):
+        """Start a new schedule, now by default, clearing recorded events"""
+        if origin_ns is None:
+            origin_ns = time.perf_counter_ns()
+        self.origin_ns = origin_ns
+        self.events = []
+        return origin_ns
+
+    def deadline_ns(self, offset_s):
+        """Absolute time of offset_s seconds after the start"""
+        if self.origin_ns is None:
+            raise RuntimeError('Call start() before scheduling events')
+        return self.origin_ns + round(offset_s * 1e9)
+
+    def wait(self, offset_s):
+        """
+        Wait until offset_s seconds after the start without recording it
+
+        Returns at once if the deadline has passed.
+
+        Returns
+        -------
+        int.
+            time.perf_counter_ns() when the wait finished
+        """
+        deadline = self.deadline_ns(offset_s)
+        remaining_ns = deadline - time.perf_counter_ns() - self.spin_ns
+        if remaining_ns > 0:
+            time.sleep(remaining_ns / 1e9)
+        now = time.perf_counter_ns()
+        while now < deadline:
+            now = time.perf_counter_ns()
+        return now
+
+    def record(self, name, offset_s, achieved_ns=None):
+        """
+        Record that the event due offset_s seconds after the start happened
+        at achieved_ns (now by default), e.g. when a message was sent ahead
+        of the time it is to be executed
+
+        Returns
+        -------
+        int.
+            achieved_ns
+        """
+        deadline = self.deadline_ns(offset_s)
+        if achieved_ns is None:
+            achieved_ns = time.perf_counter_ns()
+        self.events.append((name, deadline, achieved_ns))
+        return achieved_ns
+
+    def wait_until(self, name, offset_s, action=None):
+        """
+        Wait until offset_s seconds after the start and record the event
+
+        Returns at once (and records how late it is) if the deadline has
+        passed.
+
+        Parameters
+        ----------
+        action : callable, optional
+            Called once the deadline is reached, e.g. to send a message. The
+            event is then recorded when it returns, so the record includes
+            the time taken to act.
+
+        Returns
+        -------
+        int.
+            time.perf_counter_ns() when the event was recorded
+        """
+        achieved_ns = self.wait(offset_s)
+        if action is not None:
+            action()
+            achieved_ns = None
+        return self.record(name, offset_s, achieved_ns)
+
+    @staticmethod
+    def summary_fields(names):
+        """Names of the fields of summary() for events with these names"""
+        fields = []
+        for name in names:
+            fields += ['t_' + name + '_ms', name + '_error_ms']
+        return fields
+
+    def summary(self):
+        """
+        Events of the current schedule as a dict
+
+        t_<name>_ms is the intended time of each event relative to the start
+        and <name>_error_ms how much later than that it happened (negative if
+        it was recorded early).
+        """
+        row = {}
+        for name, intended, achieved in self.events:
+            row['t_' + name + '_ms'] = (intended - self.origin_ns) / 1e6
+            row[name + '_error_ms'] = (achieved - intended) / 1e6
+        return row
+